@@ -5,3 +5,14 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Rec.settings")
 
 application = get_asgi_application()
+
+# Rotas, templates, regras de pontuação e índice de tipos prontos antes da
+# primeira requisição (veja reciclAI/warmup.py). No ASGI cada requisição
+# síncrona roda numa thread própria: não há conexão a manter aberta.
+if os.environ.get("DJANGO_WARM_UP", "True") == "True":
+    from django.db import connections
+
+    from reciclAI import warmup
+
+    warmup.warm_up(open_connections=False)
+    connections.close_all()
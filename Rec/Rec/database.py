@@ -0,0 +1,119 @@
+"""
+Configuração de banco de dados do projeto.
+
+Por padrão usa SQLite ajustado para produção (WAL, synchronous=NORMAL,
+busy_timeout, mmap e cache maiores). Definindo DJANGO_DB_ENGINE=postgresql
+o mesmo `DATABASES` passa a apontar para um PostgreSQL configurado pelas
+variáveis de ambiente DJANGO_DB_*.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+# PRAGMAs aplicados em cada nova conexão SQLite.
+SQLITE_PRAGMAS = {
+    # WAL permite leitores concorrentes com um escritor.
+    "journal_mode": "WAL",
+    # Em WAL, NORMAL é seguro contra corrupção e evita um fsync por commit.
+    "synchronous": "NORMAL",
+    # Milissegundos que um escritor espera pelo lock antes de falhar.
+    "busy_timeout": 5000,
+    # 128 MiB de leitura via mmap.
+    "mmap_size": 134217728,
+    # Valor negativo = tamanho em KiB (aqui, 20 MiB de cache por conexão).
+    "cache_size": -20000,
+    "temp_store": "MEMORY",
+    # Limita o crescimento do arquivo -wal após checkpoints.
+    "journal_size_limit": 67108864,
+}
+
+# Segundos que uma conexão persistente permanece aberta entre requisições.
+DEFAULT_CONN_MAX_AGE = 600
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def sqlite_init_command(pragmas=None):
+    """
+    Monta o `init_command` executado pelo Django a cada conexão SQLite.
+    """
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    return " ".join(f"PRAGMA {name}={value};" for name, value in pragmas.items())
+
+
+def sqlite_database(name, conn_max_age=DEFAULT_CONN_MAX_AGE):
+    pragmas = dict(SQLITE_PRAGMAS)
+    pragmas["busy_timeout"] = _env_int(
+        "DJANGO_DB_BUSY_TIMEOUT_MS", pragmas["busy_timeout"]
+    )
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": name,
+        "CONN_MAX_AGE": conn_max_age,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "init_command": sqlite_init_command(pragmas),
+            # BEGIN IMMEDIATE pega o lock de escrita no início da transação,
+            # evitando o "database is locked" imediato ao promover um lock
+            # de leitura para escrita (que ignora o busy_timeout).
+            "transaction_mode": "IMMEDIATE",
+            "timeout": pragmas["busy_timeout"] / 1000,
+        },
+    }
+
+
+def postgresql_database(conn_max_age=DEFAULT_CONN_MAX_AGE):
+    return {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ.get("DJANGO_DB_NAME", "reciclai"),
+        "USER": os.environ.get("DJANGO_DB_USER", ""),
+        "PASSWORD": os.environ.get("DJANGO_DB_PASSWORD", ""),
+        "HOST": os.environ.get("DJANGO_DB_HOST", ""),
+        "PORT": os.environ.get("DJANGO_DB_PORT", ""),
+        "CONN_MAX_AGE": conn_max_age,
+        "CONN_HEALTH_CHECKS": True,
+    }
+
+
+def database_from_env(base_dir):
+    """
+    Retorna a entrada `default` de `DATABASES` a partir do ambiente.
+    """
+    engine = os.environ.get("DJANGO_DB_ENGINE", "sqlite").lower()
+    conn_max_age = _env_int("DJANGO_DB_CONN_MAX_AGE", DEFAULT_CONN_MAX_AGE)
+
+    if engine in ("postgres", "postgresql"):
+        return postgresql_database(conn_max_age)
+    if engine != "sqlite":
+        raise ImproperlyConfigured(f"DJANGO_DB_ENGINE desconhecido: {engine!r}")
+
+    name = os.environ.get("DJANGO_DB_NAME") or base_dir / "db.sqlite3"
+    return sqlite_database(name, conn_max_age)
+
+
+def replica_from_env(base_dir):
+    """
+    Retorna a configuração da réplica de leitura, ou None se não houver.
+
+    Com SQLite, DJANGO_DB_REPLICA_NAME aponta para um segundo arquivo que
+    faz o papel de réplica (atualizado com `manage.py sync_replica`). Com
+    PostgreSQL, DJANGO_DB_REPLICA_HOST aponta para o servidor réplica.
+    """
+    primary = database_from_env(base_dir)
+    if primary["ENGINE"].endswith("sqlite3"):
+        name = os.environ.get("DJANGO_DB_REPLICA_NAME")
+        if not name:
+            return None
+        replica = sqlite_database(name, primary["CONN_MAX_AGE"])
+    else:
+        host = os.environ.get("DJANGO_DB_REPLICA_HOST")
+        if not host:
+            return None
+        replica = dict(primary, HOST=host)
+    # Nos testes a réplica é o próprio banco de teste principal.
+    replica["TEST"] = {"MIRROR": "default"}
+    return replica
@@ -1,6 +1,10 @@
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
+from .database import database_from_env, replica_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -30,16 +34,22 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.humanize",
     "reciclAI.apps.CoreConfig",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "reciclAI.middleware.MetricsMiddleware",
+    "reciclAI.middleware.RequestTimingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "reciclAI.middleware.ThrottleMiddleware",
+    "reciclAI.middleware.PrimaryPinMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -47,7 +57,8 @@ ROOT_URLCONF = "Rec.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates que mede o tempo de renderização por requisição.
+        "BACKEND": "reciclAI.instrumentation.InstrumentedDjangoTemplates",
         "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -56,6 +67,8 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "reciclAI.context_processors.user_summary",
+                "reciclAI.context_processors.fragment_cache",
             ],
         },
     },
@@ -67,11 +80,172 @@ WSGI_APPLICATION = "Rec.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# SQLite com WAL e conexões persistentes por padrão; veja Rec/database.py
+# para as variáveis DJANGO_DB_* (inclusive a troca para PostgreSQL).
+
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+    "default": database_from_env(BASE_DIR),
+}
+
+# Réplica opcional para as views somente-leitura (veja reciclAI/routers.py).
+DATABASE_REPLICA_ALIAS = "replica"
+if replica := replica_from_env(BASE_DIR):
+    DATABASES[DATABASE_REPLICA_ALIAS] = replica
+
+DATABASE_ROUTERS = ["reciclAI.routers.PrimaryReplicaRouter"]
+
+# Segundos em que um usuário lê do principal depois de uma escrita.
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache. Sem DJANGO_CACHE_URL o cache é local (por processo): cada worker
+# do gunicorn tem o seu. Com DJANGO_CACHE_URL=redis://... (requer o pacote
+# redis) os workers compartilham sessões, travas e contadores.
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHE_URL = os.environ.get("DJANGO_CACHE_URL", "")
+SHARED_CACHE = bool(CACHE_URL)
+
+if SHARED_CACHE:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "reciclai",
+            # Os trechos de template em cache usam uma entrada por linha; o
+            # padrão (300) não comporta uma lista de 1000 coletas.
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
     }
+
+
+# Sessões e mensagens
+# Com cache compartilhado, cached_db lê a sessão do cache e só vai ao banco
+# em caso de miss. No cache local as sessões ficam só no banco: um logout
+# num worker não apagaria a cópia em cache dos outros, e a sessão
+# continuaria valendo neles. Use
+# DJANGO_SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies
+# para não tocar no banco. Mensagens ficam em cookie, então um
+# messages.success() não grava mais a sessão.
+
+SESSION_ENGINE = os.environ.get(
+    "DJANGO_SESSION_ENGINE",
+    (
+        "django.contrib.sessions.backends.cached_db"
+        if SHARED_CACHE
+        else "django.contrib.sessions.backends.db"
+    ),
+)
+if SESSION_ENGINE.endswith((".cache", ".cached_db")) and not SHARED_CACHE:
+    raise ImproperlyConfigured(
+        f"{SESSION_ENGINE} requer um cache compartilhado (DJANGO_CACHE_URL)."
+    )
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
+
+# Segundos máximos até um processo recompilar as regras de pontuação,
+# mesmo sem invalidação (caches locais não são compartilhados).
+POINTS_RULES_MAX_AGE = 60
+
+# O mesmo para o índice de autocompletar de tipos de resíduo.
+RESIDUE_TYPE_INDEX_MAX_AGE = 300
+
+# Segundos máximos em que o resumo da barra de navegação fica no cache (o
+# de outros processos não é descartado nas escritas; veja reciclAI/summary.py).
+USER_SUMMARY_MAX_AGE = 60
+
+# Segundos em que um trecho de template fica no cache (reciclAI/fragments.py).
+# As chaves mudam a cada escrita; isto só limita o espaço ocupado.
+FRAGMENT_CACHE_MAX_AGE = 3600
+
+
+# Proteção das escritas (veja reciclAI/middleware.py, ThrottleMiddleware).
+# Por rota: até `burst` POSTs seguidos por usuário, repostos a `per_minute`.
+THROTTLING_ENABLED = os.environ.get("DJANGO_THROTTLING", "True") == "True"
+RATE_LIMITS = {
+    "reciclAI:accept_collection": {"burst": 5, "per_minute": 30},
+    "reciclAI:request_collection": {"burst": 5, "per_minute": 30},
+    "reciclAI:redeem_reward": {"burst": 3, "per_minute": 10},
+    "reciclAI:recycler_weighings": {"burst": 3, "per_minute": 6},
+}
+# Escritas simultâneas; as excedentes esperam até WRITE_QUEUE_TIMEOUT
+# segundos antes de receber 503. As vagas ficam no cache: com
+# DJANGO_CACHE_URL o limite vale para todos os workers; sem ele, para cada
+# worker, e só tem efeito com GUNICORN_THREADS > 1.
+WRITE_CONCURRENCY_LIMIT = int(os.environ.get("DJANGO_WRITE_CONCURRENCY", "4"))
+WRITE_QUEUE_TIMEOUT = 1.0
+# Uma vaga não liberada (worker encerrado no meio da escrita) expira depois
+# destes segundos; deve passar do GUNICORN_TIMEOUT.
+WRITE_SLOT_LEASE = 60
+
+# Segundos em que uma chave de idempotência (veja reciclAI/idempotency.py)
+# repete a resposta gravada; depois disso o comando cleanup_idempotency_keys
+# a remove.
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+
+# Atribuição automática de coletas a coletores (veja reciclAI/assignment.py):
+# desligada por padrão; o comando assign_collections roda uma rodada a cada
+# AUTO_ASSIGN_INTERVAL segundos com --loop.
+AUTO_ASSIGN_ENABLED = os.environ.get("DJANGO_AUTO_ASSIGN", "False") == "True"
+AUTO_ASSIGN_INTERVAL = 60
+# Distância máxima (km) entre a base do coletor e o ponto de coleta.
+AUTO_ASSIGN_MAX_KM = 25
+# Aviso de nova coleta com coordenadas: só para coletores com base a até
+# esta distância (km); sem coordenadas, vai para todos.
+NEW_COLLECTION_NOTIFY_KM = AUTO_ASSIGN_MAX_KM
+
+
+# Janelas de horário de coleta oferecidas ao cidadão: de hoje até quantos
+# dias à frente (veja reciclAI/scheduling.py).
+PICKUP_SLOT_DAYS = 14
+
+
+# Avisos por e-mail (veja reciclAI/notifications.py), entregues pelo comando
+# dispatch_notifications. Localmente ficam em arquivos em Rec/sent_emails/.
+EMAIL_BACKEND = os.environ.get(
+    "DJANGO_EMAIL_BACKEND", "django.core.mail.backends.filebased.EmailBackend"
+)
+EMAIL_FILE_PATH = BASE_DIR / "sent_emails"
+EMAIL_HOST = os.environ.get("DJANGO_EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.environ.get("DJANGO_EMAIL_PORT", "25"))
+DEFAULT_FROM_EMAIL = os.environ.get(
+    "DJANGO_DEFAULT_FROM_EMAIL", "Reciclaí <nao-responda@reciclai.local>"
+)
+
+
+# Instrumentação por requisição (Server-Timing, log e estatísticas por rota)
+
+REQUEST_TIMING_ENABLED = os.environ.get("DJANGO_REQUEST_TIMING", "True") == "True"
+# Quantidade de requisições recentes mantidas por rota.
+REQUEST_TIMING_WINDOW = 1000
+
+# Métricas Prometheus em /metrics (veja reciclAI/metrics.py). Com vários
+# workers, defina PROMETHEUS_MULTIPROC_DIR. O acesso é da equipe (staff) ou
+# de quem enviar `Authorization: Bearer <METRICS_TOKEN>`.
+METRICS_TOKEN = os.environ.get("DJANGO_METRICS_TOKEN", "")
+# Intervalo de recálculo das métricas de negócio (segundos).
+METRICS_REFRESH_SECONDS = 30
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "reciclAI.perf": {
+            "handlers": ["console"],
+            "level": os.environ.get("DJANGO_PERF_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
 }
 
 
@@ -112,6 +286,35 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Bootstrap e Popper ficam em reciclAI/static/vendor. O collectstatic gera
+# nomes com hash (manifest) e versões .gz/.br de cada arquivo; o WhiteNoise
+# serve esses arquivos pela própria aplicação (WSGI ou ASGI), com cache de
+# um ano para os nomes com hash.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
+# Os testes rodam sem collectstatic, portanto sem manifest: o executor troca
+# o armazenamento de estáticos (veja reciclAI/test_runner.py).
+TEST_RUNNER = "reciclAI.test_runner.TestRunner"
+
+# Contador público de impacto (reciclAI/rollups.py): segundos até recalcular
+# (por worker, sem DJANGO_CACHE_URL).
+IMPACT_COUNTER_MAX_AGE = 300
+
+# Fotos dos resíduos (reciclAI/photos.py). Os envios vão direto para um
+# arquivo temporário, em blocos, em vez de ficar na memória; as miniaturas
+# são servidas pela aplicação, com controle de acesso.
+MEDIA_ROOT = BASE_DIR / "media"
+MEDIA_URL = "/media/"
+FILE_UPLOAD_HANDLERS = ["django.core.files.uploadhandler.TemporaryFileUploadHandler"]
+RESIDUE_PHOTO_MAX_SIZE = 10 * 1024 * 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
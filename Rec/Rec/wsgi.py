@@ -5,3 +5,14 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Rec.settings")
 
 application = get_wsgi_application()
+
+# Rotas, templates, regras de pontuação e índice de tipos prontos antes da
+# primeira requisição (veja reciclAI/warmup.py). As conexões são por thread
+# (e não passam por um fork): cada servidor abre as suas.
+if os.environ.get("DJANGO_WARM_UP", "True") == "True":
+    from django.db import connections
+
+    from reciclAI import warmup
+
+    warmup.warm_up(open_connections=False)
+    connections.close_all()
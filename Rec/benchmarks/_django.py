@@ -0,0 +1,28 @@
+"""
+Inicializa o Django para os benchmarks com um banco SQLite temporário.
+"""
+
+import os
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup(db_path=None):
+    """
+    Configura o Django apontando para `db_path` (ou um arquivo temporário)
+    e aplica as migrações. Retorna o caminho do banco.
+    """
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="reciclai-bench-"), "db.sqlite3")
+    sys.path.insert(0, BASE_DIR)
+    os.environ["DJANGO_DB_NAME"] = db_path
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Rec.settings")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    return db_path
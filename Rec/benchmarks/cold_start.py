@@ -0,0 +1,156 @@
+"""
+Benchmark de inicialização: importação da aplicação WSGI e primeiras
+requisições de um worker novo, com e sem reciclAI.warmup.
+
+Cada medição roda num interpretador novo (como um worker recém-criado):
+mede o `import Rec.wsgi`, o `warm_up()` (quando usado) e a primeira e a
+segunda requisição a cada página do cidadão, do coletor e da recicladora.
+
+Uso (a partir de Rec/):
+    python benchmarks/cold_start.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import _django
+
+CHILD = """
+import json, sys, time
+
+start = time.perf_counter()
+from Rec.wsgi import application  # noqa: F401
+import_ms = (time.perf_counter() - start) * 1000
+
+warm_ms = 0.0
+if sys.argv[1] == "warm":
+    from reciclAI import warmup
+
+    start = time.perf_counter()
+    warmup.warm_up()
+    warm_ms = (time.perf_counter() - start) * 1000
+
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import Client, override_settings
+
+# Sem collectstatic: o manifest não existe neste banco temporário.
+override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+        },
+    }
+).enable()
+
+
+def get(url, cookie):
+    # Chama a própria aplicação WSGI (middlewares já carregados no import).
+    environ = {"PATH_INFO": url, "HTTP_COOKIE": cookie, "HTTP_HOST": "localhost"}
+    setup_testing_defaults(environ)
+    status = []
+    body = application(environ, lambda s, headers: status.append(s))
+    b"".join(body)
+    body.close()
+    return status[0]
+
+
+pages = json.loads(sys.argv[2])
+first, second = [], []
+for username, urls in pages.items():
+    client = Client()
+    client.force_login(User.objects.get(username=username))
+    cookie = f"{settings.SESSION_COOKIE_NAME}={client.session.session_key}"
+    for url in urls:
+        for samples in (first, second):
+            start = time.perf_counter()
+            status = get(url, cookie)
+            samples.append((time.perf_counter() - start) * 1000)
+            assert status.startswith("200"), (url, status)
+print(json.dumps({"import": import_ms, "warm": warm_ms, "first": first, "second": second}))
+"""
+
+
+def setup_data():
+    from django.contrib.auth.models import User
+    from django.urls import reverse
+
+    pages = {}
+    for username, user_type, names in [
+        (
+            "cidadao",
+            "C",
+            [
+                "residue_list",
+                "residue_create",
+                "collection_status",
+                "points_history",
+                "leaderboard",
+                "rewards_list",
+            ],
+        ),
+        ("coletor", "L", ["collector_dashboard"]),
+        ("recicladora", "R", ["recycler_dashboard"]),
+    ]:
+        user = User.objects.create_user(username=username, password="password")
+        user.profile.user_type = user_type
+        user.profile.save()
+        pages[username] = [reverse(f"reciclAI:{name}") for name in names]
+    return pages
+
+
+def run(mode, db_path, pages):
+    env = dict(
+        os.environ,
+        DJANGO_DB_NAME=db_path,
+        DJANGO_SETTINGS_MODULE="Rec.settings",
+        DJANGO_PERF_LOG_LEVEL="WARNING",
+        # O import do Rec.wsgi não aquece: o modo "warm" chama warm_up()
+        # à parte, para medir cada etapa.
+        DJANGO_WARM_UP="False",
+    )
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", CHILD, mode, json.dumps(pages)],
+        cwd=_django.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = _django.setup()
+    pages = setup_data()
+
+    print(
+        f"{'modo':<8}{'import':>10}{'warm_up':>10}"
+        f"{'1ª req (soma)':>16}{'1ª req (máx)':>15}{'2ª req (soma)':>16}"
+    )
+    for mode in ["cold", "warm"]:
+        results = [run(mode, db_path, pages) for _ in range(args.runs)]
+
+        def median(key, reduce=sum):
+            return statistics.median(reduce(result[key]) for result in results)
+
+        print(
+            f"{mode:<8}{median('import', float):>8.1f}ms{median('warm', float):>8.1f}ms"
+            f"{median('first'):>14.1f}ms{median('first', max):>13.1f}ms"
+            f"{median('second'):>14.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark da atribuição automática de coletas (reciclAI.assignment).
+
+Espalha P coletas SOLICITADA e C coletores (com capacidade aleatória) num
+quadrado do tamanho de uma cidade e compara `assignment.solve()` com a
+estratégia ingênua "cada coleta, por ordem de chegada, fica com o coletor
+livre mais próximo" (varredura de todos os coletores): tempo de cálculo,
+coletas atribuídas e quilômetros somados. Depois mede uma rodada completa
+no banco (`assign_open_collections()`: leitura, cálculo e UPDATE).
+
+Uso (a partir de Rec/):
+    python benchmarks/collection_assignment.py --pickups 10000 --collectors 500
+"""
+
+import argparse
+import math
+import random
+import time
+from datetime import timedelta
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from reciclAI import assignment  # noqa: E402
+from reciclAI.models import Collection, Profile, Residue, ResidueType  # noqa: E402
+
+# Teresina: ~0,3° (cerca de 33 km) de lado.
+CENTER = (-5.09, -42.80)
+SPAN = 0.3
+
+
+def random_point():
+    return (
+        CENTER[0] + random.uniform(-SPAN / 2, SPAN / 2),
+        CENTER[1] + random.uniform(-SPAN / 2, SPAN / 2),
+    )
+
+
+def naive(pickups, collectors, max_km):
+    x_scale = assignment.KM_PER_DEGREE * math.cos(math.radians(CENTER[0]))
+    free = [slots for *_, slots in collectors]
+    result = {}
+    for pickup_id, lat, lon, _ in sorted(pickups, key=lambda p: p[3]):
+        best = None
+        for index, (_, c_lat, c_lon, _) in enumerate(collectors):
+            if not free[index]:
+                continue
+            distance = math.hypot(
+                (lon - c_lon) * x_scale, (lat - c_lat) * assignment.KM_PER_DEGREE
+            )
+            if distance <= max_km and (best is None or distance < best[0]):
+                best = (distance, index)
+        if best:
+            free[best[1]] -= 1
+            result[pickup_id] = (collectors[best[1]][0], best[0])
+    return result
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def setup_data(args):
+    now = timezone.now()
+    citizen = User.objects.create_user("cidadao")
+    residue_type = ResidueType.objects.first()
+    collectors = User.objects.bulk_create(
+        User(username=f"l{i}") for i in range(args.collectors)
+    )
+    Profile.objects.bulk_create(
+        [
+            Profile(
+                user=user,
+                user_type="L",
+                latitude=lat,
+                longitude=lon,
+                assignment_capacity=random.randint(
+                    args.capacity // 2, args.capacity * 3 // 2
+                ),
+            )
+            for user in collectors
+            for lat, lon in [random_point()]
+        ]
+    )
+    residues = Residue.objects.bulk_create(
+        [
+            Residue(
+                citizen=citizen,
+                residue_type=residue_type,
+                weight=1,
+                location="Rua",
+                latitude=lat,
+                longitude=lon,
+                status="COLETA_SOLICITADA",
+            )
+            for lat, lon in (random_point() for _ in range(args.pickups))
+        ],
+        batch_size=1000,
+    )
+    Collection.objects.bulk_create(
+        [Collection(residue=residue) for residue in residues], batch_size=1000
+    )
+    # Idades de 0 a 48 h.
+    for collection_id in Collection.objects.values_list("id", flat=True):
+        Collection.objects.filter(id=collection_id).update(
+            created_at=now - timedelta(minutes=random.randint(0, 48 * 60))
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pickups", type=int, default=10_000)
+    parser.add_argument("--collectors", type=int, default=500)
+    parser.add_argument(
+        "--capacity", type=int, default=20, help="Capacidade média por coletor."
+    )
+    parser.add_argument("--max-km", type=float, default=25)
+    args = parser.parse_args()
+    random.seed(42)
+
+    setup_data(args)
+    pickups, collectors, _ = assignment.load_candidates()
+    slots = sum(c[3] for c in collectors)
+    print(f"{len(pickups)} coletas, {len(collectors)} coletores, {slots} vagas")
+
+    print(
+        f"{'estratégia':<12}{'tempo':>10}{'atribuídas':>12}{'km total':>12}{'km médio':>10}"
+    )
+    for label, function in [("ingênua", naive), ("solve()", assignment.solve)]:
+        result, seconds = timed(function, pickups, collectors, args.max_km)
+        total = sum(km for _, km in result.values())
+        print(
+            f"{label:<12}{seconds * 1000:>8.0f}ms{len(result):>12}"
+            f"{total:>12.0f}{total / max(len(result), 1):>10.2f}"
+        )
+
+    stats = assignment.assign_open_collections(args.max_km)
+    print(
+        f"rodada completa no banco: {stats['assigned']} atribuídas "
+        f"em {stats['seconds'] * 1000:.0f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
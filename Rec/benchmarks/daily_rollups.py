@@ -0,0 +1,201 @@
+"""
+Benchmark dos totais diários (reciclAI.rollups).
+
+Gera N coletas processadas ao longo de um ano (R recicladoras, várias
+regiões e tipos) e mede:
+
+1. backfill (`rebuild()`) e atualização incremental de um lote novo;
+2. indicadores de uma recicladora (30 dias, por dia e por tipo) e o total
+   público calculados sobre Collection/Residue contra sobre os rollups;
+3. contador público com T threads e cache vazio: quantos recálculos.
+
+Uso (a partir de Rec/):
+    python benchmarks/daily_rollups.py --collections 200000
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as clock, timedelta
+from decimal import Decimal
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Sum  # noqa: E402
+from django.db.models.functions import TruncDate  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from reciclAI import rollups  # noqa: E402
+from reciclAI.models import (  # noqa: E402
+    Collection,
+    PickupSlot,
+    Profile,
+    Residue,
+    ResidueType,
+)
+
+
+def median_ms(function, runs=5):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def create_processed(count, recyclers, slots, types, citizen, start, span_days):
+    residues = Residue.objects.bulk_create(
+        (
+            Residue(
+                citizen=citizen,
+                residue_type=random.choice(types),
+                weight=Decimal(random.randint(1, 500)) / 10,
+                units=random.randint(0, 20),
+                location="Rua",
+                status="PROCESSADO",
+            )
+            for _ in range(count)
+        ),
+        batch_size=1000,
+    )
+    Collection.objects.bulk_create(
+        (
+            Collection(
+                residue=residue,
+                status="PROCESSADO",
+                recycler=random.choice(recyclers),
+                slot=random.choice(slots),
+                processed_at=start
+                + timedelta(seconds=random.randint(0, span_days * 86400)),
+            )
+            for residue in residues
+        ),
+        batch_size=1000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--collections", type=int, default=200_000)
+    parser.add_argument("--recyclers", type=int, default=20)
+    parser.add_argument("--areas", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+    random.seed(42)
+
+    now = timezone.now()
+    recyclers = User.objects.bulk_create(
+        User(username=f"r{i}") for i in range(args.recyclers)
+    )
+    Profile.objects.bulk_create(Profile(user=user, user_type="R") for user in recyclers)
+    slots = [None] + [
+        PickupSlot.objects.create(
+            area=f"Bairro {i}",
+            date=timezone.localdate(),
+            start_time=clock(8),
+            end_time=clock(10),
+            capacity=1,
+        )
+        for i in range(args.areas)
+    ]
+    types = list(ResidueType.objects.all())
+    citizen = User.objects.create_user("cidadao")
+    create_processed(
+        args.collections,
+        recyclers,
+        slots,
+        types,
+        citizen,
+        now - timedelta(days=365),
+        364,
+    )
+
+    stats = rollups.rebuild(now=now)
+    print(
+        f"backfill: {stats['collections']} coletas em {stats['seconds']:.1f}s "
+        f"({stats['collections'] / stats['seconds']:.0f}/s), "
+        f"{rollups.DailyRollup.objects.count()} linhas de rollup"
+    )
+    create_processed(
+        1000, recyclers, slots, types, citizen, now - timedelta(hours=2), 0
+    )
+    stats = rollups.update(now=now)
+    print(
+        f"incremental: {stats['collections']} coletas em {stats['seconds'] * 1000:.0f}ms"
+    )
+
+    recycler = recyclers[0]
+    since = timezone.localdate() - timedelta(days=30)
+
+    def from_base_tables():
+        rows = Collection.objects.filter(
+            status="PROCESSADO", recycler=recycler, processed_at__date__gt=since
+        )
+        list(
+            rows.annotate(day=TruncDate("processed_at"))
+            .values("day")
+            .annotate(weight=Sum("residue__weight"), units=Sum("residue__units"))
+        )
+        list(
+            rows.values("residue__residue_type__name").annotate(
+                weight=Sum("residue__weight"), units=Sum("residue__units")
+            )
+        )
+
+    def from_rollups():
+        rows = rollups.recent(30).filter(recycler=recycler)
+        list(rollups.totals_by(rows, "day"))
+        list(rollups.totals_by(rows, "residue_type__name"))
+
+    def total_from_base():
+        Residue.objects.filter(collection__status="PROCESSADO").aggregate(
+            Sum("weight"), Sum("units")
+        )
+
+    print(
+        f"indicadores da recicladora: tabelas base {median_ms(from_base_tables):.1f}ms, "
+        f"rollups {median_ms(from_rollups):.1f}ms"
+    )
+    print(
+        f"total público: tabelas base {median_ms(total_from_base):.1f}ms, "
+        f"rollups {median_ms(rollups._compute_impact):.1f}ms"
+    )
+
+    computes = []
+    original = rollups._compute_impact
+    barrier = threading.Barrier(args.threads)
+
+    def counted():
+        computes.append(1)
+        time.sleep(0.2)  # Como um recálculo lento sob carga.
+        return original()
+
+    def visitor(_):
+        try:
+            barrier.wait()
+            return rollups.impact()
+        finally:
+            connection.close()
+
+    rollups._compute_impact = counted
+    cache.clear()
+    with ThreadPoolExecutor(args.threads) as pool:
+        results = list(pool.map(visitor, range(args.threads)))
+    rollups._compute_impact = original
+    print(
+        f"contador público, {args.threads} acessos simultâneos com cache vazio: "
+        f"{len(computes)} recálculo(s), {sum(r is not None for r in results)} respostas"
+    )
+
+
+if __name__ == "__main__":
+    main()
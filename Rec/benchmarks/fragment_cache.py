@@ -0,0 +1,127 @@
+"""
+Benchmark do cache de trechos de template (reciclAI.fragments).
+
+Renderiza listas de N coletas (acompanhamento do cidadão e coletas
+disponíveis do coletor) e mede a mediana de:
+
+1. sem cache (FRAGMENT_CACHE_MAX_AGE=0);
+2. cache vazio (primeira renderização, que também grava os trechos);
+3. cache quente;
+4. depois de uma mudança de status: só a linha alterada é refeita.
+
+Mede só o template (consultas da lista incluídas quando não há acerto).
+
+Uso (a partir de Rec/):
+    python benchmarks/fragment_cache.py --collections 1000
+"""
+
+import argparse
+import statistics
+import time
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.template.loader import get_template  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from reciclAI import summary  # noqa: E402
+from reciclAI.forms import CollectorAssignmentForm  # noqa: E402
+from reciclAI.models import Collection, Profile, Residue, ResidueType  # noqa: E402
+
+
+def median_ms(function, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--collections", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    citizen = User.objects.create_user("cidadao")
+    collector = User.objects.create_user("coletor")
+    Profile.objects.filter(user=collector).update(user_type="L")
+    collector.refresh_from_db()
+    types = list(ResidueType.objects.all())
+    residues = Residue.objects.bulk_create(
+        Residue(
+            citizen=citizen,
+            residue_type=types[i % len(types)],
+            units=1,
+            location=f"Rua {i}",
+            status="COLETA_SOLICITADA",
+        )
+        for i in range(args.collections)
+    )
+    Collection.objects.bulk_create(Collection(residue=residue) for residue in residues)
+    changed = Collection.objects.order_by("id").first()
+
+    factory = RequestFactory()
+    pages = {
+        "acompanhamento do cidadão": (
+            "reciclAI/collection_status.html",
+            citizen,
+            lambda: {
+                "collections": Collection.objects.filter(residue__citizen=citizen)
+                .select_related("residue__residue_type", "slot")
+                .order_by("-updated_at")
+            },
+        ),
+        "coletas disponíveis (coletor)": (
+            "reciclAI/collector_dashboard.html",
+            collector,
+            lambda: {
+                "available_collections": Collection.objects.filter(status="SOLICITADA")
+                .select_related("residue__residue_type", "slot")
+                .order_by("created_at"),
+                "my_collections": Collection.objects.none(),
+                "assignment_form": CollectorAssignmentForm(instance=collector.profile),
+            },
+        ),
+    }
+    print(f"{args.collections} linhas, mediana de {args.runs} renderizações")
+    for label, (name, user, context) in pages.items():
+        template = get_template(name)
+
+        def render():
+            request = factory.get("/")
+            request.user = user
+            return template.render(context(), request)
+
+        with override_settings(FRAGMENT_CACHE_MAX_AGE=0):
+            uncached = median_ms(render, args.runs)
+
+        def cold():
+            cache.clear()
+            render()
+
+        cold_ms = median_ms(cold, args.runs)
+        render()
+        warm = median_ms(render, args.runs)
+
+        def after_write():
+            # Como numa mudança de status: nova linha e resumo descartado.
+            Collection.objects.filter(id=changed.id).update(updated_at=timezone.now())
+            cache.delete(summary.cache_key(citizen.pk))
+            render()
+
+        one_changed = median_ms(after_write, args.runs)
+        print(
+            f"{label}: sem cache {uncached:.1f}ms, cache vazio {cold_ms:.1f}ms, "
+            f"quente {warm:.1f}ms, após uma mudança {one_changed:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark do despachante de avisos (caixa de saída).
+
+Grava N avisos para C cidadãos (vários por cidadão, como coletas
+processadas em lote) mais alguns para todos os coletores e mede a vazão de
+`notifications.dispatch()` com o backend de e-mail em memória, além de
+quantos e-mails os avisos viraram.
+
+Uso (a partir de Rec/):
+    python benchmarks/notification_dispatch.py --notifications 50000
+"""
+
+import argparse
+import random
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from reciclAI import notifications  # noqa: E402
+from reciclAI.models import Notification  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--notifications", type=int, default=50_000)
+    parser.add_argument("--citizens", type=int, default=5_000)
+    parser.add_argument("--collectors", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=notifications.BATCH_SIZE)
+    args = parser.parse_args()
+
+    citizens = User.objects.bulk_create(
+        User(username=f"c{i}", email=f"c{i}@example.com") for i in range(args.citizens)
+    )
+    for i in range(args.collectors):
+        user = User.objects.create_user(f"l{i}", email=f"l{i}@example.com")
+        user.profile.user_type = "L"
+        user.profile.save()
+
+    rows = []
+    for i in range(args.notifications):
+        if i % 100 == 0:
+            rows.append(Notification(kind="NOVA_COLETA", message="Nova coleta."))
+        else:
+            rows.append(
+                Notification(
+                    user=random.choice(citizens),
+                    kind="COLETA_PROCESSADA",
+                    message="A coleta de Vidro foi processada: +5 pontos.",
+                )
+            )
+    Notification.objects.bulk_create(rows, batch_size=1000)
+
+    with override_settings(
+        EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"
+    ):
+        stats = notifications.dispatch(args.batch_size)
+    print(
+        f"{stats['notifications']} avisos -> {stats['emails']} e-mails "
+        f"em {stats['seconds']:.2f}s "
+        f"({stats['notifications'] / stats['seconds']:.0f} avisos/s, "
+        f"atraso máximo {stats['max_lag']:.1f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Benchmark das fotos de resíduos (reciclAI.photos).
+
+1. Envio: monta um POST multipart com uma foto de celular (4032x3024 JPEG)
+   num arquivo e o entrega à aplicação WSGI lendo do disco, medindo o pico
+   de memória (tracemalloc) com os handlers padrão do Django e com o
+   TemporaryFileUploadHandler configurado.
+2. Miniaturas: tempo por foto de `make_thumbnails()` (decodificação
+   reduzida com draft(), tamanhos em cascata) contra abrir a foto inteira
+   e redimensionar cada tamanho a partir dela.
+3. Peso de uma lista de 25 coletas: originais contra miniaturas de 160 px.
+
+Uso (a partir de Rec/):
+    python benchmarks/photo_uploads.py --photos 10
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import _django
+
+_django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.files.base import ContentFile  # noqa: E402
+from django.core.files.storage import default_storage  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.client import BOUNDARY, encode_multipart  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from reciclAI import photos  # noqa: E402
+
+PHONE = (4032, 3024)
+CSRF_SECRET = "a" * 32
+DEFAULT_HANDLERS = [
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+
+def phone_photo():
+    # Fractal com ruído: detalhe em todas as escalas e tamanho de arquivo
+    # parecido com o de uma foto de celular.
+    detail = Image.effect_mandelbrot(PHONE, (-2.0, -1.2, 1.0, 1.2), 200)
+    noise = Image.effect_noise(PHONE, 30)
+    image = Image.merge("RGB", [detail, noise, Image.blend(detail, noise, 0.5)])
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=75)
+    return buffer.getvalue()
+
+
+def upload_peak(app, body_path, length, cookie, handlers):
+    with override_settings(FILE_UPLOAD_HANDLERS=handlers):
+        with open(body_path, "rb") as body:
+            environ = {
+                "REQUEST_METHOD": "POST",
+                "PATH_INFO": reverse("reciclAI:residue_create"),
+                "CONTENT_TYPE": f"multipart/form-data; boundary={BOUNDARY}",
+                "CONTENT_LENGTH": str(length),
+                "HTTP_COOKIE": cookie,
+                "HTTP_X_CSRFTOKEN": CSRF_SECRET,
+                "SERVER_NAME": "localhost",
+                "SERVER_PORT": "80",
+                "wsgi.input": body,
+                "wsgi.url_scheme": "http",
+            }
+            tracemalloc.start()
+            statuses = []
+            result = app(environ, lambda status, headers: statuses.append(status))
+            b"".join(result)
+            result.close()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    assert statuses[0].startswith("302"), statuses  # Cadastro aceito.
+    return peak
+
+
+def naive_thumbnails(name):
+    with default_storage.open(name) as original:
+        image = Image.open(original).convert("RGB")
+    for size in photos.THUMBNAIL_SIZES:
+        copy = image.copy()
+        copy.thumbnail((size, size), Image.Resampling.LANCZOS)
+        copy.save(BytesIO(), "WEBP", quality=photos.WEBP_QUALITY, method=4)
+
+
+def median_seconds(function, names):
+    samples = []
+    for name in names:
+        start = time.perf_counter()
+        function(name)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--photos", type=int, default=10)
+    args = parser.parse_args()
+    logging.getLogger("reciclAI.perf").setLevel(logging.WARNING)
+    media = tempfile.mkdtemp(prefix="reciclai-media-")
+
+    with override_settings(
+        MEDIA_ROOT=media,
+        DEBUG=False,
+        STORAGES={
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        },
+        RATE_LIMITS={},
+    ):
+        data = phone_photo()
+        print(f"foto: {PHONE[0]}x{PHONE[1]}, {len(data) / 1024 / 1024:.1f} MB")
+
+        client = Client()
+        client.force_login(User.objects.create_user("cidadao"))
+        cookie = (
+            f"{settings.SESSION_COOKIE_NAME}={client.session.session_key}; "
+            f"{settings.CSRF_COOKIE_NAME}={CSRF_SECRET}"
+        )
+        body = encode_multipart(
+            BOUNDARY,
+            {
+                "residue_type": "Papelão",
+                "weight": "2",
+                "location": "Rua A",
+                "photo": ContentFile(data, name="foto.jpg"),
+            },
+        )
+        body_path = os.path.join(media, "body.bin")
+        with open(body_path, "wb") as file:
+            file.write(body)
+        app = WSGIHandler()
+        # A primeira requisição carrega módulos e templates.
+        upload_peak(app, body_path, len(body), cookie, settings.FILE_UPLOAD_HANDLERS)
+        for label, handlers in [
+            ("handlers padrão", DEFAULT_HANDLERS),
+            ("só arquivo temporário", settings.FILE_UPLOAD_HANDLERS),
+        ]:
+            # Como uma foto abaixo de 2,5 MB (o limite compara o tamanho do
+            # corpo inteiro): o padrão a guardaria toda na memória.
+            with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=len(body) + 1):
+                peak = upload_peak(app, body_path, len(body), cookie, handlers)
+            print(f"envio ({label}): pico de {peak / 1024 / 1024:.2f} MB")
+
+        names = [
+            default_storage.save("bench/foto.jpg", ContentFile(data))
+            for _ in range(args.photos)
+        ]
+        naive = median_seconds(naive_thumbnails, names)
+        fast = median_seconds(photos.make_thumbnails, names)
+        print(
+            f"miniaturas por foto: foto inteira {naive * 1000:.0f}ms, "
+            f"make_thumbnails {fast * 1000:.0f}ms"
+        )
+
+        thumbnails = photos.make_thumbnails(names[0])
+        small = default_storage.size(thumbnails["160"])
+        print(
+            f"lista de 25 coletas: originais {25 * len(data) / 1024 / 1024:.1f} MB, "
+            f"miniaturas {25 * small / 1024:.0f} KB"
+        )
+
+
+if __name__ == "__main__":
+    main()
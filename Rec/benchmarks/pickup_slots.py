@@ -0,0 +1,169 @@
+"""
+Benchmark das janelas de horário de coleta (reciclAI.scheduling).
+
+1. Calendário: `free_slots()` (vagas livres dos próximos 14 dias) sobre
+   A regiões x D dias x 4 janelas.
+2. Agenda do dia do coletor: `day_schedule()` comparado à consulta por
+   `Residue.collection_date` (sem índice), com N coletas no banco.
+3. Reserva concorrente: T threads disputando uma janela de V vagas;
+   verifica que nenhuma vaga é vendida a mais.
+
+Uso (a partir de Rec/):
+    python benchmarks/pickup_slots.py --collections 100000 --threads 32
+"""
+
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as clock, timedelta
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.db.utils import OperationalError  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from reciclAI import scheduling  # noqa: E402
+from reciclAI.models import (  # noqa: E402
+    Collection,
+    PickupSlot,
+    Residue,
+    ResidueType,
+)
+
+WINDOWS = [(8, 10), (10, 12), (14, 16), (16, 18)]
+
+
+def median_ms(function, runs=20):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def setup_data(args):
+    today = timezone.localdate()
+    PickupSlot.objects.bulk_create(
+        [
+            PickupSlot(
+                area=f"Região {a}",
+                date=today + timedelta(days=d),
+                start_time=clock(start),
+                end_time=clock(end),
+                capacity=args.capacity,
+            )
+            for a in range(args.areas)
+            for d in range(-args.days // 2, args.days // 2)
+            for start, end in WINDOWS
+        ],
+        batch_size=1000,
+    )
+    slots = list(PickupSlot.objects.values_list("id", "date"))
+    citizen = User.objects.create_user("cidadao")
+    collector = User.objects.create_user("coletor")
+    residue_type = ResidueType.objects.first()
+    picks = [random.choice(slots) for _ in range(args.collections)]
+    residues = Residue.objects.bulk_create(
+        [
+            Residue(
+                citizen=citizen,
+                residue_type=residue_type,
+                weight=1,
+                location="Rua",
+                collection_date=date,
+                status="COLETA_SOLICITADA",
+            )
+            for _, date in picks
+        ],
+        batch_size=1000,
+    )
+    Collection.objects.bulk_create(
+        [
+            Collection(
+                residue=residue,
+                slot_id=slot_id,
+                collector=collector if random.random() < 0.1 else None,
+                status="ATRIBUIDA" if random.random() < 0.1 else "SOLICITADA",
+            )
+            for residue, (slot_id, _) in zip(residues, picks)
+        ],
+        batch_size=1000,
+    )
+    return collector, today
+
+
+def attempt(slot_id):
+    try:
+        for _ in range(100):
+            try:
+                with transaction.atomic():
+                    return scheduling.book(slot_id) is not None
+            except OperationalError:  # database is locked
+                time.sleep(0.01)
+        return False
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--areas", type=int, default=50)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--collections", type=int, default=100_000)
+    parser.add_argument("--capacity", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+    random.seed(42)
+
+    collector, today = setup_data(args)
+    print(
+        f"{PickupSlot.objects.count()} janelas, "
+        f"{Collection.objects.count()} coletas"
+    )
+
+    ms = median_ms(lambda: scheduling.free_slots(days=14))
+    print(
+        f"calendário (14 dias, {len(scheduling.free_slots(days=14))} janelas): {ms:.1f}ms"
+    )
+
+    by_residue_date = Collection.objects.filter(residue__collection_date=today)
+    by_slot = Collection.objects.filter(slot__in=PickupSlot.objects.filter(date=today))
+    for label, queryset in [
+        ("Residue.collection_date", by_residue_date),
+        ("janela (pickup_slot_date_idx)", by_slot),
+    ]:
+        ids = queryset.values_list("id", flat=True)
+        print(
+            f"agenda do dia por {label}: {median_ms(lambda: list(ids.all())):.1f}ms (só ids)"
+        )
+    ms = median_ms(lambda: scheduling.day_schedule(collector, today))
+    print(f"day_schedule() completo (objetos): {ms:.1f}ms")
+
+    slot = PickupSlot.objects.create(
+        area="Disputada",
+        date=today,
+        start_time=clock(8),
+        end_time=clock(10),
+        capacity=args.capacity,
+    )
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        results = list(pool.map(attempt, [slot.id] * args.threads * 4))
+    seconds = time.perf_counter() - start
+    slot.refresh_from_db()
+    print(
+        f"reserva concorrente: {sum(results)} de {len(results)} tentativas, "
+        f"{slot.booked}/{slot.capacity} vagas, {seconds * 1000:.0f}ms"
+    )
+    assert sum(results) == slot.booked == slot.capacity
+
+
+if __name__ == "__main__":
+    main()
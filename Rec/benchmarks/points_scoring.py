@@ -0,0 +1,102 @@
+"""
+Benchmark do motor de pontuação.
+
+Cria regras e campanhas, gera N coletas sintéticas e compara a pontuação
+item a item (`scoring.score`) com a pontuação em lote
+(`scoring.score_batch`). Também mede o custo de compilar as regras.
+
+Uso (a partir de Rec/):
+    python benchmarks/points_scoring.py --collections 100000
+"""
+
+import argparse
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import _django
+
+_django.setup()
+
+from django.utils import timezone  # noqa: E402
+
+from reciclAI import scoring  # noqa: E402
+from reciclAI.models import PointsCampaign, PointsRule, ResidueType  # noqa: E402
+
+TYPES = [
+    "Garrafa PET",
+    "Papelão",
+    "Vidro",
+    "Alumínio",
+    "Óleo de cozinha",
+    "Eletrônicos",
+]
+
+
+def setup_rules(today):
+    types = {t.name: t for t in ResidueType.objects.filter(name__in=TYPES)}
+    PointsRule.objects.create(residue_type=None, base_points=5)
+    for i, name in enumerate(TYPES[:-1]):
+        PointsRule.objects.create(
+            residue_type=types[name],
+            base_points=i,
+            points_per_kg=Decimal("1.5") * (i + 1),
+            points_per_unit=Decimal("0.5"),
+            max_points=200,
+        )
+    PointsCampaign.objects.create(
+        name="Mês do vidro",
+        residue_type=types["Vidro"],
+        multiplier=Decimal("2"),
+        starts_on=today - timedelta(days=15),
+        ends_on=today + timedelta(days=15),
+    )
+    PointsCampaign.objects.create(
+        name="Semana verde",
+        multiplier=Decimal("1.25"),
+        starts_on=today - timedelta(days=3),
+        ends_on=today + timedelta(days=3),
+    )
+    scoring.invalidate_rules()
+    return [types[name].id for name in TYPES]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--collections", type=int, default=100_000)
+    args = parser.parse_args()
+
+    today = timezone.localdate()
+    type_ids = setup_rules(today)
+    rng = random.Random(42)
+    n = args.collections
+    types = [rng.choice(type_ids) for _ in range(n)]
+    weights = [
+        Decimal(rng.randint(1, 5000)) / 100 if rng.random() < 0.7 else None
+        for _ in range(n)
+    ]
+    units = [rng.randint(1, 50) if w is None else None for w in weights]
+    days = [today - timedelta(days=rng.randint(0, 30)) for _ in range(n)]
+
+    start = time.perf_counter()
+    scoring.get_rules()
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    single = [scoring.score(*item) for item in zip(types, weights, units, days)]
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = scoring.score_batch(types, weights, units, days)
+    batch_s = time.perf_counter() - start
+
+    assert single == batch
+    print(f"compilação das regras: {compile_ms:.1f} ms")
+    print(f"{n} coletas item a item: {single_s:.3f}s ({n / single_s:,.0f}/s)")
+    print(f"{n} coletas em lote:     {batch_s:.3f}s ({n / batch_s:,.0f}/s)")
+    print(f"pontos totais: {sum(batch)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark da fila por recicladora (reciclAI.intake).
+
+Espalha N coletas entregues entre R recicladoras e compara a consulta do
+painel antigo (todas as coletas ENTREGUE_RECICLADORA da cidade) com uma
+página da fila de uma recicladora, além de medir o painel completo
+(`recycler_dashboard`) com o cliente de testes: tempo e consultas.
+
+Uso (a partir de Rec/):
+    python benchmarks/recycler_intake.py --collections 100000 --recyclers 20
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+from datetime import timedelta
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from reciclAI import instrumentation, intake  # noqa: E402
+from reciclAI.models import Collection, Profile, Residue, ResidueType  # noqa: E402
+
+
+def median_ms(function, runs=10):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def setup_data(args):
+    now = timezone.now()
+    recyclers = User.objects.bulk_create(
+        User(username=f"r{i}") for i in range(args.recyclers)
+    )
+    Profile.objects.bulk_create(Profile(user=user, user_type="R") for user in recyclers)
+    citizen = User.objects.create_user("cidadao")
+    residue_type = ResidueType.objects.first()
+    residues = Residue.objects.bulk_create(
+        (
+            Residue(citizen=citizen, residue_type=residue_type, units=1, location="Rua")
+            for _ in range(args.collections)
+        ),
+        batch_size=1000,
+    )
+    Collection.objects.bulk_create(
+        (
+            Collection(
+                residue=residue,
+                recycler=random.choice(recyclers),
+                status="ENTREGUE_RECICLADORA",
+                delivered_at=now - timedelta(minutes=random.randint(0, 60 * 24 * 30)),
+            )
+            for residue in residues
+        ),
+        batch_size=1000,
+    )
+    return recyclers[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--collections", type=int, default=100_000)
+    parser.add_argument("--recyclers", type=int, default=20)
+    args = parser.parse_args()
+    random.seed(42)
+    logging.getLogger("reciclAI.perf").setLevel(logging.WARNING)
+    recycler = setup_data(args)
+
+    def global_queue():
+        list(
+            Collection.objects.filter(status="ENTREGUE_RECICLADORA")
+            .select_related("residue__residue_type", "residue__citizen", "collector")
+            .order_by("updated_at")
+        )
+
+    print(f"fila global (painel antigo): {median_ms(global_queue, 3):.1f}ms")
+    print(
+        f"página da fila da recicladora: "
+        f"{median_ms(lambda: intake.queue_page(recycler, 1)):.2f}ms (1ª), "
+        f"{median_ms(lambda: intake.queue_page(recycler, 100)):.2f}ms (100ª)"
+    )
+
+    client = Client()
+    client.force_login(recycler)
+    url = reverse("reciclAI:recycler_dashboard")
+    # Sem collectstatic neste banco temporário.
+    with override_settings(
+        STORAGES={
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            }
+        }
+    ):
+        client.get(url)
+        instrumentation.reset_stats()
+        ms = median_ms(lambda: client.get(url))
+    stats = instrumentation.route_stats()["reciclAI:recycler_dashboard"]
+    print(f"painel da recicladora: {ms:.1f}ms, {stats['avg_sql']:.0f} consultas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark do autocompletar de tipos de resíduo.
+
+Acrescenta N tipos sintéticos (com apelidos) ao catálogo, monta o índice em
+memória e mede a latência das buscas por prefixo e das que caem na busca
+por trigramas (erros de digitação).
+
+Uso (a partir de Rec/):
+    python benchmarks/residue_autocomplete.py --types 5000 --queries 20000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import _django
+
+_django.setup()
+
+from reciclAI import residue_types  # noqa: E402
+from reciclAI.models import ResidueType  # noqa: E402
+
+WORDS = [
+    "garrafa", "plástico", "papelão", "vidro", "alumínio", "óleo", "metal",
+    "embalagem", "lata", "caixa", "tampa", "sacola", "pote", "cartucho",
+    "bateria", "pilha", "eletrônico", "isopor", "madeira", "tecido",
+]  # fmt: skip
+
+
+def setup_types(rng, count):
+    ResidueType.objects.bulk_create(
+        [
+            ResidueType(
+                name=f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}",
+                normalized_name=f"sintetico {i}",
+                aliases="\n".join(rng.sample(WORDS, 2)),
+            )
+            for i in range(count)
+        ]
+    )
+    residue_types.invalidate_index()
+
+
+def percentile(samples, fraction):
+    return sorted(samples)[int(len(samples) * fraction) - 1]
+
+
+def measure(queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        residue_types.search(query)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--types", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    setup_types(rng, args.types)
+
+    start = time.perf_counter()
+    index = residue_types.get_index()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    prefixes = [rng.choice(WORDS)[: rng.randint(2, 6)] for _ in range(args.queries)]
+    typos = []
+    for _ in range(args.queries):
+        word = rng.choice(WORDS)
+        position = rng.randrange(len(word) - 1)
+        typos.append(
+            word[:position] + word[position + 1] + word[position] + word[position + 2 :]
+        )
+
+    print(f"{len(index.names)} tipos; índice montado em {build_ms:.1f} ms")
+    for label, queries in (("prefixo", prefixes), ("com erro", typos)):
+        samples = measure(queries)
+        print(
+            f"{label:9} p50 {statistics.median(samples):6.1f} µs  "
+            f"p99 {percentile(samples, 0.99):6.1f} µs  "
+            f"máx {max(samples):7.1f} µs"
+        )
+
+
+if __name__ == "__main__":
+    main()
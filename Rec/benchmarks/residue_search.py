@@ -0,0 +1,114 @@
+"""
+Benchmark da busca textual de resíduos (FTS5) contra icontains.
+
+Gera N resíduos com endereços sintéticos (inseridos pelos gatilhos do
+índice), mede buscas por endereço e tipo na tabela FTS e, para comparar,
+a mesma busca com `icontains`.
+
+Uso (a partir de Rec/):
+    python benchmarks/residue_search.py --residues 1000000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+from reciclAI import search  # noqa: E402
+from reciclAI.models import Residue, ResidueType  # noqa: E402
+
+STREETS = [
+    "Rua das Flores", "Avenida Brasil", "Rua São João", "Avenida Paulista",
+    "Travessa Goiás", "Rua Amazonas", "Alameda Santos", "Rua Piauí",
+    "Avenida Frei Serafim", "Rua Álvaro Mendes", "Rua Coelho Rodrigues",
+    "Avenida Kennedy", "Rua Areolino de Abreu", "Praça Pedro II",
+]  # fmt: skip
+NEIGHBORHOODS = [
+    "Centro", "Jóquei", "Fátima", "Ininga", "Dirceu", "Mocambinho",
+    "Itararé", "Lourival Parente", "São Cristóvão", "Piçarra",
+]  # fmt: skip
+QUERIES = [
+    "brasil",
+    "av paulista",
+    "papelao centro",
+    "pet joquei",
+    "rua sao joao 12",
+    "oleo",
+    "fatima vidro",
+    "alameda santos 999",
+]
+
+
+def setup_residues(rng, count):
+    citizen = User.objects.create(username="citizen", password="!")
+    type_ids = list(ResidueType.objects.values_list("id", flat=True))
+    rows = (
+        (
+            citizen.id,
+            rng.choice(type_ids),
+            f"{rng.choice(STREETS)}, {rng.randint(1, 2000)} - {rng.choice(NEIGHBORHOODS)}",
+        )
+        for _ in range(count)
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO reciclAI_residue "
+            "(citizen_id, residue_type_id, location, status, created_at, "
+            "photo, photo_thumbnails) "
+            "VALUES (%s, %s, %s, 'AGUARDANDO_SOLICITACAO_DE_COLETA', "
+            "CURRENT_TIMESTAMP, '', '{}')",
+            rows,
+        )
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def icontains_page(query):
+    residues = Residue.objects.all()
+    for term in query.split():
+        residues = residues.filter(
+            Q(location__icontains=term) | Q(residue_type__name__icontains=term)
+        )
+    return list(residues.order_by("-id").values_list("id", flat=True)[:21])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--residues", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    setup_residues(random.Random(42), args.residues)
+    print(f"{args.residues} resíduos inseridos (com índice) em "
+          f"{time.perf_counter() - start:.1f}s")  # fmt: skip
+
+    start = time.perf_counter()
+    search.rebuild()
+    print(f"rebuild_search_index: {time.perf_counter() - start:.1f}s\n")
+
+    print(f"{'busca':22} {'FTS p1':>9} {'FTS p50':>9} {'icontains':>10}")
+    for query in QUERIES:
+        first = timed(lambda: search.search_residue_ids(query), args.repeat)
+        deep = timed(lambda: search.search_residue_ids(query, page=50), args.repeat)
+        like = timed(lambda: icontains_page(query), 3)
+        print(f"{query:22} {first:7.2f}ms {deep:7.2f}ms {like:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Teste de carga de resgate de recompensa com estoque limitado.
+
+Centenas de cidadãos tentam resgatar ao mesmo tempo uma recompensa com
+estoque pequeno ("os 100 primeiros"). Verifica que nada é vendido além do
+estoque nem debitado de quem não levou, e mede resgates por segundo.
+
+Uso (a partir de Rec/):
+    python benchmarks/reward_stampede.py --citizens 500 --stock 100 --threads 64
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count, Sum  # noqa: E402
+
+from reciclAI.models import Profile, Reward, UserReward  # noqa: E402
+from reciclAI.rewards import RedemptionError, redeem_reward  # noqa: E402
+
+COST = 50
+START_POINTS = 120  # Suficiente para dois resgates, se não houvesse limite.
+
+
+def setup_data(citizens, stock):
+    User.objects.bulk_create(
+        [User(username=f"citizen{i}", password="!") for i in range(citizens)]
+    )
+    users = list(User.objects.filter(username__startswith="citizen"))
+    Profile.objects.bulk_create(
+        [Profile(user=user, user_type="C", points=START_POINTS) for user in users]
+    )
+    reward = Reward.objects.create(
+        name="Os primeiros ganham",
+        points_required=COST,
+        stock=stock,
+        max_per_user=1,
+    )
+    return users, reward
+
+
+def attempt(user, reward_id, attempts):
+    outcomes = []
+    try:
+        for _ in range(attempts):
+            reward = Reward.objects.get(id=reward_id)
+            try:
+                redeem_reward(user, reward)
+                outcomes.append("ok")
+            except RedemptionError as error:
+                outcomes.append(str(error))
+    finally:
+        connection.close()
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--citizens", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument(
+        "--attempts", type=int, default=2, help="Tentativas por cidadão."
+    )
+    args = parser.parse_args()
+
+    users, reward = setup_data(args.citizens, args.stock)
+    connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(lambda u: attempt(u, reward.id, args.attempts), users))
+    elapsed = time.perf_counter() - start
+
+    outcomes = [o for per_user in results for o in per_user]
+    ok = outcomes.count("ok")
+    reward.refresh_from_db()
+    redeemed = UserReward.objects.filter(reward=reward).count()
+    per_user_max = max(
+        UserReward.objects.filter(reward=reward)
+        .values("user")
+        .annotate(n=Count("id"))
+        .values_list("n", flat=True),
+        default=0,
+    )
+    points_spent = (
+        args.citizens * START_POINTS
+        - Profile.objects.aggregate(total=Sum("points"))["total"]
+    )
+
+    print(
+        f"{args.citizens} cidadãos x {args.attempts} tentativas, {args.threads} threads"
+    )
+    print(f"resgates aceitos:       {ok}")
+    print(f"UserReward gravados:    {redeemed}")
+    print(f"estoque restante:       {reward.stock}")
+    print(f"máx. por usuário:       {per_user_max}")
+    print(f"pontos debitados:       {points_spent} (esperado {redeemed * COST})")
+    print(f"tempo:                  {elapsed:.2f}s")
+    print(f"tentativas/s:           {len(outcomes) / elapsed:.0f}")
+    print(f"resgates/s:             {ok / elapsed:.0f}")
+
+    assert redeemed == ok <= args.stock, "estoque vendido além do limite"
+    assert reward.stock == args.stock - redeemed
+    assert per_user_max <= 1, "limite por usuário violado"
+    assert points_spent == redeemed * COST, "pontos debitados sem resgate"
+    print("OK: sem overselling")
+
+
+if __name__ == "__main__":
+    main()
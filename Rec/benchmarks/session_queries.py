@@ -0,0 +1,149 @@
+"""
+Benchmark de consultas ao banco por requisição para cada perfil.
+
+Executa os fluxos do cidadão, do coletor e da recicladora com a
+configuração antiga (sessão no banco, mensagens na sessão) e com a atual
+(sessão cached_db e mensagens em cookie), contando as consultas SQL e as
+que tocam `django_session`.
+
+Uso (a partir de Rec/):
+    python benchmarks/session_queries.py
+"""
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.signals import request_finished  # noqa: E402
+from django.db import close_old_connections, connection, transaction  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from reciclAI.models import Collection, Residue, ResidueType  # noqa: E402
+
+CONFIGS = {
+    "db + session messages": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+        "MESSAGE_STORAGE": "django.contrib.messages.storage.fallback.FallbackStorage",
+    },
+    "cached_db + cookie messages": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.cached_db",
+        "MESSAGE_STORAGE": "django.contrib.messages.storage.cookie.CookieStorage",
+    },
+    "signed_cookies + cookie messages": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.signed_cookies",
+        "MESSAGE_STORAGE": "django.contrib.messages.storage.cookie.CookieStorage",
+    },
+}
+
+
+def make_user(username, user_type):
+    user = User.objects.create_user(username=username, password="password")
+    user.profile.user_type = user_type
+    user.profile.save()
+    return user
+
+
+def citizen_flow(client, citizen, prefix):
+    client.post(
+        reverse("reciclAI:residue_create"),
+        {"residue_type": "Garrafa PET", "units": 10, "location": f"Rua {prefix}"},
+    )
+    residue = Residue.objects.filter(citizen=citizen).latest("id")
+    return [
+        ("GET", reverse("reciclAI:residue_list")),
+        ("POST", reverse("reciclAI:request_collection", args=[residue.id])),
+        ("GET", reverse("reciclAI:collection_status")),
+        ("GET", reverse("reciclAI:points_history")),
+        ("GET", reverse("reciclAI:rewards_list")),
+    ]
+
+
+def collector_flow(client, citizen, prefix):
+    residue = Residue.objects.create(
+        citizen=citizen,
+        residue_type=ResidueType.objects.get(name="Papelão"),
+        weight=5,
+        location=f"Av {prefix}",
+    )
+    collection = Collection.objects.create(residue=residue)
+    return [
+        ("GET", reverse("reciclAI:collector_dashboard")),
+        ("POST", reverse("reciclAI:accept_collection", args=[collection.id])),
+        ("GET", reverse("reciclAI:collector_dashboard")),
+    ]
+
+
+def recycler_flow(client, citizen, prefix):
+    residue = Residue.objects.create(
+        citizen=citizen,
+        residue_type=ResidueType.objects.get(name="Vidro"),
+        units=3,
+        location=f"Praça {prefix}",
+    )
+    collection = Collection.objects.create(
+        residue=residue, status="ENTREGUE_RECICLADORA"
+    )
+    return [
+        ("GET", reverse("reciclAI:recycler_dashboard")),
+        ("POST", reverse("reciclAI:process_collection", args=[collection.id])),
+        ("GET", reverse("reciclAI:recycler_dashboard")),
+    ]
+
+
+FLOWS = {
+    "cidadão": ("C", citizen_flow),
+    "coletor": ("L", collector_flow),
+    "recicladora": ("R", recycler_flow),
+}
+
+
+def measure(config_name, settings):
+    """
+    Roda os fluxos dentro de uma transação desfeita no final, para que todas
+    as configurações partam dos mesmos dados.
+    """
+    results = {}
+    with override_settings(**settings), transaction.atomic():
+        cache.clear()
+        citizen = User.objects.get(username="bench-citizen")
+        for role, (user_type, flow) in FLOWS.items():
+            user = citizen if user_type == "C" else make_user(role, user_type)
+            client = Client()
+            client.login(username=user.username, password="password")
+            steps = flow(client, citizen, role)
+            # Primeira passada aquece o cache de sessão.
+            for method, url in steps:
+                getattr(client, method.lower())(url)
+            steps = flow(client, citizen, role + "-2")
+
+            total = session = 0
+            for method, url in steps:
+                with CaptureQueriesContext(connection) as ctx:
+                    getattr(client, method.lower())(url, follow=True)
+                total += len(ctx.captured_queries)
+                session += sum(
+                    "django_session" in q["sql"] for q in ctx.captured_queries
+                )
+            results[role] = (total / len(steps), session / len(steps))
+        transaction.set_rollback(True)
+    return results
+
+
+def main():
+    # Como no TestCase do Django: a conexão não pode ser fechada ao fim de
+    # cada requisição, senão a transação de measure() se perde.
+    request_finished.disconnect(close_old_connections)
+    make_user("bench-citizen", "C")
+    # Cada passo inclui a página para a qual a requisição redireciona.
+    print(f"{'configuração':<34}{'perfil':<14}{'SQL/passo':>10}{'sessão/passo':>14}")
+    for name, settings in CONFIGS.items():
+        for role, (total, session) in measure(name, settings).items():
+            print(f"{name:<34}{role:<14}{total:>10.1f}{session:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark de contenção de escrita no SQLite.
+
+Simula vários workers aceitando coletas ao mesmo tempo (ler o status e
+depois atualizar, como em `accept_collection`) e compara a configuração
+padrão do Django com a configuração de Rec/database.py.
+
+Uso (a partir de Rec/):
+    python benchmarks/sqlite_write_contention.py --workers 8 --ops 300
+"""
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Rec.database import sqlite_database  # noqa: E402
+
+ROWS = 1000
+
+
+def connection_kwargs(mode, path):
+    """
+    Replica o que o backend sqlite3 do Django faz com `OPTIONS`.
+    """
+    if mode == "default":
+        return {"database": path}, [], None
+    options = dict(sqlite_database(path)["OPTIONS"])
+    init_commands = [c for c in options.pop("init_command").split(";") if c.strip()]
+    transaction_mode = options.pop("transaction_mode")
+    return {"database": path, **options}, init_commands, transaction_mode
+
+
+def setup_database(mode, path):
+    kwargs, init_commands, _ = connection_kwargs(mode, path)
+    conn = sqlite3.connect(**kwargs)
+    for command in init_commands:
+        conn.execute(command)
+    conn.execute(
+        "CREATE TABLE collection (id INTEGER PRIMARY KEY, status TEXT, collector INTEGER)"
+    )
+    conn.execute(
+        "CREATE TABLE points (id INTEGER PRIMARY KEY, user_id INTEGER, points INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO collection (id, status, collector) VALUES (?, 'SOLICITADA', NULL)",
+        [(i,) for i in range(ROWS)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def worker(mode, path, worker_id, ops, results):
+    kwargs, init_commands, transaction_mode = connection_kwargs(mode, path)
+    conn = sqlite3.connect(isolation_level=None, **kwargs)
+    for command in init_commands:
+        conn.execute(command)
+    begin = f"BEGIN {transaction_mode}" if transaction_mode else "BEGIN"
+
+    ok = locked = 0
+    for i in range(ops):
+        collection_id = (worker_id * ops + i) % ROWS
+        try:
+            conn.execute(begin)
+            conn.execute(
+                "SELECT status FROM collection WHERE id = ?", (collection_id,)
+            ).fetchone()
+            conn.execute(
+                "UPDATE collection SET status = 'ATRIBUIDA', collector = ? WHERE id = ?",
+                (worker_id, collection_id),
+            )
+            conn.execute(
+                "INSERT INTO points (user_id, points) VALUES (?, 10)", (worker_id,)
+            )
+            conn.execute("COMMIT")
+            ok += 1
+        except sqlite3.OperationalError as exc:
+            if "locked" not in str(exc) and "busy" not in str(exc):
+                raise
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            locked += 1
+    conn.close()
+    results.put((ok, locked))
+
+
+def run(mode, workers, ops):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"{mode}.sqlite3")
+        setup_database(mode, path)
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(mode, path, w, ops, results))
+            for w in range(workers)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+    ok = sum(t[0] for t in totals)
+    locked = sum(t[1] for t in totals)
+    return ok, locked, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers x {args.ops} transações")
+    print(f"{'modo':<10}{'ok':>8}{'locked':>8}{'tempo (s)':>12}{'tx/s':>10}")
+    for mode in ("default", "tuned"):
+        ok, locked, elapsed = run(mode, args.workers, args.ops)
+        print(f"{mode:<10}{ok:>8}{locked:>8}{elapsed:>12.2f}{ok / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
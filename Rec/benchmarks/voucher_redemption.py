@@ -0,0 +1,133 @@
+"""
+Teste de carga de resgate de recompensa com códigos de voucher.
+
+Gera (e importa) o lote de códigos e mede quantos entram por segundo; em
+seguida centenas de cidadãos resgatam ao mesmo tempo uma recompensa com
+menos códigos que cidadãos. Verifica que nenhum código sai duas vezes,
+que todo resgate aceito tem código e que quem ficou sem código não perdeu
+pontos.
+
+Uso (a partir de Rec/):
+    python benchmarks/voucher_redemption.py --citizens 500 --codes 200 --threads 64
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count, Sum  # noqa: E402
+
+from reciclAI import vouchers  # noqa: E402
+from reciclAI.models import Profile, Reward, UserReward, VoucherCode  # noqa: E402
+from reciclAI.rewards import RedemptionError, redeem_reward  # noqa: E402
+
+COST = 50
+START_POINTS = 120
+
+
+def setup_data(citizens):
+    User.objects.bulk_create(
+        [User(username=f"citizen{i}", password="!") for i in range(citizens)]
+    )
+    users = list(User.objects.filter(username__startswith="citizen"))
+    Profile.objects.bulk_create(
+        [Profile(user=user, user_type="C", points=START_POINTS) for user in users]
+    )
+    reward = Reward.objects.create(
+        name="Ingresso de cinema",
+        points_required=COST,
+        max_per_user=1,
+        uses_vouchers=True,
+    )
+    return users, reward
+
+
+def fill_pool(reward, codes, bulk):
+    """
+    Gera `codes` códigos para `reward` e importa `bulk` códigos para outra
+    recompensa. Retorna (gerados/s, importados/s).
+    """
+    start = time.perf_counter()
+    vouchers.generate(reward, codes)
+    generate_rate = codes / (time.perf_counter() - start)
+
+    other = Reward.objects.create(
+        name="Lote importado", points_required=COST, uses_vouchers=True
+    )
+    lines = (f"PARCEIRO-{i:08d}\n" for i in range(bulk))
+    start = time.perf_counter()
+    stats = vouchers.import_codes(other, lines)
+    import_rate = stats["added"] / (time.perf_counter() - start)
+    return generate_rate, import_rate
+
+
+def attempt(user, reward_id):
+    try:
+        reward = Reward.objects.get(id=reward_id)
+        return redeem_reward(user, reward).voucher.code
+    except RedemptionError:
+        return None
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--citizens", type=int, default=500)
+    parser.add_argument("--codes", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument(
+        "--bulk", type=int, default=100_000, help="Códigos da importação."
+    )
+    args = parser.parse_args()
+
+    users, reward = setup_data(args.citizens)
+    generate_rate, import_rate = fill_pool(reward, args.codes, args.bulk)
+    connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(lambda u: attempt(u, reward.id), users))
+    elapsed = time.perf_counter() - start
+
+    codes = [code for code in results if code]
+    redeemed = UserReward.objects.filter(reward=reward).count()
+    claimed = VoucherCode.objects.filter(reward=reward, claimed_at__isnull=False)
+    per_code_max = max(
+        claimed.values("code").annotate(n=Count("id")).values_list("n", flat=True),
+        default=0,
+    )
+    without_code = UserReward.objects.filter(
+        reward=reward, voucher__isnull=True
+    ).count()
+    points_spent = (
+        args.citizens * START_POINTS
+        - Profile.objects.filter(user__in=users).aggregate(total=Sum("points"))["total"]
+    )
+
+    print(f"geração:                {generate_rate:.0f} códigos/s")
+    print(f"importação:             {import_rate:.0f} códigos/s ({args.bulk})")
+    print(f"{args.citizens} cidadãos, {args.codes} códigos, {args.threads} threads")
+    print(f"resgates aceitos:       {len(codes)}")
+    print(f"códigos distintos:      {len(set(codes))}")
+    print(f"UserReward gravados:    {redeemed}")
+    print(f"resgates sem código:    {without_code}")
+    print(f"pontos debitados:       {points_spent} (esperado {redeemed * COST})")
+    print(f"tempo:                  {elapsed:.2f}s")
+    print(f"resgates/s:             {len(codes) / elapsed:.0f}")
+
+    assert len(codes) == redeemed == claimed.count() <= args.codes
+    assert len(set(codes)) == len(codes) and per_code_max <= 1, "código repetido"
+    assert without_code == 0, "resgate sem código"
+    assert points_spent == redeemed * COST, "pontos debitados sem resgate"
+    print("OK: nenhum código entregue duas vezes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark da importação de pesagens (reciclAI.weighing).
+
+Cria N coletas entregues a uma recicladora, grava um arquivo CSV (e um
+NDJSON) com uma leitura por coleta e mede:
+
+1. a importação em lotes (uma consulta, um INSERT e um UPDATE por lote) e
+   o pico de memória do Python;
+2. a mesma gravação coleta a coleta (um UPDATE por leitura), numa amostra.
+
+Uso (a partir de Rec/):
+    python benchmarks/weighing_ingest.py --readings 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+
+import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import transaction  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from reciclAI import weighing  # noqa: E402
+from reciclAI.models import Collection, Profile, Residue, ResidueType  # noqa: E402
+
+
+def ingest_file(path, recycler, batch_size, trace=False):
+    # tracemalloc deixa o Python bem mais lento: o pico é medido à parte.
+    if trace:
+        tracemalloc.start()
+    with open(path, encoding="utf-8-sig", newline="") as lines:
+        report = weighing.ingest(lines, recycler, batch_size)
+    if trace:
+        report["peak"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readings", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=weighing.BATCH_SIZE)
+    parser.add_argument("--naive-sample", type=int, default=2000)
+    args = parser.parse_args()
+    random.seed(42)
+
+    citizen = User.objects.create_user("cidadao")
+    recycler = User.objects.create_user("recicladora")
+    Profile.objects.filter(user=recycler).update(user_type="R")
+    paper = ResidueType.objects.first()
+    residues = Residue.objects.bulk_create(
+        (
+            Residue(
+                citizen=citizen,
+                residue_type=paper,
+                weight=Decimal(random.randint(10, 500)) / 10,
+                location="Rua",
+                status="COLETA_SOLICITADA",
+            )
+            for _ in range(args.readings)
+        ),
+        batch_size=1000,
+    )
+    collections = Collection.objects.bulk_create(
+        (
+            Collection(
+                residue=residue,
+                recycler=recycler,
+                status="ENTREGUE_RECICLADORA",
+                delivered_at=timezone.now(),
+            )
+            for residue in residues
+        ),
+        batch_size=1000,
+    )
+    readings = [
+        (collection.id, residue.weight * Decimal(random.uniform(0.7, 1.3)))
+        for collection, residue in zip(collections, residues)
+    ]
+    directory = tempfile.mkdtemp(prefix="reciclai-pesagens-")
+    csv_path = os.path.join(directory, "pesagens.csv")
+    with open(csv_path, "w") as file:
+        file.write("coleta,peso\n")
+        file.writelines(f"{cid},{weight:.2f}\n" for cid, weight in readings)
+    ndjson_path = os.path.join(directory, "pesagens.ndjson")
+    with open(ndjson_path, "w") as file:
+        file.writelines(
+            json.dumps({"coleta": cid, "peso": f"{weight:.2f}"}) + "\n"
+            for cid, weight in readings
+        )
+    size = os.path.getsize(csv_path) / 1024 / 1024
+
+    for label, path in [("CSV", csv_path), ("NDJSON", ndjson_path)]:
+        report = ingest_file(path, recycler, args.batch_size)
+        print(
+            f"{label}: {report['weighed']} coletas em {report['seconds']:.2f}s "
+            f"({report['weighed'] / report['seconds']:.0f}/s), "
+            f"diferença {report['difference']} kg"
+        )
+    peak = ingest_file(csv_path, recycler, args.batch_size, trace=True)["peak"]
+    print(f"pico de memória com um CSV de {size:.1f} MB: {peak / 1024 / 1024:.1f} MB")
+
+    sample = readings[: args.naive_sample]
+    start = time.perf_counter()
+    with transaction.atomic():
+        for collection_id, weight in sample:
+            Collection.objects.filter(id=collection_id).update(
+                measured_weight=weight.quantize(Decimal("0.01")),
+                weighed_at=timezone.now(),
+            )
+    seconds = time.perf_counter() - start
+    print(
+        f"coleta a coleta: {len(sample)} em {seconds:.2f}s "
+        f"(~{seconds * args.readings / len(sample):.1f}s para {args.readings})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark de escritas sob sobrecarga, com e sem ThrottleMiddleware.
+
+Dezenas de cidadãos disparam resgates em sequência, com só `--pause`
+entre uma resposta e o próximo envio (cliques repetidos / tentativas
+automáticas), enquanto um cidadão "comum" cadastra resíduos a cada 100 ms
+(uma escrita sem limite por usuário). Mede latência (p50/p99) das
+requisições da tempestade e das do cidadão comum, além de quantas foram
+aceitas ou recusadas.
+
+Tudo roda num só processo: as threads disputam o GIL, então a pausa
+simula a ida e volta pela rede que um servidor real teria.
+
+Uso (a partir de Rec/):
+    python benchmarks/write_overload.py --threads 48 --seconds 10
+"""
+
+import argparse
+import logging
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import _django
+
+_django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from reciclAI.models import Profile, Reward  # noqa: E402
+
+logging.getLogger("reciclAI.perf").setLevel(logging.WARNING)
+
+WITHOUT_THROTTLE = [
+    m for m in settings.MIDDLEWARE if m != "reciclAI.middleware.ThrottleMiddleware"
+]
+
+
+def setup_data(count):
+    User.objects.bulk_create(
+        [User(username=f"storm{i}", password="!") for i in range(count + 1)]
+    )
+    users = list(User.objects.filter(username__startswith="storm").order_by("id"))
+    Profile.objects.bulk_create(
+        [Profile(user=user, user_type="C", points=10**9) for user in users]
+    )
+    reward = Reward.objects.create(name="Brinde", points_required=1)
+    return users[:-1], users[-1], reward
+
+
+def percentile(samples, fraction):
+    return sorted(samples)[int(len(samples) * fraction) - 1] if samples else 0.0
+
+
+def storm(user, url, deadline, pause, results):
+    client = Client()
+    client.force_login(user)
+    try:
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            status = client.post(url).status_code
+            results.append((status, (time.perf_counter() - start) * 1000))
+            time.sleep(pause)
+    finally:
+        connection.close()
+
+
+def bystander(user, deadline, results):
+    client = Client()
+    client.force_login(user)
+    url = reverse("reciclAI:residue_create")
+    data = {"residue_type": "Vidro", "units": 1, "location": "Rua A"}
+    try:
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            status = client.post(url, data).status_code
+            results.append((status, (time.perf_counter() - start) * 1000))
+            time.sleep(0.1)
+    finally:
+        connection.close()
+
+
+def run(label, middleware, users, quiet_user, reward, args):
+    cache.clear()
+    url = reverse("reciclAI:redeem_reward", args=[reward.id])
+    storm_results, quiet_results = [], []
+    with override_settings(MIDDLEWARE=middleware):
+        deadline = time.monotonic() + args.seconds
+        with ThreadPoolExecutor(max_workers=len(users) + 1) as pool:
+            pool.submit(bystander, quiet_user, deadline, quiet_results)
+            for user in users:
+                pool.submit(storm, user, url, deadline, args.pause, storm_results)
+
+    statuses = Counter(status for status, _ in storm_results)
+    latencies = [ms for _, ms in storm_results]
+    accepted = [ms for status, ms in storm_results if status == 302]
+    quiet = [ms for _, ms in quiet_results]
+    print(f"--- {label}")
+    print(f"requisições:         {len(storm_results)} {dict(sorted(statuses.items()))}")
+    print(
+        f"todas    p50 {statistics.median(latencies):7.1f} ms"
+        f"  p99 {percentile(latencies, 0.99):7.1f} ms"
+    )
+    if accepted:
+        print(
+            f"aceitas  p50 {statistics.median(accepted):7.1f} ms"
+            f"  p99 {percentile(accepted, 0.99):7.1f} ms"
+        )
+    print(
+        f"cidadão comum p50 {statistics.median(quiet):7.1f} ms"
+        f"  p99 {percentile(quiet, 0.99):7.1f} ms"
+        f"  ({len(quiet)} cadastros, status {dict(Counter(s for s, _ in quiet_results))})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=48)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument(
+        "--pause", type=float, default=0.2, help="Segundos entre tentativas."
+    )
+    args = parser.parse_args()
+
+    users, quiet_user, reward = setup_data(args.threads)
+    connection.close()
+    run("sem limites", WITHOUT_THROTTLE, users, quiet_user, reward, args)
+    run(
+        "com ThrottleMiddleware",
+        settings.MIDDLEWARE,
+        users,
+        quiet_user,
+        reward,
+        args,
+    )
+
+
+if __name__ == "__main__":
+    main()
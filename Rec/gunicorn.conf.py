@@ -0,0 +1,50 @@
+"""
+Configuração do gunicorn para produção (a partir de Rec/):
+
+    gunicorn
+
+Importar Rec/wsgi.py já aquece a aplicação (reciclAI/warmup.py). Com
+`preload_app` isso acontece uma vez no processo mestre e os workers são
+criados por fork já com rotas, templates, regras de pontuação e índice de
+tipos prontos. Cada worker abre as próprias conexões antes de aceitar
+requisições: na thread principal e, com GUNICORN_THREADS > 1 (workers
+gthread), em cada thread do pool que atende as requisições.
+
+Variáveis de ambiente: PORT, WEB_CONCURRENCY (workers), GUNICORN_THREADS,
+GUNICORN_TIMEOUT e DJANGO_PRELOAD=False para desativar o preload (aí cada
+worker se aquece sozinho ao importar a aplicação).
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = "Rec.wsgi:application"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(
+    os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 9))
+)
+threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+preload_app = os.environ.get("DJANGO_PRELOAD", "True") == "True"
+# Recicla workers aos poucos para limitar o crescimento de memória.
+max_requests = 5000
+max_requests_jitter = 500
+accesslog = "-"
+
+
+def post_worker_init(worker):
+    from reciclAI import warmup
+
+    warmup.connect()
+    # Workers gthread: conexões são por thread.
+    pool = getattr(worker, "tpool", None)
+    if pool is not None:
+        warmup.connect_pool(pool, worker.cfg.threads)
+
+
+def child_exit(server, worker):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        # Descarta os gauges "live" do worker que saiu.
+        multiprocess.mark_process_dead(worker.pid)
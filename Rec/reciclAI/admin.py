@@ -1,9 +1,329 @@
-from django.contrib import admin
-from .models import Profile, Residue, Collection, Reward, UserReward, PointsTransaction
-
-admin.site.register(Profile)
-admin.site.register(Residue)
-admin.site.register(Collection)
-admin.site.register(Reward)
-admin.site.register(UserReward)
-admin.site.register(PointsTransaction)
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F
+from django.shortcuts import render
+from django.utils.functional import cached_property
+from .models import (
+    Profile,
+    Residue,
+    Collection,
+    Reward,
+    UserReward,
+    PointsTransaction,
+    PointsRule,
+    PointsCampaign,
+    ResidueType,
+    PickupSlot,
+    VoucherCode,
+)
+from . import processing, search, vouchers
+
+admin.site.register(PointsRule)
+admin.site.register(PointsCampaign)
+admin.site.register(ResidueType)
+
+
+# Abaixo disso a contagem exata é barata o bastante.
+ESTIMATE_THRESHOLD = 10_000
+
+
+def estimated_row_count(model, using):
+    """
+    Número aproximado de linhas da tabela sem COUNT(*): reltuples no
+    PostgreSQL, maior rowid no SQLite (exato enquanto não houver exclusões).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(table)],
+            )
+        elif connection.vendor == "sqlite":
+            cursor.execute(f"SELECT max(rowid) FROM {connection.ops.quote_name(table)}")
+        else:
+            return None
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginador do admin que, sem filtros, usa a contagem aproximada da tabela
+    quando ela é grande; com filtros, conta normalmente (pelos índices).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Base para tabelas grandes: sem o segundo COUNT(*) do total e com a
+    contagem aproximada acima.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class FullTextSearchMixin:
+    """
+    Troca a busca do admin (icontains em cada campo) pela tabela FTS de
+    resíduos, quando disponível. `fts_residue_field` aponta o id do resíduo.
+    """
+
+    fts_residue_field = "id"
+
+    def get_search_results(self, request, queryset, search_term):
+        ids = search.matching_residue_ids(search_term)
+        if ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(**{f"{self.fts_residue_field}__in": ids}), False
+
+
+@admin.register(Profile)
+class ProfileAdmin(LargeTableAdmin):
+    list_display = ["user", "user_type", "points"]
+    list_select_related = ["user"]
+    list_filter = ["user_type"]
+    raw_id_fields = ["user"]
+    search_fields = ["=user__username"]
+
+
+@admin.register(Residue)
+class ResidueAdmin(FullTextSearchMixin, LargeTableAdmin):
+    list_display = ["id", "residue_type", "citizen", "location", "status"]
+    list_select_related = ["residue_type", "citizen"]
+    list_filter = ["residue_type"]
+    raw_id_fields = ["citizen"]
+    search_fields = ["location", "residue_type__name"]
+    readonly_fields = ["photo_thumbnails", "photo_processed_at"]
+
+    def save_model(self, request, obj, form, change):
+        # Foto trocada: volta para a fila de miniaturas.
+        if "photo" in form.changed_data:
+            obj.photo_thumbnails = {}
+            obj.photo_processed_at = None
+        super().save_model(request, obj, form, change)
+
+
+class ReassignForm(forms.Form):
+    collector = forms.CharField(label="Usuário do coletor")
+
+    def clean_collector(self):
+        username = self.cleaned_data["collector"]
+        collector = User.objects.filter(
+            username=username, profile__user_type="L"
+        ).first()
+        if collector is None:
+            raise forms.ValidationError("Coletor não encontrado.")
+        return collector
+
+
+@admin.register(Collection)
+class CollectionAdmin(FullTextSearchMixin, LargeTableAdmin):
+    list_display = [
+        "id",
+        "residue_type",
+        "citizen",
+        "collector",
+        "recycler",
+        "status",
+        "measured_weight",
+        "created_at",
+        "processed_at",
+    ]
+    list_select_related = [
+        "residue__residue_type",
+        "residue__citizen",
+        "collector",
+        "recycler",
+    ]
+    list_filter = ["status"]
+    raw_id_fields = ["residue", "collector", "recycler", "slot"]
+    search_fields = ["residue__location", "residue__residue_type__name"]
+    fts_residue_field = "residue_id"
+    date_hierarchy = "created_at"
+    actions = ["process_selected", "cancel_selected", "reassign_selected"]
+
+    @admin.display(description="Tipo de resíduo")
+    def residue_type(self, collection):
+        return collection.residue.residue_type.name
+
+    @admin.display(description="Cidadão")
+    def citizen(self, collection):
+        return collection.residue.citizen.username
+
+    @admin.action(description="Processar coletas entregues selecionadas")
+    def process_selected(self, request, queryset):
+        processed, points = processing.process_collections(queryset)
+        self.message_user(
+            request,
+            f"{processed} coleta(s) processada(s), {points} pontos concedidos.",
+        )
+
+    @admin.action(description="Cancelar coletas em aberto selecionadas")
+    def cancel_selected(self, request, queryset):
+        cancelled = processing.cancel_collections(queryset)
+        self.message_user(request, f"{cancelled} coleta(s) cancelada(s).")
+
+    @admin.action(description="Reatribuir coletas em aberto a outro coletor")
+    def reassign_selected(self, request, queryset):
+        form = ReassignForm(request.POST if "apply" in request.POST else None)
+        if form.is_valid():
+            collector = form.cleaned_data["collector"]
+            reassigned = processing.reassign_collections(queryset, collector)
+            self.message_user(
+                request,
+                f"{reassigned} coleta(s) reatribuída(s) a {collector.username}.",
+            )
+            return None
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "form": form,
+            "queryset": queryset,
+            "selected": request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            "select_across": request.POST.get("select_across", "0"),
+        }
+        return render(request, "admin/reciclAI/collection/reassign.html", context)
+
+
+class VoucherStockFilter(admin.SimpleListFilter):
+    title = "vouchers"
+    parameter_name = "vouchers"
+
+    def lookups(self, request, model_admin):
+        return [("baixo", "Abaixo do alerta"), ("esgotado", "Esgotados")]
+
+    def queryset(self, request, queryset):
+        if self.value() == "baixo":
+            return queryset.filter(
+                uses_vouchers=True, free_vouchers__lt=F("voucher_alert_below")
+            )
+        if self.value() == "esgotado":
+            return queryset.filter(uses_vouchers=True, free_vouchers=0)
+        return queryset
+
+
+class GenerateVouchersForm(forms.Form):
+    count = forms.IntegerField(label="Quantidade por recompensa", min_value=1)
+    length = forms.IntegerField(
+        label="Tamanho", min_value=6, max_value=32, initial=vouchers.CODE_LENGTH
+    )
+    prefix = forms.CharField(label="Prefixo", max_length=16, required=False)
+
+
+@admin.register(Reward)
+class RewardAdmin(admin.ModelAdmin):
+    list_display = [
+        "name",
+        "points_required",
+        "is_active",
+        "stock",
+        "uses_vouchers",
+        "free_vouchers",
+    ]
+    list_filter = ["is_active", VoucherStockFilter]
+    actions = ["generate_vouchers"]
+
+    def get_queryset(self, request):
+        return vouchers.with_free_counts(super().get_queryset(request))
+
+    @admin.display(description="Vouchers livres", ordering="free_vouchers")
+    def free_vouchers(self, reward):
+        return reward.free_vouchers if reward.uses_vouchers else "-"
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method == "GET":
+            low = [
+                f"{reward.name} ({reward.free_vouchers})"
+                for reward in vouchers.low_stock()
+            ]
+            if low:
+                self.message_user(
+                    request,
+                    f"Vouchers abaixo do alerta: {', '.join(low)}.",
+                    messages.WARNING,
+                )
+        return super().changelist_view(request, extra_context)
+
+    @admin.action(description="Gerar códigos de voucher")
+    def generate_vouchers(self, request, queryset):
+        form = GenerateVouchersForm(request.POST if "apply" in request.POST else None)
+        if form.is_valid():
+            rewards = list(queryset)
+            added = sum(
+                vouchers.generate(
+                    reward,
+                    form.cleaned_data["count"],
+                    form.cleaned_data["length"],
+                    form.cleaned_data["prefix"],
+                )
+                for reward in rewards
+            )
+            Reward.objects.filter(id__in=[reward.id for reward in rewards]).update(
+                uses_vouchers=True
+            )
+            self.message_user(request, f"{added} código(s) gerado(s).")
+            return None
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "form": form,
+            "queryset": queryset,
+            "selected": request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            "select_across": request.POST.get("select_across", "0"),
+        }
+        return render(request, "admin/reciclAI/reward/generate_vouchers.html", context)
+
+
+@admin.register(VoucherCode)
+class VoucherCodeAdmin(LargeTableAdmin):
+    list_display = ["code", "reward", "claimed_at", "user_reward"]
+    list_select_related = ["reward", "user_reward__user", "user_reward__reward"]
+    list_filter = ["reward"]
+    raw_id_fields = ["user_reward"]
+    search_fields = ["=code"]
+    # Preenchidos só pelo resgate (vouchers.claim).
+    readonly_fields = ["claimed_at", "user_reward"]
+
+
+@admin.register(PickupSlot)
+class PickupSlotAdmin(admin.ModelAdmin):
+    list_display = ["area", "date", "start_time", "end_time", "booked", "capacity"]
+    list_filter = ["area"]
+    date_hierarchy = "date"
+    # Alterado só pelas reservas e cancelamentos (scheduling.py).
+    readonly_fields = ["booked"]
+
+
+@admin.register(PointsTransaction)
+class PointsTransactionAdmin(LargeTableAdmin):
+    list_display = ["user", "points_gained", "description", "transaction_date"]
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+    search_fields = ["=user__username"]
+    date_hierarchy = "transaction_date"
+
+
+@admin.register(UserReward)
+class UserRewardAdmin(LargeTableAdmin):
+    list_display = ["user", "reward", "date_redeemed"]
+    list_select_related = ["user", "reward"]
+    list_filter = ["reward"]
+    raw_id_fields = ["user"]
+    search_fields = ["=user__username"]
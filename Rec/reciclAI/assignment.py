@@ -0,0 +1,250 @@
+"""
+Atribuição automática de coletas SOLICITADA a coletores (opcional, veja
+AUTO_ASSIGN_ENABLED e o comando `assign_collections`).
+
+Participam as coletas com coordenadas e os coletores com base definida e
+`assignment_capacity` > 0; cada coletor recebe no máximo a capacidade
+menos as coletas que já tem em ATRIBUIDA/EM_ROTA. As demais coletas
+continuam disponíveis no painel.
+
+O algoritmo é guloso: para cada coleta, os K coletores mais próximos
+(dentro de AUTO_ASSIGN_MAX_KM, achados por uma grade) viram arestas; as
+arestas são atendidas da mais curta para a mais longa enquanto houver
+capacidade, e as coletas que sobrarem procuram o coletor livre mais
+próximo. Coletas esperando há mais tempo ganham um desconto na ordem de
+atendimento (AGE_BONUS_KM_PER_HOUR), para que as distantes não fiquem
+sempre para trás.
+
+Tudo é aplicado num UPDATE com CASE (por lote de até CHUNK_SIZE coletas),
+condicionado a status SOLICITADA: coletas aceitas no painel durante o
+cálculo ficam de fora, também da distância total e de
+`reciclai_collections_claimed_total`.
+"""
+
+import heapq
+import math
+import time
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.utils import timezone
+
+from . import metrics, summary
+from .models import Collection, Profile
+
+KM_PER_DEGREE = 111.32
+CANDIDATES = 8
+AGE_BONUS_KM_PER_HOUR = 0.5
+# Limite de parâmetros do SQLite (32766): cada coleta usa dois.
+CHUNK_SIZE = 10_000
+OPEN_STATUSES = ["ATRIBUIDA", "EM_ROTA"]
+
+
+class Grid:
+    """
+    Coletores em células quadradas de `cell_km`, em coordenadas planas (km)
+    aproximadas em torno de `origin_lat` (suficiente na escala de uma
+    cidade).
+    """
+
+    def __init__(self, cell_km, origin_lat):
+        self.cell_km = cell_km
+        self.x_scale = KM_PER_DEGREE * math.cos(math.radians(origin_lat))
+        self.cells = defaultdict(set)
+
+    def project(self, lat, lon):
+        return lon * self.x_scale, lat * KM_PER_DEGREE
+
+    def cell(self, x, y):
+        return int(x // self.cell_km), int(y // self.cell_km)
+
+    def add(self, index, x, y):
+        self.cells[self.cell(x, y)].add(index)
+
+    def remove(self, index, x, y):
+        self.cells[self.cell(x, y)].discard(index)
+
+    def nearest(self, x, y, points, k, max_km):
+        """
+        Até `k` pares (distância, índice) mais próximos de (x, y), dentro
+        de `max_km`, em anéis de células crescentes.
+        """
+        cx, cy = self.cell(x, y)
+        found = []
+        max_ring = math.ceil(max_km / self.cell_km)
+        for ring in range(max_ring + 1):
+            for i in range(cx - ring, cx + ring + 1):
+                for j in range(cy - ring, cy + ring + 1):
+                    if max(abs(i - cx), abs(j - cy)) != ring:
+                        continue
+                    for index in self.cells.get((i, j), ()):
+                        px, py = points[index]
+                        distance = math.hypot(px - x, py - y)
+                        if distance <= max_km:
+                            found.append((distance, index))
+            # Tudo a menos de `ring` células já foi visto.
+            if len(found) >= k and sorted(found)[k - 1][0] <= ring * self.cell_km:
+                break
+        return heapq.nsmallest(k, found)
+
+
+def solve(pickups, collectors, max_km, now=None):
+    """
+    `pickups`: [(id, lat, lon, created_at)]; `collectors`: [(user_id, lat,
+    lon, vagas)]. Retorna {pickup_id: (user_id, km)}.
+    """
+    if not pickups or not collectors:
+        return {}
+    now = now or timezone.now()
+    origin_lat = sum(lat for _, lat, _, _ in collectors) / len(collectors)
+    grid = Grid(max(max_km / 10, 0.5), origin_lat)
+    points = [grid.project(lat, lon) for _, lat, lon, _ in collectors]
+    free = [slots for _, _, _, slots in collectors]
+    for index, (x, y) in enumerate(points):
+        grid.add(index, x, y)
+
+    def take(pickup_index, collector_index, distance):
+        pickup_id = pickups[pickup_index][0]
+        result[pickup_id] = (collectors[collector_index][0], distance)
+        free[collector_index] -= 1
+        if not free[collector_index]:
+            grid.remove(collector_index, *points[collector_index])
+
+    result = {}
+    positions = [grid.project(lat, lon) for _, lat, lon, _ in pickups]
+    edges = []
+    for pickup_index, (x, y) in enumerate(positions):
+        hours = (now - pickups[pickup_index][3]).total_seconds() / 3600
+        bonus = AGE_BONUS_KM_PER_HOUR * hours
+        for distance, collector_index in grid.nearest(x, y, points, CANDIDATES, max_km):
+            edges.append((distance - bonus, distance, pickup_index, collector_index))
+    edges.sort()
+    assigned = set()
+    for _, distance, pickup_index, collector_index in edges:
+        if pickup_index not in assigned and free[collector_index]:
+            take(pickup_index, collector_index, distance)
+            assigned.add(pickup_index)
+
+    # Os K mais próximos lotaram: procura o coletor livre mais próximo.
+    for pickup_index, (x, y) in enumerate(positions):
+        if not any(free):
+            break
+        if pickup_index in assigned:
+            continue
+        nearest = grid.nearest(x, y, points, 1, max_km)
+        if nearest:
+            distance, collector_index = nearest[0]
+            take(pickup_index, collector_index, distance)
+            assigned.add(pickup_index)
+    return result
+
+
+def load_candidates():
+    """
+    Coletas SOLICITADA com coordenadas e coletores com vagas, no formato
+    de `solve()`, mais {coleta: cidadão} para os resumos.
+    """
+    rows = list(
+        Collection.objects.filter(
+            status="SOLICITADA",
+            residue__latitude__isnull=False,
+            residue__longitude__isnull=False,
+        ).values_list(
+            "id",
+            "residue__latitude",
+            "residue__longitude",
+            "created_at",
+            "residue__citizen_id",
+        )
+    )
+    pickups = [row[:4] for row in rows]
+    citizens = {row[0]: row[4] for row in rows}
+
+    profiles = Profile.objects.filter(
+        user_type="L",
+        user__is_active=True,
+        assignment_capacity__gt=0,
+        latitude__isnull=False,
+        longitude__isnull=False,
+    )
+    load = dict(
+        Collection.objects.filter(
+            collector__profile__in=profiles, status__in=OPEN_STATUSES
+        )
+        .order_by()
+        .values_list("collector_id")
+        .annotate(n=Count("id"))
+    )
+    collectors = []
+    for user_id, lat, lon, capacity in profiles.values_list(
+        "user_id", "latitude", "longitude", "assignment_capacity"
+    ):
+        slots = capacity - load.get(user_id, 0)
+        if slots > 0:
+            collectors.append((user_id, lat, lon, slots))
+    return pickups, collectors, citizens
+
+
+def apply(assignments, citizens):
+    """
+    Grava {coleta: (coletor, km)}. Retorna (coletas que mudaram, soma dos
+    km delas): coletas aceitas no painel durante o cálculo não contam.
+    """
+    ids = list(assignments)
+    changed = 0
+    total_km = 0.0
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start : start + CHUNK_SIZE]
+        with transaction.atomic():
+            # Na mesma transação do UPDATE (linhas travadas no PostgreSQL; o
+            # SQLite já abre a transação com a trava de escrita).
+            open_ids = list(
+                Collection.objects.select_for_update()
+                .filter(id__in=chunk, status="SOLICITADA")
+                .values_list("id", flat=True)
+            )
+            if not open_ids:
+                continue
+            by_collector = defaultdict(list)
+            for collection_id in open_ids:
+                by_collector[assignments[collection_id][0]].append(collection_id)
+            updated = Collection.objects.filter(
+                id__in=open_ids, status="SOLICITADA"
+            ).update(
+                collector=Case(
+                    *[
+                        When(id__in=collection_ids, then=Value(user_id))
+                        for user_id, collection_ids in by_collector.items()
+                    ],
+                    output_field=IntegerField(),
+                ),
+                status="ATRIBUIDA",
+                updated_at=timezone.now(),
+            )
+            changed += updated
+            total_km += sum(assignments[i][1] for i in open_ids)
+            summary.invalidate(*by_collector, *(citizens[i] for i in open_ids))
+            transaction.on_commit(partial(metrics.COLLECTIONS_CLAIMED.inc, updated))
+    return changed, total_km
+
+
+def assign_open_collections(max_km=None):
+    """
+    Executa uma rodada: carrega, resolve e grava. Retorna {"pickups",
+    "collectors", "assigned", "total_km", "seconds"}.
+    """
+    start = time.perf_counter()
+    max_km = max_km or getattr(settings, "AUTO_ASSIGN_MAX_KM", 25)
+    pickups, collectors, citizens = load_candidates()
+    assignments = solve(pickups, collectors, max_km)
+    assigned, total_km = apply(assignments, citizens) if assignments else (0, 0.0)
+    return {
+        "pickups": len(pickups),
+        "collectors": len(collectors),
+        "assigned": assigned,
+        "total_km": total_km,
+        "seconds": time.perf_counter() - start,
+    }
@@ -0,0 +1,21 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import fragments, summary
+
+
+def user_summary(request):
+    """
+    `user_summary` para a barra de navegação (veja summary.py). Só consulta
+    o cache se o template usar o valor.
+    """
+    if not request.user.is_authenticated:
+        return {}
+    return {"user_summary": SimpleLazyObject(lambda: summary.for_request(request))}
+
+
+def fragment_cache(request):
+    """
+    Validade e versão do catálogo para as chaves de {% cache %} (veja
+    fragments.py).
+    """
+    return {"fragment_cache": SimpleLazyObject(fragments.context)}
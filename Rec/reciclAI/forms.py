@@ -1,8 +1,13 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.db import transaction
-from .models import Profile, Residue, Collection
+from django.urls import reverse_lazy
+from django.utils import timezone
+from .models import Profile, Residue, Collection, ResidueType
+from .intake import recyclers
+from .residue_types import get_index
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -20,7 +25,8 @@ class CustomUserCreationForm(UserCreationForm):
 
     class Meta(UserCreationForm.Meta):
         model = User
-        fields = UserCreationForm.Meta.fields + ("user_type",)
+        fields = UserCreationForm.Meta.fields + ("email", "user_type")
+        help_texts = {"email": "Opcional. Usado para avisos sobre suas coletas."}
 
     @transaction.atomic
     def save(self, commit=True):
@@ -31,7 +37,49 @@ class CustomUserCreationForm(UserCreationForm):
         return user
 
 
+class ResidueTypeField(forms.CharField):
+    """
+    Campo de texto que aceita o nome ou um apelido de um tipo do catálogo
+    (sem diferenciar acentos e maiúsculas) e retorna o ResidueType.
+    """
+
+    def prepare_value(self, value):
+        if isinstance(value, ResidueType):
+            return value.name
+        if isinstance(value, int):
+            return get_index().names.get(value, value)
+        return value
+
+    def clean(self, value):
+        value = super().clean(value)
+        type_id = get_index().lookup(value)
+        if type_id is None:
+            raise forms.ValidationError(
+                "Tipo de resíduo desconhecido. Escolha uma das opções sugeridas."
+            )
+        try:
+            return ResidueType.objects.get(id=type_id, is_active=True)
+        except ResidueType.DoesNotExist:
+            # Índice de outro processo ainda sem a remoção ou desativação.
+            raise forms.ValidationError(
+                "Tipo de resíduo indisponível. Escolha uma das opções sugeridas."
+            )
+
+
 class ResidueForm(forms.ModelForm):
+    residue_type = ResidueTypeField(
+        label="Tipo de Resíduo",
+        max_length=100,
+        widget=forms.TextInput(
+            attrs={
+                "list": "residue-type-options",
+                "autocomplete": "off",
+                "data-autocomplete-url": reverse_lazy(
+                    "reciclAI:residue_type_autocomplete"
+                ),
+            }
+        ),
+    )
     collection_date = forms.DateField(
         label="Data para Coleta (Opcional)",
         widget=forms.DateInput(attrs={"type": "date"}),
@@ -40,18 +88,42 @@ class ResidueForm(forms.ModelForm):
 
     class Meta:
         model = Residue
-        fields = ["residue_type", "weight", "units", "location", "collection_date"]
+        fields = [
+            "residue_type",
+            "weight",
+            "units",
+            "location",
+            "latitude",
+            "longitude",
+            "collection_date",
+            "photo",
+        ]
+        widgets = {
+            # Preenchidos pelo botão "Usar minha localização".
+            "latitude": forms.HiddenInput,
+            "longitude": forms.HiddenInput,
+            "photo": forms.ClearableFileInput(attrs={"accept": "image/*"}),
+        }
         labels = {
             "residue_type": "Tipo de Resíduo",
             "weight": "Peso (kg)",
             "units": "Unidades",
             "location": "Endereço de Coleta",
+            "photo": "Foto (Opcional)",
         }
         help_texts = {
             "weight": "Informe um valor aproximado.",
+            "photo": "Ajuda o coletor a conferir o volume antes de aceitar.",
             "units": "Se aplicável (ex: garrafas PET).",
         }
 
+    def clean_photo(self):
+        photo = self.cleaned_data.get("photo")
+        if photo and photo.size > settings.RESIDUE_PHOTO_MAX_SIZE:
+            limit = settings.RESIDUE_PHOTO_MAX_SIZE // (1024 * 1024)
+            raise forms.ValidationError(f"A foto deve ter no máximo {limit} MB.")
+        return photo
+
     def clean(self):
         cleaned_data = super().clean()
         weight = cleaned_data.get("weight")
@@ -114,6 +186,13 @@ class CollectionStatusForm(forms.ModelForm):
                 "Esta coleta não pode mais ter seu status alterado por você."
             )
 
+        # A recicladora de destino só é escolhida na entrega.
+        if current_status == "COLETADA":
+            self.fields["recycler"].queryset = recyclers()
+            self.fields["recycler"].label_from_instance = lambda user: user.username
+        else:
+            del self.fields["recycler"]
+
     def clean_status(self):
         # Garante que a transição de status é válida
         current_status = self.instance.status
@@ -134,6 +213,16 @@ class CollectionStatusForm(forms.ModelForm):
 
         return next_status
 
+    def clean(self):
+        cleaned_data = super().clean()
+        if (
+            "recycler" in self.fields
+            and cleaned_data.get("status") == "ENTREGUE_RECICLADORA"
+            and not cleaned_data.get("recycler")
+        ):
+            self.add_error("recycler", "Informe a recicladora que recebeu a coleta.")
+        return cleaned_data
+
     def save(self, commit=True):
         # Atribui o coletor se a transição for de 'SOLICITADA' para 'ATRIBUIDA'
         if (
@@ -141,10 +230,63 @@ class CollectionStatusForm(forms.ModelForm):
             and self.cleaned_data.get("status") == "ATRIBUIDA"
         ):
             self.instance.collector = self.user
+        if (
+            self.initial.get("status") == "COLETADA"
+            and self.cleaned_data.get("status") == "ENTREGUE_RECICLADORA"
+        ):
+            self.instance.delivered_at = timezone.now()
 
         return super().save(commit)
 
     class Meta:
         model = Collection
-        fields = ["status"]
-        labels = {"status": "Atualizar Status da Coleta"}
+        fields = ["status", "recycler"]
+        labels = {
+            "status": "Atualizar Status da Coleta",
+            "recycler": "Recicladora de destino",
+        }
+
+
+class CollectorAssignmentForm(forms.ModelForm):
+    """
+    Participação do coletor na atribuição automática de coletas.
+    """
+
+    class Meta:
+        model = Profile
+        fields = ["assignment_capacity", "latitude", "longitude"]
+        labels = {
+            "assignment_capacity": "Coletas simultâneas que aceito receber",
+            "latitude": "Latitude da base",
+            "longitude": "Longitude da base",
+        }
+        help_texts = {
+            "assignment_capacity": "0 = não receber coletas automaticamente.",
+        }
+        widgets = {
+            "latitude": forms.NumberInput(attrs={"step": "any"}),
+            "longitude": forms.NumberInput(attrs={"step": "any"}),
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("assignment_capacity") and (
+            cleaned_data.get("latitude") is None
+            or cleaned_data.get("longitude") is None
+        ):
+            raise forms.ValidationError(
+                "Informe a localização da sua base para receber coletas automaticamente."
+            )
+        return cleaned_data
+
+
+class WeighingUploadForm(forms.Form):
+    """
+    Arquivo de leituras da balança (veja weighing.py).
+    """
+
+    file = forms.FileField(
+        label="Arquivo de pesagens",
+        help_text="CSV com as colunas coleta e peso (kg) ou NDJSON.",
+        widget=forms.ClearableFileInput(attrs={"accept": ".csv,.txt,.ndjson,.jsonl"}),
+    )
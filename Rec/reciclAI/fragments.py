@@ -0,0 +1,45 @@
+"""
+Cache de trechos das listas de coletas ({% cache %} nos templates).
+
+* Linhas: a chave leva o id da coleta, o `updated_at` da coleta e o do
+  resíduo (e, onde há miniatura, o `photo_processed_at` do resíduo). Toda
+  mudança de status grava `updated_at`, inclusive as operações em lote, e
+  editar o resíduo (endereço, tipo) grava o dele, então uma linha alterada
+  gera outra chave e as demais continuam no cache.
+* Seções inteiras de um usuário: a chave leva a versão do resumo da barra
+  de navegação (`user_summary.version`, veja summary.py), que já é
+  descartado no commit de cada escrita nas coletas do usuário. Num acerto
+  a consulta da lista nem é feita.
+* Nomes que aparecem nas linhas mas mudam fora delas (tipos de resíduo,
+  janelas, nomes de usuário) entram pela versão do catálogo, trocada nos
+  sinais.
+
+Formulários (csrf_token, chave de idempotência) ficam sempre fora dos
+trechos em cache.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = "fragments:catalog-version"
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def invalidate_catalog():
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def context():
+    return {
+        "max_age": getattr(settings, "FRAGMENT_CACHE_MAX_AGE", 3600),
+        "catalog": catalog_version(),
+    }
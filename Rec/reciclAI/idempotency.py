@@ -0,0 +1,136 @@
+"""
+Chaves de idempotência para escritas (POST).
+
+O cliente manda uma chave única por operação: o campo oculto
+`idempotency_key` dos formulários (tag `{% idempotency_key_field %}`) ou o
+cabeçalho `Idempotency-Key`. A primeira requisição com a chave grava um
+IdempotencyKey na mesma transação da view, junto com a resposta; reenvios
+(clique duplo, F5, nova tentativa após timeout) recebem a resposta gravada,
+com as mesmas mensagens, sem executar a view de novo.
+
+Dois envios simultâneos com a mesma chave disputam o INSERT do registro: o
+segundo espera o primeiro terminar (trava de escrita do SQLite ou índice
+único do PostgreSQL) e então repete a resposta dele. Se a view levantar uma
+exceção ou responder 5xx, o registro é desfeito e a chave pode ser usada de
+novo.
+
+Sem chave, a view roda normalmente.
+"""
+
+import re
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, HttpResponseRedirect
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+FIELD = "idempotency_key"
+KEY_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+def request_key(request):
+    """
+    Chave enviada pelo cliente ("" se nenhuma) ou None se for inválida.
+    """
+    key = request.META.get(HEADER) or request.POST.get(FIELD, "")
+    if key and not KEY_RE.match(key):
+        return None
+    return key
+
+
+def idempotent(view_func):
+    """
+    Decorator para views de escrita; deve ficar abaixo do decorator de
+    login (usa `request.user`).
+    """
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if request.method != "POST" or not request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+        key = request_key(request)
+        if key is None:
+            return HttpResponse("Chave de idempotência inválida.", status=400)
+        if not key:
+            return view_func(request, *args, **kwargs)
+
+        route = request.resolver_match.view_name
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user, key=key, route=route, status_code=0
+                    )
+            except IntegrityError:
+                record = IdempotencyKey.objects.get(user=request.user, key=key)
+                return replay(request, record, route)
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code >= 500 or response.streaming:
+                record.delete()
+            else:
+                store(request, record, response)
+        return response
+
+    return _wrapped_view
+
+
+def store(request, record, response):
+    record.status_code = response.status_code
+    record.location = response.get("Location", "")
+    record.content_type = response.get("Content-Type", "")
+    record.body = response.content.decode(response.charset, errors="replace")
+    # Só as mensagens adicionadas nesta requisição (as já recebidas em
+    # cookie ficam em _loaded_data).
+    record.messages = [
+        [message.level, message.message]
+        for message in getattr(messages.get_messages(request), "_queued_messages", [])
+    ]
+    record.save(
+        update_fields=["status_code", "location", "content_type", "body", "messages"]
+    )
+
+
+def replay(request, record, route):
+    if record.route != route:
+        return HttpResponse(
+            "Chave de idempotência já usada em outra operação.", status=422
+        )
+    if record.location:
+        response = HttpResponseRedirect(record.location, status=record.status_code)
+    else:
+        response = HttpResponse(
+            record.body, status=record.status_code, content_type=record.content_type
+        )
+    response["Idempotent-Replayed"] = "true"
+    for level, text in record.messages:
+        messages.add_message(request, level, text)
+    return response
+
+
+def delete_expired(batch_size=1000, now=None):
+    """
+    Apaga, em lotes, os registros mais antigos que
+    `settings.IDEMPOTENCY_KEY_TTL` segundos. Retorna quantos foram apagados.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    total = 0
+    while True:
+        # Lotes pequenos mantêm cada transação de escrita curta, como em
+        # cleanup_sessions.
+        ids = list(
+            IdempotencyKey.objects.filter(created_at__lt=cutoff).values_list(
+                "id", flat=True
+            )[:batch_size]
+        )
+        if not ids:
+            return total
+        deleted, _ = IdempotencyKey.objects.filter(id__in=ids).delete()
+        total += deleted
@@ -0,0 +1,150 @@
+"""
+Medições de desempenho por requisição.
+
+`RequestTimingMiddleware` (em middleware.py) cria um `RequestTimings` para
+cada requisição; o wrapper de execução SQL e o backend de templates abaixo
+somam nele o tempo gasto em consultas e em renderização. Ao final, a
+duração é guardada numa janela deslizante por rota (`route_stats`), lida
+pela view de desempenho da equipe.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+
+from django.template.backends.django import DjangoTemplates
+
+# Limites superiores (ms) dos buckets do histograma.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current = ContextVar("reciclai_request_timings", default=None)
+
+
+class RequestTimings:
+    __slots__ = ("sql_count", "sql_time", "template_time")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+
+def start_request():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def current_timings():
+    return _current.get()
+
+
+def sql_timer(execute, sql, params, many, context):
+    """
+    Wrapper para `connection.execute_wrapper` que conta e cronometra SQL.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.sql_time += time.perf_counter() - start
+        timings.sql_count += 1
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return self._template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            timings.template_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Backend de templates do Django que mede o tempo de renderização.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class RouteStats:
+    """
+    Últimas `window` durações (ms) de uma rota.
+    """
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.total_count = 0
+
+    def add(self, duration_ms, sql_count):
+        # deque.append é atômico; total_count é apenas informativo.
+        self.samples.append((duration_ms, sql_count))
+        self.total_count += 1
+
+    def summary(self):
+        samples = list(self.samples)
+        durations = sorted(d for d, _ in samples)
+        buckets = [0] * (len(BUCKETS_MS) + 1)
+        for duration in durations:
+            buckets[bisect_left(BUCKETS_MS, duration)] += 1
+        n = len(durations)
+
+        def percentile(p):
+            return round(durations[min(n - 1, int(p * n))], 2) if n else None
+
+        return {
+            "count": self.total_count,
+            "window": n,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(durations[-1], 2) if n else None,
+            "avg_sql": round(sum(q for _, q in samples) / n, 2) if n else None,
+            "histogram": {
+                **{f"le_{b}ms": c for b, c in zip(BUCKETS_MS, buckets)},
+                "inf": buckets[-1],
+            },
+        }
+
+
+_routes = {}
+_routes_lock = threading.Lock()
+
+
+def record(route, duration_ms, sql_count, window):
+    stats = _routes.get(route)
+    if stats is None:
+        with _routes_lock:
+            stats = _routes.setdefault(route, RouteStats(window))
+    stats.add(duration_ms, sql_count)
+
+
+def route_stats():
+    return {route: stats.summary() for route, stats in sorted(_routes.items())}
+
+
+def reset_stats():
+    with _routes_lock:
+        _routes.clear()
@@ -0,0 +1,72 @@
+"""
+Fila de entrada de cada recicladora.
+
+O coletor escolhe a recicladora de destino ao marcar a entrega; o painel e
+o processamento leem só as coletas daquela recicladora, pelo índice
+parcial `collection_intake_idx` (recicladora, ordem de entrega). As páginas
+são de tamanho fixo e sem COUNT: o número de consultas não depende do
+tamanho da fila.
+
+Coletas entregues antes de existir a recicladora de destino, ou cuja
+recicladora foi removida, ficam sem ela: aparecem na fila de todas as
+recicladoras e qualquer uma pode processá-las (e passa a ser o destino).
+"""
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from .models import Collection
+
+PAGE_SIZE = 25
+RECENT_PROCESSED = 10
+
+
+def recyclers():
+    return User.objects.filter(profile__user_type="R", is_active=True).order_by(
+        "username"
+    )
+
+
+def queue_page(recycler, page=1):
+    """
+    Coletas que `recycler` pode processar (as entregues a ela e as sem
+    destino), das mais antigas para as mais novas. Retorna (coletas da
+    página, se há próxima página).
+    """
+    start = (page - 1) * PAGE_SIZE
+    collections = list(
+        processable(recycler)
+        .select_related("residue__residue_type", "residue__citizen", "collector")
+        .order_by("delivered_at", "id")[start : start + PAGE_SIZE + 1]
+    )
+    return collections[:PAGE_SIZE], len(collections) > PAGE_SIZE
+
+
+def recent_processed(recycler):
+    return (
+        Collection.objects.filter(recycler=recycler, status="PROCESSADO")
+        .select_related("residue__residue_type", "residue__citizen")
+        .order_by("-processed_at")[:RECENT_PROCESSED]
+    )
+
+
+def processable(recycler):
+    """
+    Coletas que `recycler` pode processar: as da sua fila e as entregues
+    sem recicladora de destino.
+    """
+    return Collection.objects.filter(
+        Q(recycler=recycler) | Q(recycler__isnull=True),
+        status="ENTREGUE_RECICLADORA",
+    )
+
+
+def weighable(recycler):
+    """
+    Coletas que `recycler` pode pesar: as que pode processar e as que já
+    processou.
+    """
+    return Collection.objects.filter(
+        Q(recycler=recycler) | Q(recycler__isnull=True, status="ENTREGUE_RECICLADORA"),
+        status__in=["ENTREGUE_RECICLADORA", "PROCESSADO"],
+    )
@@ -0,0 +1,114 @@
+"""
+Ranking de cidadãos por pontos.
+
+O ranking geral usa o índice (user_type, points) de Profile; o mensal usa
+MonthlyPoints, atualizado a cada PointsTransaction positiva. Em ambos, a
+posição de um usuário e o total de participantes saem de uma única
+consulta agregada sobre o índice.
+"""
+
+from django.db.models import Case, Count, F, Max, Q, Subquery, Value, When
+from django.utils import timezone
+
+from .models import MonthlyPoints, Profile
+
+
+def current_month():
+    return timezone.localdate().replace(day=1)
+
+
+def month_of(moment):
+    return timezone.localdate(moment).replace(day=1)
+
+
+def top_citizens(limit=10):
+    return (
+        Profile.objects.filter(user_type="C")
+        .select_related("user")
+        .order_by("-points", "-id")[:limit]
+    )
+
+
+def citizen_rank(profile):
+    """
+    Retorna (posição, total) do cidadão no ranking geral.
+    """
+    counts = Profile.objects.filter(user_type="C").aggregate(
+        total=Count("id"), above=Count("id", filter=Q(points__gt=profile.points))
+    )
+    return counts["above"] + 1, counts["total"]
+
+
+def top_monthly(month, limit=10):
+    return (
+        MonthlyPoints.objects.filter(month=month)
+        .select_related("user")
+        .order_by("-points", "-id")[:limit]
+    )
+
+
+def monthly_rank(user, month):
+    """
+    Retorna (posição, total, pontos) do usuário no mês, ou (None, total, 0)
+    se ele não pontuou no mês.
+    """
+    mine = MonthlyPoints.objects.filter(user=user, month=month).values("points")
+    counts = MonthlyPoints.objects.filter(month=month).aggregate(
+        total=Count("id"),
+        above=Count("id", filter=Q(points__gt=Subquery(mine[:1]))),
+        points=Max("points", filter=Q(user=user)),
+    )
+    if counts["points"] is None:
+        return None, counts["total"], 0
+    return counts["above"] + 1, counts["total"], counts["points"]
+
+
+def add_monthly_points(user, points, moment):
+    """
+    Soma `points` ao total mensal do usuário (chamado dentro da transação
+    que cria a PointsTransaction).
+    """
+    month = month_of(moment)
+    entry, created = MonthlyPoints.objects.get_or_create(
+        user=user, month=month, defaults={"points": points}
+    )
+    if not created:
+        MonthlyPoints.objects.filter(pk=entry.pk).update(points=F("points") + points)
+
+
+def add_monthly_points_bulk(points_by_user, moment):
+    """
+    Versão em lote de add_monthly_points para {user_id: pontos}, usada
+    quando as PointsTransaction são criadas com bulk_create (sem sinais).
+    """
+    month = month_of(moment)
+    existing = set(
+        MonthlyPoints.objects.filter(
+            month=month, user_id__in=points_by_user
+        ).values_list("user_id", flat=True)
+    )
+    MonthlyPoints.objects.bulk_create(
+        [
+            MonthlyPoints(user_id=user_id, month=month, points=points)
+            for user_id, points in points_by_user.items()
+            if user_id not in existing
+        ]
+    )
+    if existing:
+        MonthlyPoints.objects.filter(month=month, user_id__in=existing).update(
+            points=F("points") + increment_by_user(points_by_user, existing)
+        )
+
+
+def increment_by_user(points_by_user, user_ids):
+    """
+    Expressão CASE com o incremento de cada usuário, para somar valores
+    diferentes a várias linhas num único UPDATE.
+    """
+    return Case(
+        *[
+            When(user_id=user_id, then=Value(points_by_user[user_id]))
+            for user_id in user_ids
+        ],
+        default=Value(0),
+    )
@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from reciclAI import assignment
+
+
+class Command(BaseCommand):
+    help = "Atribui as coletas SOLICITADA aos coletores próximos com vagas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-km",
+            type=float,
+            default=None,
+            help="Distância máxima entre o coletor e a coleta "
+            "(padrão: AUTO_ASSIGN_MAX_KM).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Continua rodando, uma rodada a cada --interval segundos.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=getattr(settings, "AUTO_ASSIGN_INTERVAL", 60),
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Roda mesmo com AUTO_ASSIGN_ENABLED desligado.",
+        )
+
+    def handle(self, *args, **options):
+        if not (getattr(settings, "AUTO_ASSIGN_ENABLED", False) or options["force"]):
+            raise CommandError(
+                "Atribuição automática desativada (AUTO_ASSIGN_ENABLED); "
+                "use --force para rodar mesmo assim."
+            )
+        while True:
+            stats = assignment.assign_open_collections(options["max_km"])
+            self.stdout.write(
+                f"{stats['assigned']} de {stats['pickups']} coleta(s) atribuída(s) "
+                f"a {stats['collectors']} coletor(es) com vagas, "
+                f"{stats['total_km']:.1f} km no total, em {stats['seconds']:.2f}s."
+            )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from reciclAI import idempotency
+
+
+class Command(BaseCommand):
+    help = "Remove chaves de idempotência mais antigas que IDEMPOTENCY_KEY_TTL."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Quantidade de chaves removidas por DELETE.",
+        )
+
+    def handle(self, *args, **options):
+        total = idempotency.delete_expired(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"{total} chave(s) de idempotência removida(s).")
+        )
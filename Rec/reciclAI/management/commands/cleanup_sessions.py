@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Remove sessões expiradas do banco em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Quantidade de sessões removidas por DELETE.",
+        )
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE.endswith("signed_cookies"):
+            self.stdout.write("Sessões em cookie assinado: nada a limpar.")
+            return
+
+        batch_size = options["batch_size"]
+        now = timezone.now()
+        total = 0
+        while True:
+            # Lotes pequenos mantêm cada transação de escrita curta e não
+            # bloqueiam os demais escritores do SQLite.
+            keys = list(
+                Session.objects.filter(expire_date__lt=now).values_list(
+                    "session_key", flat=True
+                )[:batch_size]
+            )
+            if not keys:
+                break
+            deleted, _ = Session.objects.filter(session_key__in=keys).delete()
+            total += deleted
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{total} sessão(ões) expirada(s) removida(s).")
+        )
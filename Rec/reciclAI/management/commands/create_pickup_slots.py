@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reciclAI.models import PickupSlot
+
+
+def parse_window(value):
+    try:
+        start, end = (
+            datetime.strptime(part, "%H:%M").time() for part in value.split("-")
+        )
+    except ValueError:
+        raise CommandError(f"Janela inválida: {value!r} (use HH:MM-HH:MM).")
+    if start >= end:
+        raise CommandError(f"Janela inválida: {value!r} termina antes de começar.")
+    return start, end
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria as janelas de horário de coleta dos próximos dias; as que já "
+        "existem não são alteradas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--area", action="append", required=True, dest="areas")
+        parser.add_argument(
+            "--window",
+            action="append",
+            required=True,
+            dest="windows",
+            help="Janela no formato HH:MM-HH:MM (pode repetir).",
+        )
+        parser.add_argument("--capacity", type=int, required=True)
+        parser.add_argument("--days", type=int, default=14)
+        parser.add_argument(
+            "--skip-weekends", action="store_true", help="Não cria sábados e domingos."
+        )
+
+    def handle(self, *args, **options):
+        windows = [parse_window(value) for value in options["windows"]]
+        today = timezone.localdate()
+        days = [today + timedelta(days=n) for n in range(options["days"])]
+        if options["skip_weekends"]:
+            days = [day for day in days if day.weekday() < 5]
+        slots = [
+            PickupSlot(
+                area=area,
+                date=day,
+                start_time=start,
+                end_time=end,
+                capacity=options["capacity"],
+            )
+            for area in options["areas"]
+            for day in days
+            for start, end in windows
+        ]
+        before = PickupSlot.objects.count()
+        PickupSlot.objects.bulk_create(slots, batch_size=500, ignore_conflicts=True)
+        created = PickupSlot.objects.count() - before
+        self.stdout.write(f"{created} janela(s) criada(s) de {len(slots)}.")
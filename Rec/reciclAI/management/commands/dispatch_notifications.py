@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reciclAI import notifications
+
+
+class Command(BaseCommand):
+    help = "Entrega por e-mail os avisos da caixa de saída, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=notifications.BATCH_SIZE,
+            help="Avisos lidos por lote.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Continua rodando, verificando a fila a cada --interval segundos.",
+        )
+        parser.add_argument("--interval", type=float, default=5.0)
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=7,
+            help="Apaga os avisos enviados há mais dias que isso.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            stats = notifications.dispatch(options["batch_size"])
+            if stats["notifications"]:
+                rate = stats["notifications"] / max(stats["seconds"], 1e-6)
+                self.stdout.write(
+                    f"{stats['notifications']} aviso(s) em {stats['emails']} "
+                    f"e-mail(s), {rate:.0f} avisos/s, "
+                    f"atraso máximo {stats['max_lag']:.1f}s."
+                )
+            deleted = notifications.delete_sent(options["keep_days"])
+            if deleted:
+                self.stdout.write(f"{deleted} aviso(s) antigo(s) removido(s).")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reciclAI import photos
+
+
+class Command(BaseCommand):
+    help = "Gera as miniaturas WebP das fotos de resíduos pendentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=photos.BATCH_SIZE,
+            help="Fotos lidas por lote.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Continua rodando, verificando a fila a cada --interval segundos.",
+        )
+        parser.add_argument("--interval", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            stats = photos.process_all(options["batch_size"])
+            if stats["photos"]:
+                rate = stats["photos"] / max(stats["seconds"], 1e-6)
+                self.stdout.write(
+                    f"{stats['photos']} foto(s) em {stats['seconds']:.1f}s "
+                    f"({rate:.1f} fotos/s)."
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,55 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from reciclAI import weighing
+
+
+class Command(BaseCommand):
+    help = "Importa leituras da balança (CSV ou NDJSON) de uma recicladora."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo de leituras; - lê da entrada padrão.")
+        parser.add_argument("--recycler", required=True, help="Usuário da recicladora.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=weighing.BATCH_SIZE,
+            help="Leituras gravadas por lote.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            recycler = User.objects.get(
+                username=options["recycler"], profile__user_type="R"
+            )
+        except User.DoesNotExist:
+            raise CommandError(f"Recicladora {options['recycler']} não encontrada.")
+
+        if options["path"] == "-":
+            sys.stdin.reconfigure(encoding="utf-8-sig", errors="replace")
+            report = weighing.ingest(sys.stdin, recycler, options["batch_size"])
+        else:
+            try:
+                lines = open(
+                    options["path"], encoding="utf-8-sig", errors="replace", newline=""
+                )
+            except OSError as error:
+                raise CommandError(str(error))
+            with lines:
+                report = weighing.ingest(lines, recycler, options["batch_size"])
+
+        for number, error in report["errors"]:
+            self.stderr.write(f"Linha {number}: {error}")
+        rate = report["readings"] / max(report["seconds"], 1e-6)
+        self.stdout.write(
+            f"{report['readings']} leitura(s) em {report['seconds']:.1f}s "
+            f"({rate:.0f}/s): {report['weighed']} coleta(s) pesada(s), "
+            f"{report['unknown']} não encontrada(s), {report['invalid']} inválida(s)."
+        )
+        self.stdout.write(
+            f"Declarado x medido ({report['compared']} coleta(s)): "
+            f"{report['declared_compared']} x {report['measured_compared']} kg "
+            f"(diferença {report['difference']} kg)."
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from reciclAI import search
+
+
+class Command(BaseCommand):
+    help = "Recria a tabela de busca textual de resíduos (FTS5) e a reindexa."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Banco a reindexar (padrão: default).",
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        if not search.is_available(connections[using]):
+            self.stdout.write("Busca FTS5 só existe no SQLite: nada a fazer.")
+            return
+
+        total = search.rebuild(using)
+        self.stdout.write(self.style.SUCCESS(f"{total} resíduo(s) indexado(s)."))
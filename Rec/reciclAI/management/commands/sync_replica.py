@@ -0,0 +1,37 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from reciclAI.routers import replica_alias
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia o banco SQLite principal para o arquivo da réplica de leitura "
+        "(uso local, onde não há replicação de verdade)."
+    )
+
+    def handle(self, *args, **options):
+        alias = replica_alias()
+        if alias is None:
+            raise CommandError(
+                "Nenhuma réplica configurada (defina DJANGO_DB_REPLICA_NAME)."
+            )
+        primary = connections[DEFAULT_DB_ALIAS]
+        replica = connections[alias]
+        if primary.vendor != "sqlite" or replica.vendor != "sqlite":
+            raise CommandError("sync_replica só funciona com SQLite.")
+
+        # Fecha a conexão persistente da réplica antes de sobrescrevê-la.
+        replica.close()
+        primary.ensure_connection()
+        target = sqlite3.connect(replica.settings_dict["NAME"])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Réplica '{alias}' sincronizada com o principal.")
+        )
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reciclAI import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Soma aos totais diários as coletas processadas desde a última "
+        "execução (ou refaz todo o histórico com --rebuild)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Apaga os totais e soma todo o histórico de novo (backfill).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=rollups.BATCH_SIZE,
+            help="Coletas lidas por lote.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Continua rodando, a cada --interval segundos.",
+        )
+        parser.add_argument("--interval", type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            stats = rollups.rebuild(options["batch_size"])
+            self.report(stats)
+        while options["loop"] or not options["rebuild"]:
+            stats = rollups.update(options["batch_size"])
+            if stats["collections"]:
+                self.report(stats)
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
+
+    def report(self, stats):
+        rate = stats["collections"] / max(stats["seconds"], 1e-6)
+        self.stdout.write(
+            f"{stats['collections']} coleta(s) somada(s) em "
+            f"{stats['seconds']:.1f}s ({rate:.0f} coletas/s)."
+        )
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reciclAI import vouchers
+from reciclAI.models import Reward
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera ou importa códigos de voucher de uma recompensa, ou lista as "
+        "recompensas com poucos códigos livres."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("reward", nargs="?", type=int, help="Id da recompensa.")
+        parser.add_argument("--generate", type=int, help="Quantidade de códigos.")
+        parser.add_argument("--length", type=int, default=vouchers.CODE_LENGTH)
+        parser.add_argument("--prefix", default="")
+        parser.add_argument(
+            "--import", dest="path", help="Arquivo com um código por linha."
+        )
+        parser.add_argument(
+            "--low-stock",
+            action="store_true",
+            help="Lista as recompensas abaixo do alerta de vouchers.",
+        )
+
+    def handle(self, *args, **options):
+        if options["low_stock"]:
+            for reward in vouchers.low_stock():
+                self.stdout.write(
+                    f"{reward.id}\t{reward.name}\t{reward.free_vouchers} livre(s) "
+                    f"(alerta abaixo de {reward.voucher_alert_below})"
+                )
+            return
+        if options["reward"] is None or not (options["generate"] or options["path"]):
+            raise CommandError(
+                "Informe a recompensa e --generate N ou --import ARQUIVO, "
+                "ou use --low-stock."
+            )
+        try:
+            reward = Reward.objects.get(id=options["reward"])
+        except Reward.DoesNotExist:
+            raise CommandError(f"Recompensa {options['reward']} não encontrada.")
+
+        if options["generate"]:
+            added = vouchers.generate(
+                reward, options["generate"], options["length"], options["prefix"]
+            )
+            self.stdout.write(f"{added} código(s) gerado(s) para {reward.name}.")
+        if options["path"]:
+            try:
+                lines = open(options["path"], encoding="utf-8-sig")
+            except OSError as error:
+                raise CommandError(str(error))
+            with lines:
+                stats = vouchers.import_codes(reward, lines)
+            self.stdout.write(
+                f"{stats['codes']} código(s) lido(s): {stats['added']} novo(s), "
+                f"{stats['invalid']} longo(s) demais, para {reward.name}."
+            )
+        if not reward.uses_vouchers:
+            Reward.objects.filter(id=reward.id).update(uses_vouchers=True)
+            self.stdout.write(f"{reward.name} passa a entregar um código por resgate.")
@@ -0,0 +1,225 @@
+"""
+Métricas no formato Prometheus.
+
+Latência por rota e contadores de eventos usam o `prometheus_client`; com
+vários workers, defina PROMETHEUS_MULTIPROC_DIR (um diretório vazio e
+gravável, o mesmo para todos os processos) antes de iniciar o servidor.
+
+As métricas de negócio (coletas por status, pontos concedidos e
+resgatados, resgates) vêm de consultas agregadas guardadas no cache e
+recalculadas em segundo plano a cada `METRICS_REFRESH_SECONDS`: um scrape
+nunca executa essas consultas no caminho da requisição.
+"""
+
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Count, Min, Q, Sum
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+SNAPSHOT_KEY = "metrics:business"
+REFRESH_LOCK_KEY = "metrics:business:refreshing"
+
+REQUEST_LATENCY = Histogram(
+    "reciclai_request_duration_seconds",
+    "Duração das requisições por rota.",
+    ["route", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+COLLECTIONS_CLAIMED = Counter(
+    "reciclai_collections_claimed_total",
+    "Coletas aceitas por coletores.",
+)
+REQUESTS_SHED = Counter(
+    "reciclai_requests_shed_total",
+    "Requisições recusadas por limite de taxa (429) ou de escritas (503).",
+    ["route", "reason"],
+)
+
+NOTIFICATIONS_SENT = Counter(
+    "reciclai_notifications_sent_total",
+    "Avisos entregues pela caixa de saída.",
+    ["kind"],
+)
+NOTIFICATION_EMAILS = Counter(
+    "reciclai_notification_emails_total",
+    "E-mails enviados (vários avisos de um usuário viram um e-mail).",
+)
+NOTIFICATION_FAILURES = Counter(
+    "reciclai_notification_email_failures_total",
+    "E-mails recusados pelo servidor (os avisos saem da fila mesmo assim).",
+)
+NOTIFICATION_LAG = Histogram(
+    "reciclai_notification_lag_seconds",
+    "Tempo entre a gravação do aviso e o envio.",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 900, 3600),
+)
+
+
+def observe_request(route, method, seconds):
+    REQUEST_LATENCY.labels(route=route, method=method).observe(seconds)
+
+
+def compute_business_snapshot():
+    """
+    Executa as consultas agregadas (uma por tabela).
+    """
+    from .models import Collection, Notification, PointsTransaction, UserReward
+
+    by_status = dict(
+        Collection.objects.values_list("status").annotate(n=Count("id")).order_by()
+    )
+    points = PointsTransaction.objects.aggregate(
+        awarded=Sum("points_gained", filter=Q(points_gained__gt=0)),
+        redeemed=Sum("points_gained", filter=Q(points_gained__lt=0)),
+    )
+    pending = Notification.objects.filter(sent_at__isnull=True).aggregate(
+        count=Count("id"), oldest=Min("created_at")
+    )
+    return {
+        "computed_at": time.time(),
+        "collections_by_status": {
+            status: by_status.get(status, 0) for status, _ in Collection.STATUS_CHOICES
+        },
+        "points_awarded": points["awarded"] or 0,
+        "points_redeemed": -(points["redeemed"] or 0),
+        "rewards_redeemed": UserReward.objects.count(),
+        "notifications_pending": pending["count"],
+        "notifications_oldest": (
+            pending["oldest"].timestamp() if pending["oldest"] else None
+        ),
+    }
+
+
+def refresh_business_snapshot():
+    snapshot = compute_business_snapshot()
+    interval = getattr(settings, "METRICS_REFRESH_SECONDS", 30)
+    # Mantém o valor antigo disponível bem além do intervalo, para servir
+    # dados velhos em vez de nada caso um recálculo atrase.
+    cache.set(SNAPSHOT_KEY, snapshot, interval * 10)
+    return snapshot
+
+
+def _refresh_in_background():
+    try:
+        refresh_business_snapshot()
+    finally:
+        cache.delete(REFRESH_LOCK_KEY)
+        close_old_connections()
+
+
+def business_snapshot():
+    """
+    Retorna o último snapshot do cache e, se ele estiver velho, agenda um
+    recálculo numa thread (no máximo um por vez).
+    """
+    snapshot = cache.get(SNAPSHOT_KEY)
+    interval = getattr(settings, "METRICS_REFRESH_SECONDS", 30)
+    stale = snapshot is None or time.time() - snapshot["computed_at"] > interval
+    if stale and cache.add(REFRESH_LOCK_KEY, True, interval):
+        threading.Thread(target=_refresh_in_background, daemon=True).start()
+    return snapshot
+
+
+class BusinessCollector:
+    def describe(self):
+        # Evita que o registro chame collect() só para validar nomes.
+        return []
+
+    def collect(self):
+        snapshot = business_snapshot()
+        if snapshot is None:
+            return
+
+        collections = GaugeMetricFamily(
+            "reciclai_collections",
+            "Coletas por status.",
+            labels=["status"],
+        )
+        for status, count in snapshot["collections_by_status"].items():
+            collections.add_metric([status], count)
+        yield collections
+
+        awarded = CounterMetricFamily(
+            "reciclai_points_awarded", "Pontos concedidos a cidadãos."
+        )
+        awarded.add_metric([], snapshot["points_awarded"])
+        yield awarded
+
+        redeemed = CounterMetricFamily(
+            "reciclai_points_redeemed", "Pontos gastos em recompensas."
+        )
+        redeemed.add_metric([], snapshot["points_redeemed"])
+        yield redeemed
+
+        rewards = CounterMetricFamily(
+            "reciclai_rewards_redeemed", "Recompensas resgatadas."
+        )
+        rewards.add_metric([], snapshot["rewards_redeemed"])
+        yield rewards
+
+        pending = GaugeMetricFamily(
+            "reciclai_notifications_pending", "Avisos na caixa de saída."
+        )
+        pending.add_metric([], snapshot["notifications_pending"])
+        yield pending
+
+        oldest = GaugeMetricFamily(
+            "reciclai_notifications_oldest_pending_seconds",
+            "Idade do aviso pendente mais antigo (0 sem pendentes).",
+        )
+        oldest.add_metric(
+            [],
+            (
+                snapshot["computed_at"] - snapshot["notifications_oldest"]
+                if snapshot["notifications_oldest"]
+                else 0
+            ),
+        )
+        yield oldest
+
+        age = GaugeMetricFamily(
+            "reciclai_business_metrics_age_seconds",
+            "Idade do snapshot das métricas de negócio.",
+        )
+        age.add_metric([], time.time() - snapshot["computed_at"])
+        yield age
+
+
+class _DefaultRegistryCollector:
+    """
+    Repassa as métricas do registro global para o registro do scrape.
+    """
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def render_metrics():
+    """
+    Retorna (corpo, content type) no formato de texto do Prometheus.
+    """
+    registry = CollectorRegistry()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Soma os arquivos de todos os workers.
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(_DefaultRegistryCollector())
+    registry.register(BusinessCollector())
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,194 @@
+import logging
+import math
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+
+from . import instrumentation, metrics, throttling
+from .routers import has_written, pin_to_primary, start_write_tracking
+
+perf_logger = logging.getLogger("reciclAI.perf")
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+class PrimaryPinMiddleware:
+    """
+    Após qualquer escrita, mantém o cliente no banco principal por alguns
+    segundos (read-your-writes) enquanto a réplica se atualiza.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start_write_tracking()
+        response = self.get_response(request)
+        wrote = has_written() or request.method not in SAFE_METHODS
+        if wrote and response.status_code < 400:
+            pin_to_primary(response)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Alimenta o histograma de latência por rota de /metrics. Fica separado
+    de RequestTimingMiddleware para continuar medindo quando a
+    instrumentação detalhada está desligada (DJANGO_REQUEST_TIMING=False).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        route = match.view_name if match else "unresolved"
+        metrics.observe_request(route, request.method, time.perf_counter() - start)
+        return response
+
+
+class RequestTimingMiddleware:
+    """
+    Mede SQL (quantidade e tempo), view, templates e tempo total de cada
+    requisição. Publica os valores no cabeçalho `Server-Timing`, numa linha
+    de log por rota e na janela de estatísticas de `instrumentation`.
+
+    Fica logo após Security e WhiteNoise para que o total inclua os demais
+    middlewares, mas não os arquivos estáticos.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_TIMING_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.window = getattr(settings, "REQUEST_TIMING_WINDOW", 1000)
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        request._timing_view_start = None
+        timings, token = instrumentation.start_request()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(instrumentation.sql_timer))
+                response = self.get_response(request)
+        finally:
+            instrumentation.finish_request(token)
+
+        end = time.perf_counter()
+        total_ms = (end - start) * 1000
+        view_start = request._timing_view_start
+        view_ms = (end - view_start) * 1000 if view_start else 0.0
+        sql_ms = timings.sql_time * 1000
+        template_ms = timings.template_time * 1000
+
+        response["Server-Timing"] = ", ".join(
+            [
+                f'sql;dur={sql_ms:.1f};desc="{timings.sql_count} queries"',
+                f"view;dur={view_ms:.1f}",
+                f"tpl;dur={template_ms:.1f}",
+                f"total;dur={total_ms:.1f}",
+            ]
+        )
+
+        match = request.resolver_match
+        route = match.view_name if match else "unresolved"
+        instrumentation.record(route, total_ms, timings.sql_count, self.window)
+        perf_logger.info(
+            "route=%s method=%s status=%s total_ms=%.1f view_ms=%.1f "
+            "sql_count=%d sql_ms=%.1f tpl_ms=%.1f",
+            route,
+            request.method,
+            response.status_code,
+            total_ms,
+            view_ms,
+            timings.sql_count,
+            sql_ms,
+            template_ms,
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing_view_start = time.perf_counter()
+        return None
+
+
+class ThrottleMiddleware:
+    """
+    Protege as escritas (métodos não seguros):
+
+    * rotas listadas em `settings.RATE_LIMITS` têm limite por usuário
+      (token bucket, veja throttling.py) e respondem 429 quando estouram;
+    * no máximo `WRITE_CONCURRENCY_LIMIT` escritas rodam ao mesmo tempo; as
+      demais esperam até `WRITE_QUEUE_TIMEOUT` segundos por uma vaga e, sem
+      vaga, recebem 503. As vagas ficam no cache (veja throttling.py): com
+      DJANGO_CACHE_URL o limite é de todos os workers; sem ele, de cada
+      worker, e só tem efeito com GUNICORN_THREADS > 1.
+
+    Ambas as respostas trazem `Retry-After`. Fica depois de
+    AuthenticationMiddleware para identificar o usuário.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "THROTTLING_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.rate_limits = getattr(settings, "RATE_LIMITS", {})
+        self.write_limit = getattr(settings, "WRITE_CONCURRENCY_LIMIT", 4)
+        self.queue_timeout = getattr(settings, "WRITE_QUEUE_TIMEOUT", 1.0)
+        self.slot_lease = getattr(settings, "WRITE_SLOT_LEASE", 60)
+
+    def __call__(self, request):
+        request._write_slot = None
+        try:
+            return self.get_response(request)
+        finally:
+            if request._write_slot:
+                throttling.release_write_slot(request._write_slot)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in SAFE_METHODS:
+            return None
+        route = request.resolver_match.view_name
+
+        limit = self.rate_limits.get(route)
+        if limit:
+            wait = throttling.take_token(
+                f"throttle:{route}:{throttling.client_key(request)}",
+                limit["burst"],
+                limit["per_minute"],
+            )
+            if wait:
+                return self.shed(
+                    route,
+                    "rate",
+                    429,
+                    "Muitas tentativas seguidas. Aguarde um instante e tente de novo.",
+                    wait,
+                )
+
+        slot = throttling.acquire_write_slot(
+            self.write_limit, self.queue_timeout, self.slot_lease
+        )
+        if slot is None:
+            return self.shed(
+                route,
+                "concurrency",
+                503,
+                "O sistema está sobrecarregado. Tente de novo em instantes.",
+                1,
+            )
+        request._write_slot = slot
+        return None
+
+    def shed(self, route, reason, status, message, retry_after):
+        metrics.REQUESTS_SHED.labels(route=route, reason=reason).inc()
+        response = HttpResponse(message, status=status)
+        response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        return response
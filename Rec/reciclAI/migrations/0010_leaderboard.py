@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_monthly_points(apps, schema_editor):
+    PointsTransaction = apps.get_model('reciclAI', 'PointsTransaction')
+    MonthlyPoints = apps.get_model('reciclAI', 'MonthlyPoints')
+    totals = (
+        PointsTransaction.objects.filter(points_gained__gt=0)
+        .annotate(month=TruncMonth('transaction_date'))
+        .values('user_id', 'month')
+        .annotate(points=Sum('points_gained'))
+        .order_by()
+    )
+    MonthlyPoints.objects.bulk_create(
+        [
+            MonthlyPoints(user_id=row['user_id'], month=row['month'].date(), points=row['points'])
+            for row in totals
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0009_reward_description_reward_is_active'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyPoints',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('points', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['user_type', 'points'], name='profile_type_points_idx'),
+        ),
+        migrations.AddField(
+            model_name='monthlypoints',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_points', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='monthlypoints',
+            index=models.Index(fields=['month', 'points'], name='monthly_points_rank_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlypoints',
+            constraint=models.UniqueConstraint(fields=('month', 'user'), name='unique_monthly_points'),
+        ),
+        migrations.RunPython(backfill_monthly_points, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0010_leaderboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reward',
+            name='max_per_user',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reward',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0011_reward_stock_and_limit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointsCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('residue_type', models.CharField(blank=True, max_length=100)),
+                ('multiplier', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('starts_on', models.DateField()),
+                ('ends_on', models.DateField()),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PointsRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('residue_type', models.CharField(blank=True, max_length=100)),
+                ('base_points', models.IntegerField(default=0)),
+                ('points_per_kg', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('points_per_unit', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('max_points', models.PositiveIntegerField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:20
+
+import django.db.models.deletion
+import unicodedata
+from django.db import migrations, models
+
+CATALOG = [
+    ('Garrafa PET', ['PET', 'Garrafa plástica', 'Garrafas PET']),
+    ('Plástico', ['Plásticos', 'Sacola plástica', 'Embalagem plástica']),
+    ('Papel', ['Papéis', 'Jornal', 'Revista']),
+    ('Papelão', ['Caixa de papelão', 'Papelões']),
+    ('Vidro', ['Vidros', 'Garrafa de vidro', 'Pote de vidro']),
+    ('Alumínio', ['Lata', 'Latinha', 'Latas de alumínio']),
+    ('Metal', ['Metais', 'Sucata', 'Ferro']),
+    ('Óleo de cozinha', ['Óleo', 'Óleo usado']),
+    ('Eletrônicos', ['Eletrônico', 'Lixo eletrônico', 'Eletroeletrônicos']),
+    ('Pilhas e baterias', ['Pilha', 'Pilhas', 'Bateria', 'Baterias']),
+    ('Orgânico', ['Orgânicos', 'Resto de comida', 'Compostagem']),
+]
+
+
+def normalize(text):
+    # Cópia de residue_types.normalize_text: migrações não importam o app.
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def map_residue_types(apps, schema_editor):
+    ResidueType = apps.get_model('reciclAI', 'ResidueType')
+    Residue = apps.get_model('reciclAI', 'Residue')
+
+    by_term = {}
+    for name, aliases in CATALOG:
+        residue_type = ResidueType.objects.create(
+            name=name, normalized_name=normalize(name), aliases='\n'.join(aliases)
+        )
+        for term in [name, *aliases]:
+            by_term.setdefault(normalize(term), residue_type)
+
+    # Textos livres já cadastrados: os que não batem com nome ou apelido do
+    # catálogo viram um tipo novo (o primeiro texto visto dá o nome). Nome e
+    # chave são cortados no limite das colunas (100), e a busca é pela chave
+    # cortada: textos longos com o mesmo começo viram um só tipo.
+    texts = Residue.objects.order_by('id').values_list('old_residue_type', flat=True).distinct()
+    for text in texts:
+        key = normalize(text)[:100].rstrip()
+        if key not in by_term:
+            by_term[key] = ResidueType.objects.create(
+                name=' '.join(text.split())[:100].rstrip() or 'Outros', normalized_name=key
+            )
+        Residue.objects.filter(old_residue_type=text).update(new_residue_type=by_term[key])
+
+
+def restore_residue_type_text(apps, schema_editor):
+    # Volta o nome do tipo para o campo de texto livre.
+    ResidueType = apps.get_model('reciclAI', 'ResidueType')
+    Residue = apps.get_model('reciclAI', 'Residue')
+    for residue_type in ResidueType.objects.all():
+        Residue.objects.filter(new_residue_type=residue_type).update(
+            old_residue_type=residue_type.name
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0012_points_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResidueType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('normalized_name', models.CharField(editable=False, max_length=100, unique=True)),
+                ('aliases', models.TextField(blank=True, help_text='Outros nomes aceitos para o tipo, um por linha.')),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RenameField(
+            model_name='residue',
+            old_name='residue_type',
+            new_name='old_residue_type',
+        ),
+        migrations.AddField(
+            model_name='residue',
+            name='new_residue_type',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='reciclAI.residuetype'),
+        ),
+        migrations.RunPython(map_residue_types, restore_residue_type_text),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0013_residuetype'),
+    ]
+
+    operations = [
+        # Só para desfazer: o campo volta com default e é preenchido pelo
+        # reverso de 0013.
+        migrations.AlterField(
+            model_name='residue',
+            name='old_residue_type',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name='residue',
+            name='old_residue_type',
+        ),
+        migrations.RenameField(
+            model_name='residue',
+            old_name='new_residue_type',
+            new_name='residue_type',
+        ),
+        migrations.AlterField(
+            model_name='residue',
+            name='residue_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='residues', to='reciclAI.residuetype'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0014_residue_residue_type_fk'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='collection',
+            index=models.Index(fields=['status', 'updated_at'], name='collection_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='collection',
+            index=models.Index(fields=['created_at'], name='collection_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pointstransaction',
+            index=models.Index(fields=['user', 'transaction_date'], name='points_tx_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pointstransaction',
+            index=models.Index(fields=['transaction_date'], name='points_tx_date_idx'),
+        ),
+    ]
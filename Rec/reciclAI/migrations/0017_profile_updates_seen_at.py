@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0016_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='updates_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0019_collection_assignment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickupSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('area', models.CharField(max_length=100, verbose_name='região')),
+                ('date', models.DateField(verbose_name='data')),
+                ('start_time', models.TimeField(verbose_name='início')),
+                ('end_time', models.TimeField(verbose_name='fim')),
+                ('capacity', models.PositiveSmallIntegerField(verbose_name='vagas')),
+                ('booked', models.PositiveSmallIntegerField(default=0, verbose_name='reservadas')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'start_time'], name='pickup_slot_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('area', 'date', 'start_time'), name='unique_pickup_slot'), models.CheckConstraint(condition=models.Q(('booked__lte', models.F('capacity'))), name='pickup_slot_not_overbooked'), models.CheckConstraint(condition=models.Q(('start_time__lt', models.F('end_time'))), name='pickup_slot_valid_window')],
+            },
+        ),
+        migrations.AddField(
+            model_name='collection',
+            name='slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='collections', to='reciclAI.pickupslot'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_delivered_at(apps, schema_editor):
+    # A última mudança das coletas já entregues é a melhor estimativa da
+    # entrega.
+    Collection = apps.get_model('reciclAI', 'Collection')
+    Collection.objects.filter(status='ENTREGUE_RECICLADORA').update(
+        delivered_at=F('updated_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0020_pickup_slots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collection',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='collection',
+            name='recycler',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='received_collections', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='collection',
+            index=models.Index(condition=models.Q(('status', 'ENTREGUE_RECICLADORA')), fields=['recycler', 'delivered_at', 'id'], name='collection_intake_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='collection',
+            index=models.Index(condition=models.Q(('status', 'PROCESSADO')), fields=['recycler', 'processed_at'], name='collection_recycler_done_idx'),
+        ),
+        migrations.RunPython(backfill_delivered_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0021_recycler_intake'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='residue',
+            name='photo',
+            field=models.ImageField(blank=True, upload_to='residuos/%Y/%m/', verbose_name='foto'),
+        ),
+        migrations.AddField(
+            model_name='residue',
+            name='photo_processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='residue',
+            name='photo_thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='residue',
+            index=models.Index(condition=models.Q(('photo_processed_at__isnull', True), models.Q(('photo', ''), _negated=True)), fields=['id'], name='residue_photo_pending_idx'),
+        ),
+    ]
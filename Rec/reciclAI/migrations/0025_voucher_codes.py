@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0024_scale_readings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reward',
+            name='uses_vouchers',
+            field=models.BooleanField(default=False, verbose_name='usa códigos de voucher'),
+        ),
+        migrations.AddField(
+            model_name='reward',
+            name='voucher_alert_below',
+            field=models.PositiveIntegerField(default=20, verbose_name='alertar com menos vouchers livres que'),
+        ),
+        migrations.CreateModel(
+            name='VoucherCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=64, verbose_name='código')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('reward', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vouchers', to='reciclAI.reward')),
+                ('user_reward', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='voucher', to='reciclAI.userreward')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('claimed_at__isnull', True)), fields=['reward', 'id'], name='voucher_free_idx')],
+                'constraints': [models.UniqueConstraint(fields=('reward', 'code'), name='unique_voucher_code')],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:02
+
+import django.db.models.deletion
+import unicodedata
+from django.db import migrations, models
+
+
+def normalize(text):
+    # Cópia de residue_types.normalize_text: migrações não importam o app.
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def map_rule_types(apps, schema_editor):
+    ResidueType = apps.get_model('reciclAI', 'ResidueType')
+    by_term = {}
+    for residue_type in ResidueType.objects.order_by('id'):
+        terms = [residue_type.name, *residue_type.aliases.splitlines()]
+        for term in terms:
+            if normalize(term):
+                by_term.setdefault(normalize(term), residue_type)
+
+    for model_name in ('PointsRule', 'PointsCampaign'):
+        model = apps.get_model('reciclAI', model_name)
+        texts = model.objects.exclude(old_residue_type='').values_list(
+            'old_residue_type', flat=True
+        ).distinct()
+        for text in texts:
+            key = normalize(text)
+            if not key:
+                continue
+            # Texto que não é nome nem apelido do catálogo: a regra não
+            # casava com nenhum resíduo. Vira um tipo inativo (fora do
+            # autocompletar) para a regra não virar a regra padrão.
+            if key not in by_term:
+                by_term[key] = ResidueType.objects.create(
+                    name=' '.join(text.split())[:100],
+                    normalized_name=key,
+                    is_active=False,
+                )
+            model.objects.filter(old_residue_type=text).update(
+                new_residue_type=by_term[key]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0025_voucher_codes'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='pointsrule',
+            old_name='residue_type',
+            new_name='old_residue_type',
+        ),
+        migrations.RenameField(
+            model_name='pointscampaign',
+            old_name='residue_type',
+            new_name='old_residue_type',
+        ),
+        migrations.AddField(
+            model_name='pointsrule',
+            name='new_residue_type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reciclAI.residuetype'),
+        ),
+        migrations.AddField(
+            model_name='pointscampaign',
+            name='new_residue_type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reciclAI.residuetype'),
+        ),
+        migrations.RunPython(map_rule_types, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0026_points_rule_catalog_types'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='pointsrule',
+            name='old_residue_type',
+        ),
+        migrations.RemoveField(
+            model_name='pointscampaign',
+            name='old_residue_type',
+        ),
+        migrations.RenameField(
+            model_name='pointsrule',
+            old_name='new_residue_type',
+            new_name='residue_type',
+        ),
+        migrations.RenameField(
+            model_name='pointscampaign',
+            old_name='new_residue_type',
+            new_name='residue_type',
+        ),
+        migrations.AlterField(
+            model_name='pointsrule',
+            name='residue_type',
+            field=models.ForeignKey(blank=True, help_text='Vazio = regra padrão, para os tipos sem regra própria.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reciclAI.residuetype'),
+        ),
+        migrations.AlterField(
+            model_name='pointscampaign',
+            name='residue_type',
+            field=models.ForeignKey(blank=True, help_text='Vazio = todos os tipos.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reciclAI.residuetype'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 21:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reciclAI', '0027_points_rule_residue_type_fk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='residue',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -1,7 +1,14 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils import timezone
 
+from .residue_types import normalize_text
+
+LATITUDE_VALIDATORS = [MinValueValidator(-90), MaxValueValidator(90)]
+LONGITUDE_VALIDATORS = [MinValueValidator(-180), MaxValueValidator(180)]
+
 
 class Profile(models.Model):
     USER_TYPE_CHOICES = (
@@ -12,11 +19,64 @@ class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     user_type = models.CharField(max_length=1, choices=USER_TYPE_CHOICES)
     points = models.IntegerField(default=0)
+    # Última visita do cidadão ao acompanhamento de coletas (veja summary.py).
+    updates_seen_at = models.DateTimeField(null=True, blank=True)
+    # Coletores: base e quantas coletas em aberto (ATRIBUIDA/EM_ROTA) aceitam
+    # receber da atribuição automática; 0 = não participa (veja assignment.py).
+    latitude = models.FloatField(null=True, blank=True, validators=LATITUDE_VALIDATORS)
+    longitude = models.FloatField(
+        null=True, blank=True, validators=LONGITUDE_VALIDATORS
+    )
+    assignment_capacity = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Ranking: top-K e "quantos cidadãos têm mais pontos que eu".
+            models.Index(
+                fields=["user_type", "points"], name="profile_type_points_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.get_user_type_display()}"
 
 
+class ResidueType(models.Model):
+    """
+    Tipo de resíduo do catálogo. `aliases` guarda outros nomes aceitos
+    (um por linha), usados no autocompletar e na importação de textos livres.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    normalized_name = models.CharField(max_length=100, unique=True, editable=False)
+    aliases = models.TextField(
+        blank=True, help_text="Outros nomes aceitos para o tipo, um por linha."
+    )
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def clean(self):
+        # Nomes que só diferem em acentos ou caixa colidem em normalized_name.
+        duplicate = (
+            ResidueType.objects.filter(normalized_name=normalize_text(self.name))
+            .exclude(pk=self.pk)
+            .first()
+        )
+        if duplicate is not None:
+            raise ValidationError(
+                {"name": f'Já existe o tipo "{duplicate.name}" com este nome.'}
+            )
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_text(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+
 class Residue(models.Model):
     STATUS_CHOICES = (
         ("AGUARDANDO_SOLICITACAO_DE_COLETA", "Aguardando Solicitação de Coleta"),
@@ -24,10 +84,17 @@ class Residue(models.Model):
         ("PROCESSADO", "Processado"),  # Renomeado para consistência
     )
     citizen = models.ForeignKey(User, on_delete=models.CASCADE)
-    residue_type = models.CharField(max_length=100)
+    residue_type = models.ForeignKey(
+        ResidueType, on_delete=models.PROTECT, related_name="residues"
+    )
     weight = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     units = models.IntegerField(null=True, blank=True)
     location = models.CharField(max_length=255)
+    # Coordenadas do ponto de coleta, se o cidadão as informar.
+    latitude = models.FloatField(null=True, blank=True, validators=LATITUDE_VALIDATORS)
+    longitude = models.FloatField(
+        null=True, blank=True, validators=LONGITUDE_VALIDATORS
+    )
     collection_date = models.DateField(null=True, blank=True)
     status = models.CharField(
         max_length=50,
@@ -35,11 +102,72 @@ class Residue(models.Model):
         default="AGUARDANDO_SOLICITACAO_DE_COLETA",
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Versão das linhas em cache das listas de coletas (veja fragments.py).
+    updated_at = models.DateTimeField(auto_now=True)
+    # Foto opcional; as miniaturas WebP ({tamanho: arquivo}) são geradas
+    # depois pelo comando `generate_thumbnails` (veja photos.py).
+    photo = models.ImageField("foto", upload_to="residuos/%Y/%m/", blank=True)
+    photo_thumbnails = models.JSONField(default=dict, blank=True)
+    photo_processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Fila de miniaturas: fotos ainda não processadas.
+            models.Index(
+                fields=["id"],
+                condition=models.Q(photo_processed_at__isnull=True)
+                & ~models.Q(photo=""),
+                name="residue_photo_pending_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.residue_type} - {self.citizen.username}"
 
 
+class PickupSlot(models.Model):
+    """
+    Janela de horário de coleta numa região, com vagas limitadas. `booked`
+    só muda por UPDATE condicional (veja scheduling.py).
+    """
+
+    area = models.CharField("região", max_length=100)
+    date = models.DateField("data")
+    start_time = models.TimeField("início")
+    end_time = models.TimeField("fim")
+    capacity = models.PositiveSmallIntegerField("vagas")
+    booked = models.PositiveSmallIntegerField("reservadas", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["area", "date", "start_time"], name="unique_pickup_slot"
+            ),
+            models.CheckConstraint(
+                condition=models.Q(booked__lte=models.F("capacity")),
+                name="pickup_slot_not_overbooked",
+            ),
+            models.CheckConstraint(
+                condition=models.Q(start_time__lt=models.F("end_time")),
+                name="pickup_slot_valid_window",
+            ),
+        ]
+        indexes = [
+            # Calendário dos próximos dias e agenda do dia.
+            models.Index(fields=["date", "start_time"], name="pickup_slot_date_idx"),
+        ]
+
+    @property
+    def free(self):
+        return self.capacity - self.booked
+
+    def __str__(self):
+        return (
+            f"{self.area} - {self.date:%d/%m/%Y} "
+            f"{self.start_time:%H:%M}-{self.end_time:%H:%M}"
+        )
+
+
 class Collection(models.Model):
     STATUS_CHOICES = (
         ("SOLICITADA", "Solicitada"),
@@ -57,9 +185,57 @@ class Collection(models.Model):
     status = models.CharField(
         max_length=50, choices=STATUS_CHOICES, default="SOLICITADA"
     )
+    # Recicladora de destino, escolhida na entrega (COLETADA ->
+    # ENTREGUE_RECICLADORA); define a fila de cada recicladora.
+    recycler = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="received_collections",
+    )
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    slot = models.ForeignKey(
+        PickupSlot,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="collections",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     processed_at = models.DateTimeField(null=True, blank=True)  # Novo campo
+    # Peso medido na balança da recicladora (weighing.py); o do resíduo é
+    # a estimativa do cidadão.
+    measured_weight = models.DecimalField(
+        "peso medido (kg)", max_digits=8, decimal_places=2, null=True, blank=True
+    )
+    weighed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Painéis e filtro por status do admin; hierarquia de datas.
+            models.Index(fields=["status", "updated_at"], name="collection_status_idx"),
+            models.Index(fields=["created_at"], name="collection_created_idx"),
+            # Fila de cada recicladora, por ordem de entrega, e as últimas
+            # processadas por ela.
+            models.Index(
+                fields=["recycler", "delivered_at", "id"],
+                condition=models.Q(status="ENTREGUE_RECICLADORA"),
+                name="collection_intake_idx",
+            ),
+            models.Index(
+                fields=["recycler", "processed_at"],
+                condition=models.Q(status="PROCESSADO"),
+                name="collection_recycler_done_idx",
+            ),
+            # Leitura incremental das processadas (rollups.py).
+            models.Index(
+                fields=["processed_at", "id"],
+                condition=models.Q(status="PROCESSADO"),
+                name="collection_processed_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Coleta para {self.residue.residue_type} - Status: {self.get_status_display()}"
@@ -70,6 +246,16 @@ class Reward(models.Model):
     description = models.TextField(default="Descrição padrão")
     points_required = models.IntegerField()
     is_active = models.BooleanField(default=True)
+    # Vazio = estoque ilimitado.
+    stock = models.PositiveIntegerField(null=True, blank=True)
+    # Vazio = sem limite de resgates por usuário.
+    max_per_user = models.PositiveIntegerField(null=True, blank=True)
+    # Cada resgate recebe um código do lote de vouchers (vouchers.py); sem
+    # código livre, a recompensa está esgotada.
+    uses_vouchers = models.BooleanField("usa códigos de voucher", default=False)
+    voucher_alert_below = models.PositiveIntegerField(
+        "alertar com menos vouchers livres que", default=20
+    )
 
     def __str__(self):
         return self.name
@@ -84,6 +270,46 @@ class UserReward(models.Model):
         return f"{self.user.username} - {self.reward.name}"
 
 
+class VoucherCode(models.Model):
+    """
+    Código de um lote de vouchers, gerado ou importado antes dos resgates.
+    Livre enquanto `claimed_at` estiver vazio; um código entregue nunca
+    volta ao lote, mesmo que o resgate seja apagado.
+    """
+
+    reward = models.ForeignKey(
+        Reward, on_delete=models.CASCADE, related_name="vouchers"
+    )
+    code = models.CharField("código", max_length=64)
+    user_reward = models.OneToOneField(
+        UserReward,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="voucher",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["reward", "code"], name="unique_voucher_code"
+            )
+        ]
+        indexes = [
+            # Próximo código livre de cada recompensa e contagem dos livres.
+            models.Index(
+                fields=["reward", "id"],
+                condition=models.Q(claimed_at__isnull=True),
+                name="voucher_free_idx",
+            )
+        ]
+
+    def __str__(self):
+        return self.code
+
+
 class PointsTransaction(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="points_transactions"
@@ -92,5 +318,236 @@ class PointsTransaction(models.Model):
     transaction_date = models.DateTimeField(auto_now_add=True)
     description = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # Histórico por usuário; hierarquia de datas do admin.
+            models.Index(
+                fields=["user", "transaction_date"], name="points_tx_user_date_idx"
+            ),
+            models.Index(fields=["transaction_date"], name="points_tx_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.points_gained} pontos em {self.transaction_date}"
+
+
+class MonthlyPoints(models.Model):
+    """
+    Pontos ganhos por usuário em cada mês, mantidos incrementalmente a partir
+    de PointsTransaction para o ranking mensal.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="monthly_points"
+    )
+    month = models.DateField()  # Primeiro dia do mês
+    points = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["month", "user"], name="unique_monthly_points"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["month", "points"], name="monthly_points_rank_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.month:%m/%Y}: {self.points} pontos"
+
+
+class PointsRule(models.Model):
+    """
+    Regra de pontuação por tipo de resíduo do catálogo. Uma regra com
+    `residue_type` vazio vale para os tipos sem regra própria.
+    """
+
+    residue_type = models.ForeignKey(
+        ResidueType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="Vazio = regra padrão, para os tipos sem regra própria.",
+    )
+    base_points = models.IntegerField(default=0)
+    points_per_kg = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    points_per_unit = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    # Vazio = sem teto por coleta.
+    max_points = models.PositiveIntegerField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"Regra: {self.residue_type or 'Padrão'}"
+
+
+class PointsCampaign(models.Model):
+    """
+    Multiplicador de pontos válido entre duas datas (inclusive), para um tipo
+    de resíduo ou, com `residue_type` vazio, para todos.
+    """
+
+    name = models.CharField(max_length=100)
+    residue_type = models.ForeignKey(
+        ResidueType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="Vazio = todos os tipos.",
+    )
+    multiplier = models.DecimalField(max_digits=4, decimal_places=2)
+    starts_on = models.DateField()
+    ends_on = models.DateField()
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.name} (x{self.multiplier})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Resposta de uma escrita feita com chave de idempotência (veja
+    idempotency.py). Reenvios com a mesma chave recebem esta resposta sem
+    repetir a operação; registros antigos são apagados pelo comando
+    `cleanup_idempotency_keys`.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    key = models.CharField(max_length=64)
+    route = models.CharField(max_length=100)
+    status_code = models.PositiveSmallIntegerField()
+    location = models.CharField(max_length=500, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    body = models.TextField(blank=True)
+    # Mensagens (nível, texto) exibidas junto com a resposta.
+    messages = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="unique_idempotency_key"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.key} ({self.route})"
+
+
+class Notification(models.Model):
+    """
+    Caixa de saída de avisos: gravada na mesma transação da mudança que o
+    gera e entregue depois, em lotes, pelo comando `dispatch_notifications`
+    (veja notifications.py).
+    """
+
+    KIND_CHOICES = (
+        ("COLETA_EM_ROTA", "Coleta a caminho"),
+        ("COLETA_PROCESSADA", "Coleta processada"),
+        ("NOVA_COLETA", "Nova coleta disponível"),
+    )
+    # Vazio = todos os coletores (a lista é montada na entrega).
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="notifications",
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    message = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Fila de entrega: só as pendentes, na ordem de criação.
+            models.Index(
+                fields=["id"],
+                condition=models.Q(sent_at__isnull=True),
+                name="notification_pending_idx",
+            ),
+            models.Index(fields=["sent_at"], name="notification_sent_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.message}"
+
+
+class DailyRollup(models.Model):
+    """
+    Totais de coletas processadas por dia, tipo de resíduo, recicladora e
+    região (PickupSlot.area; vazio quando a coleta não tinha janela).
+    Mantido por rollups.py a partir da marca d'água em RollupWatermark.
+    """
+
+    day = models.DateField()
+    residue_type = models.ForeignKey(
+        ResidueType, on_delete=models.PROTECT, related_name="+"
+    )
+    recycler = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    area = models.CharField(max_length=100, blank=True)
+    collections = models.PositiveIntegerField(default=0)
+    weight = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "residue_type", "recycler", "area"],
+                name="unique_daily_rollup",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["recycler", "day"], name="rollup_recycler_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.residue_type_id} - {self.recycler_id} - {self.area}"
+
+
+class RollupWatermark(models.Model):
+    """
+    Última coleta processada já somada aos rollups, na ordem
+    (processed_at, id).
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    collection_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.processed_at} #{self.collection_id}"
+
+
+class ScaleReading(models.Model):
+    """
+    Leitura da balança enviada por uma recicladora (weighing.py). O peso
+    medido da coleta é o da última leitura.
+    """
+
+    # Coberta pelo índice scale_reading_latest_idx.
+    collection = models.ForeignKey(
+        Collection,
+        on_delete=models.CASCADE,
+        related_name="scale_readings",
+        db_index=False,
+    )
+    recycler = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+    weight = models.DecimalField("peso (kg)", max_digits=8, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["collection", "-id"], name="scale_reading_latest_idx")
+        ]
+
+    def __str__(self):
+        return f"Coleta {self.collection_id}: {self.weight} kg"
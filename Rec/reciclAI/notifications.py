@@ -0,0 +1,218 @@
+"""
+Avisos por e-mail com caixa de saída (outbox).
+
+As views e operações em lote só gravam Notification na mesma transação da
+mudança de status: se ela for desfeita, o aviso some junto, e nenhuma
+requisição espera por um servidor de e-mail. O comando
+`dispatch_notifications` lê as pendentes em lotes, junta os avisos de um
+mesmo usuário num só e-mail e envia tudo por uma única conexão do
+EMAIL_BACKEND.
+
+A entrega é "pelo menos uma vez": os avisos são marcados como enviados
+depois do envio, então uma falha entre os dois passos repete o e-mail na
+próxima execução. Cada e-mail é enviado separadamente: um endereço recusado
+pelo servidor fica só no log (e em
+`reciclai_notification_email_failures_total`) e os avisos dele saem da fila
+como os de usuários sem e-mail, sem bloquear os demais. Rode um único
+despachante por banco.
+"""
+
+import logging
+import math
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from . import assignment, metrics
+from .models import Notification, Profile
+
+BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def notify(*notifications):
+    """
+    Grava os avisos na caixa de saída (na transação atual).
+    """
+    Notification.objects.bulk_create(notifications)
+
+
+def collection_on_the_way(collection):
+    return Notification(
+        user_id=collection.residue.citizen_id,
+        kind="COLETA_EM_ROTA",
+        message=f"A coleta de {collection.residue.residue_type} está a caminho.",
+    )
+
+
+def collection_processed(citizen_id, residue_type, points):
+    return Notification(
+        user_id=citizen_id,
+        kind="COLETA_PROCESSADA",
+        message=f"A coleta de {residue_type} foi processada: +{points} pontos.",
+    )
+
+
+def new_collection(collection):
+    """
+    Avisos da nova coleta: se o resíduo tem coordenadas, um para cada
+    coletor com base a até NEW_COLLECTION_NOTIFY_KM (nenhum, se não houver
+    ninguém por perto); sem coordenadas, um aviso a todos os coletores. O
+    endereço vai no texto.
+    """
+    residue = collection.residue
+    message = f"Nova coleta de {residue.residue_type} em {residue.location}."[:255]
+    if residue.latitude is None or residue.longitude is None:
+        return [Notification(user=None, kind="NOVA_COLETA", message=message)]
+    return [
+        Notification(user_id=user_id, kind="NOVA_COLETA", message=message)
+        for user_id in nearby_collectors(
+            residue.latitude, residue.longitude, settings.NEW_COLLECTION_NOTIFY_KM
+        )
+    ]
+
+
+def nearby_collectors(lat, lon, max_km):
+    """
+    Ids dos coletores ativos com base a até `max_km` de (lat, lon). O banco
+    corta por um retângulo em graus; a distância vem da grade da atribuição
+    automática.
+    """
+    lat_delta = max_km / assignment.KM_PER_DEGREE
+    lon_delta = max_km / (
+        assignment.KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+    )
+    bases = list(
+        Profile.objects.filter(
+            user_type="L",
+            user__is_active=True,
+            latitude__range=(lat - lat_delta, lat + lat_delta),
+            longitude__range=(lon - lon_delta, lon + lon_delta),
+        ).values_list("user_id", "latitude", "longitude")
+    )
+    if not bases:
+        return []
+    grid = assignment.Grid(max(max_km / 10, 0.5), lat)
+    points = [grid.project(base_lat, base_lon) for _, base_lat, base_lon in bases]
+    for index, (x, y) in enumerate(points):
+        grid.add(index, x, y)
+    found = grid.nearest(*grid.project(lat, lon), points, len(points), max_km)
+    return [bases[index][0] for _, index in found]
+
+
+def build_email(user, notifications):
+    if len(notifications) == 1:
+        subject = f"Reciclaí: {notifications[0].get_kind_display()}"
+    else:
+        subject = f"Reciclaí: {len(notifications)} atualizações"
+    body = "\n".join(f"- {notification.message}" for notification in notifications)
+    return EmailMessage(subject, f"Olá, {user.username}!\n\n{body}\n", to=[user.email])
+
+
+def dispatch_batch(batch_size=BATCH_SIZE, connection=None):
+    """
+    Entrega até `batch_size` avisos pendentes, do mais antigo para o mais
+    novo. Retorna (avisos, e-mails, maior atraso em segundos).
+    """
+    pending = list(
+        Notification.objects.filter(sent_at__isnull=True)
+        .select_related("user")
+        .order_by("id")[:batch_size]
+    )
+    if not pending:
+        return 0, 0, 0.0
+
+    by_user = defaultdict(list)
+    collectors = None
+    for notification in pending:
+        if notification.user is not None:
+            by_user[notification.user].append(notification)
+            continue
+        if collectors is None:
+            collectors = list(
+                User.objects.filter(profile__user_type="L", is_active=True)
+            )
+        for collector in collectors:
+            by_user[collector].append(notification)
+
+    # Usuários sem e-mail não recebem nada, mas os avisos saem da fila.
+    emails = [
+        build_email(user, notifications)
+        for user, notifications in by_user.items()
+        if user.email
+    ]
+    if emails:
+        if connection is None:
+            with get_connection() as connection:
+                sent_emails = send_each(connection, emails)
+        else:
+            sent_emails = send_each(connection, emails)
+    else:
+        sent_emails = 0
+
+    sent_at = timezone.now()
+    Notification.objects.filter(id__in=[n.id for n in pending]).update(sent_at=sent_at)
+    lags = [(sent_at - n.created_at).total_seconds() for n in pending]
+    for notification, lag in zip(pending, lags):
+        metrics.NOTIFICATIONS_SENT.labels(kind=notification.kind).inc()
+        metrics.NOTIFICATION_LAG.observe(lag)
+    metrics.NOTIFICATION_EMAILS.inc(sent_emails)
+    return len(pending), sent_emails, max(lags)
+
+
+def send_each(connection, emails):
+    """
+    Envia os e-mails um a um pela mesma conexão; uma recusa é registrada e
+    não impede os seguintes. Retorna quantos foram aceitos.
+    """
+    sent = 0
+    for email in emails:
+        try:
+            sent += connection.send_messages([email])
+        except Exception:
+            logger.exception("Falha ao enviar aviso para %s", ", ".join(email.to))
+            metrics.NOTIFICATION_FAILURES.inc()
+    return sent
+
+
+def dispatch(batch_size=BATCH_SIZE):
+    """
+    Esvazia a fila, lote a lote, com uma conexão de e-mail. Retorna
+    {"notifications", "emails", "max_lag", "seconds"}.
+    """
+    start = time.perf_counter()
+    stats = {"notifications": 0, "emails": 0, "max_lag": 0.0}
+    with get_connection() as connection:
+        while True:
+            sent, emails, lag = dispatch_batch(batch_size, connection)
+            if not sent:
+                break
+            stats["notifications"] += sent
+            stats["emails"] += emails
+            stats["max_lag"] = max(stats["max_lag"], lag)
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def delete_sent(days, batch_size=1000):
+    """
+    Apaga, em lotes, os avisos enviados há mais de `days` dias.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    total = 0
+    while True:
+        ids = list(
+            Notification.objects.filter(sent_at__lt=cutoff).values_list(
+                "id", flat=True
+            )[:batch_size]
+        )
+        if not ids:
+            return total
+        deleted, _ = Notification.objects.filter(id__in=ids).delete()
+        total += deleted
@@ -0,0 +1,118 @@
+"""
+Fotos dos resíduos.
+
+O envio é gravado em disco em blocos (FILE_UPLOAD_HANDLERS só com o
+TemporaryFileUploadHandler), sem carregar a foto inteira na memória, e o
+arquivo temporário é movido para o storage. A requisição não redimensiona
+nada: as miniaturas WebP em THUMBNAIL_SIZES são geradas pelo comando
+`generate_thumbnails`, que lê as fotos pendentes em lotes pelo índice
+parcial `residue_photo_pending_idx`.
+
+As listas mostram só as miniaturas, servidas por `residue_photo` com cache
+de um ano (a URL traz a versão da foto, veja `photo_url`); o original só é
+baixado quando o usuário abre a foto.
+"""
+
+import hashlib
+import logging
+import time
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Residue
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZES = (160, 480, 1024)
+WEBP_QUALITY = 80
+BATCH_SIZE = 50
+CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def thumbnail_name(photo_name, size):
+    path = PurePosixPath(photo_name)
+    return str(path.parent / "miniaturas" / f"{path.stem}-{size}.webp")
+
+
+def photo_url(residue, size="original"):
+    """
+    URL da foto (ou miniatura) com a versão do arquivo na query string: uma
+    foto nova gera outra URL, então a resposta pode ser guardada em cache.
+    """
+    if not residue.photo or (
+        size != "original" and str(size) not in residue.photo_thumbnails
+    ):
+        return ""
+    version = hashlib.sha1(residue.photo.name.encode()).hexdigest()[:10]
+    url = reverse("reciclAI:residue_photo", args=[residue.id, size])
+    return f"{url}?v={version}"
+
+
+def make_thumbnails(photo_name, storage=default_storage):
+    """
+    Gera e grava as miniaturas de `photo_name`. Retorna {tamanho: nome}.
+    """
+    with storage.open(photo_name) as original:
+        image = Image.open(original)
+        # JPEG: decodifica já reduzido (por 2, 4 ou 8), bem mais rápido e
+        # com menos memória que abrir a foto inteira do celular.
+        image.draft("RGB", (max(THUMBNAIL_SIZES), max(THUMBNAIL_SIZES)))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    thumbnails = {}
+    for size in sorted(THUMBNAIL_SIZES, reverse=True):
+        # Cada tamanho parte do anterior, já reduzido.
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+        name = thumbnail_name(photo_name, size)
+        storage.delete(name)
+        thumbnails[str(size)] = storage.save(name, ContentFile(buffer.getvalue()))
+    return thumbnails
+
+
+def process_pending(batch_size=BATCH_SIZE):
+    """
+    Gera as miniaturas de até `batch_size` fotos pendentes. Fotos que não
+    abrem ficam sem miniaturas. Retorna quantas foram processadas.
+    """
+    pending = list(
+        Residue.objects.filter(photo_processed_at__isnull=True)
+        .exclude(photo="")
+        .order_by("id")
+        .values_list("id", "photo")[:batch_size]
+    )
+    for residue_id, photo in pending:
+        try:
+            thumbnails = make_thumbnails(photo)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+            logger.exception("Miniaturas da foto %s falharam", photo)
+            thumbnails = {}
+        # Condicional: se a foto foi trocada nesse meio tempo, fica para a
+        # próxima rodada.
+        Residue.objects.filter(id=residue_id, photo=photo).update(
+            photo_thumbnails=thumbnails, photo_processed_at=timezone.now()
+        )
+    return len(pending)
+
+
+def process_all(batch_size=BATCH_SIZE):
+    """
+    Esvazia a fila. Retorna {"photos", "seconds"}.
+    """
+    start = time.perf_counter()
+    total = 0
+    while processed := process_pending(batch_size):
+        total += processed
+    return {"photos": total, "seconds": time.perf_counter() - start}
+
+
+def delete_files(photo_name, thumbnails, storage=default_storage):
+    for name in [photo_name, *thumbnails.values()]:
+        if name:
+            storage.delete(name)
@@ -0,0 +1,164 @@
+"""
+Operações em lote sobre coletas (ações do admin).
+
+Cada operação roda em poucas consultas por lote, independentemente da
+quantidade de coletas: UPDATEs condicionais no status, bulk_create das
+PointsTransaction e um único UPDATE com CASE para os pontos dos cidadãos.
+Como bulk_create e update() não disparam sinais, o status dos resíduos, o
+ranking mensal, os resumos da barra de navegação e os avisos aos cidadãos
+são tratados aqui mesmo.
+"""
+
+from collections import defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import leaderboard, metrics, notifications, scheduling, scoring, summary
+from .models import Collection, PointsTransaction, Profile, Residue
+
+BATCH_SIZE = 500
+
+CANCELLABLE = ["SOLICITADA", "ATRIBUIDA", "EM_ROTA"]
+REASSIGNABLE = ["SOLICITADA", "ATRIBUIDA", "EM_ROTA"]
+
+
+def _batches(queryset, status):
+    ids = list(
+        queryset.filter(status__in=status).order_by("pk").values_list("pk", flat=True)
+    )
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start : start + BATCH_SIZE]
+
+
+def process_collections(queryset):
+    """
+    Processa as coletas de `queryset` entregues na recicladora, pontuando os
+    cidadãos como a view process_collection. Retorna (coletas, pontos).
+    """
+    processed = awarded = 0
+    for ids in _batches(queryset, ["ENTREGUE_RECICLADORA"]):
+        count, points = _process_batch(ids)
+        processed += count
+        awarded += points
+    return processed, awarded
+
+
+@transaction.atomic
+def _process_batch(ids):
+    now = timezone.now()
+    today = timezone.localdate(now)
+    rows = list(
+        Collection.objects.filter(id__in=ids, status="ENTREGUE_RECICLADORA")
+        .select_for_update(of=("self",))
+        .values_list(
+            "id",
+            "residue_id",
+            "residue__citizen_id",
+            "collector_id",
+            "recycler_id",
+            "residue__residue_type_id",
+            "residue__residue_type__name",
+            "residue__weight",
+            "residue__units",
+        )
+    )
+    if not rows:
+        return 0, 0
+    (
+        collection_ids,
+        residue_ids,
+        citizen_ids,
+        collector_ids,
+        recycler_ids,
+        type_ids,
+        type_names,
+        weights,
+        units,
+    ) = zip(*rows)
+    points = scoring.score_batch(type_ids, weights, units, [today] * len(rows))
+
+    Collection.objects.filter(id__in=collection_ids).update(
+        status="PROCESSADO", processed_at=now, updated_at=now
+    )
+    Residue.objects.filter(id__in=residue_ids).update(status="PROCESSADO")
+    PointsTransaction.objects.bulk_create(
+        [
+            PointsTransaction(
+                user_id=citizen_id,
+                points_gained=gained,
+                description=f"Coleta de {type_name} processada.",
+            )
+            for citizen_id, type_name, gained in zip(citizen_ids, type_names, points)
+        ]
+    )
+
+    points_by_user = defaultdict(int)
+    for citizen_id, gained in zip(citizen_ids, points):
+        points_by_user[citizen_id] += gained
+    Profile.objects.filter(user_id__in=points_by_user).update(
+        points=F("points")
+        + leaderboard.increment_by_user(points_by_user, points_by_user)
+    )
+    earned = {user_id: total for user_id, total in points_by_user.items() if total > 0}
+    leaderboard.add_monthly_points_bulk(earned, now)
+    notifications.notify(
+        *(
+            notifications.collection_processed(citizen_id, type_name, gained)
+            for citizen_id, type_name, gained in zip(citizen_ids, type_names, points)
+        )
+    )
+    summary.invalidate(*citizen_ids, *collector_ids, *recycler_ids)
+    return len(rows), sum(points)
+
+
+def cancel_collections(queryset):
+    """
+    Cancela as coletas ainda não coletadas, devolvendo as vagas das janelas
+    de horário. Retorna quantas mudaram.
+    """
+    cancelled = 0
+    for ids in _batches(queryset, CANCELLABLE):
+        with transaction.atomic():
+            _invalidate_summaries(ids)
+            rows = Collection.objects.select_for_update(of=("self",)).filter(
+                id__in=ids, status__in=CANCELLABLE
+            )
+            slot_ids = list(rows.values_list("slot_id", flat=True))
+            cancelled += rows.update(status="CANCELADA", updated_at=timezone.now())
+            scheduling.release(slot_ids)
+    return cancelled
+
+
+def reassign_collections(queryset, collector):
+    """
+    Passa as coletas em aberto para `collector`; as ainda não atribuídas
+    passam a ATRIBUIDA. Retorna quantas mudaram.
+    """
+    reassigned = 0
+    for ids in _batches(queryset, REASSIGNABLE):
+        with transaction.atomic():
+            _invalidate_summaries(ids, collector.id)
+            now = timezone.now()
+            changed = Collection.objects.filter(
+                id__in=ids, status__in=["ATRIBUIDA", "EM_ROTA"]
+            ).update(collector=collector, updated_at=now)
+            changed += Collection.objects.filter(
+                id__in=ids, status="SOLICITADA"
+            ).update(collector=collector, status="ATRIBUIDA", updated_at=now)
+            transaction.on_commit(partial(metrics.COLLECTIONS_CLAIMED.inc, changed))
+            reassigned += changed
+    return reassigned
+
+
+def _invalidate_summaries(ids, *user_ids):
+    """
+    Descarta os resumos dos cidadãos, coletores e recicladoras das coletas
+    `ids` (e de `user_ids`) no commit do lote.
+    """
+    people = Collection.objects.filter(id__in=ids).values_list(
+        "residue__citizen_id", "collector_id", "recycler_id"
+    )
+    summary.invalidate(*user_ids, *(user_id for row in people for user_id in row))
@@ -0,0 +1,152 @@
+"""
+Catálogo de tipos de resíduo e índice de autocompletar em memória.
+
+Nomes e apelidos de cada ResidueType são normalizados (sem acentos, em
+minúsculas, espaços colapsados) e guardados em:
+
+* uma lista ordenada de chaves, uma para cada sufixo de palavras do termo
+  ("garrafa pet" gera "garrafa pet" e "pet"), para busca por prefixo com
+  bisect;
+* um dicionário trigrama -> palavras, usado quando o prefixo não encontra o
+  suficiente (erros de digitação).
+
+O índice é montado na subida do servidor (ao importar Rec/wsgi.py ou
+Rec/asgi.py, veja warmup.py), ou na primeira busca se o aquecimento estiver
+desligado, e remontado quando o catálogo muda.
+"""
+
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from .versioned import VersionedValue
+
+VERSION_KEY = "residue_types:index-version"
+MIN_SIMILARITY = 0.3
+
+
+def normalize_text(text):
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def alias_list(aliases):
+    return [line.strip() for line in (aliases or "").splitlines() if line.strip()]
+
+
+class ResidueTypeIndex:
+    def __init__(self, entries):
+        """
+        `entries`: iterável de (id, nome, apelidos separados por linha).
+        """
+        self.names = {}
+        self.exact = {}
+        prefix_keys = []
+        word_types = defaultdict(dict)
+        for type_id, name, aliases in entries:
+            self.names[type_id] = name
+            for term in {normalize_text(t) for t in [name, *alias_list(aliases)]}:
+                if not term:
+                    continue
+                self.exact.setdefault(term, type_id)
+                words = term.split()
+                for i, word in enumerate(words):
+                    prefix_keys.append((" ".join(words[i:]), type_id))
+                    word_types[word].setdefault(type_id, None)
+
+        prefix_keys.sort()
+        self._keys = [key for key, _ in prefix_keys]
+        self._key_ids = [type_id for _, type_id in prefix_keys]
+
+        # Trigramas por palavra distinta: bem menos chaves que termos inteiros.
+        self._words = list(word_types)
+        self._word_types = [list(word_types[word]) for word in self._words]
+        self._word_trigrams = [trigrams(word) for word in self._words]
+        self._trigram_words = defaultdict(list)
+        for position, grams in enumerate(self._word_trigrams):
+            for gram in grams:
+                self._trigram_words[gram].append(position)
+
+    def lookup(self, text):
+        """
+        Retorna o id do tipo cujo nome ou apelido é exatamente `text`
+        (ignorando acentos e caixa), ou None.
+        """
+        return self.exact.get(normalize_text(text))
+
+    def search(self, query, limit=10):
+        """
+        Retorna até `limit` pares (id, nome): primeiro os que têm alguma
+        palavra começando com `query`, depois os mais parecidos por trigramas.
+        """
+        query = normalize_text(query)
+        if not query:
+            return []
+
+        found = {}
+        position = bisect_left(self._keys, query)
+        while (
+            position < len(self._keys)
+            and self._keys[position].startswith(query)
+            and len(found) < limit
+        ):
+            found.setdefault(self._key_ids[position], None)
+            position += 1
+
+        if len(found) < limit:
+            for _, position in self._similar_words(query):
+                for type_id in self._word_types[position]:
+                    if len(found) >= limit:
+                        break
+                    found.setdefault(type_id, None)
+
+        return [(type_id, self.names[type_id]) for type_id in found]
+
+    def _similar_words(self, query):
+        """
+        Palavras do índice parecidas com alguma palavra de `query`, da mais
+        para a menos parecida.
+        """
+        best = {}
+        for query_word in query.split():
+            if len(query_word) < 3:
+                continue
+            query_grams = trigrams(query_word)
+            shared = Counter()
+            for gram in query_grams:
+                shared.update(self._trigram_words.get(gram, ()))
+            for position, count in shared.items():
+                union = len(query_grams) + len(self._word_trigrams[position]) - count
+                similarity = count / union
+                if similarity >= MIN_SIMILARITY and similarity > best.get(position, 0):
+                    best[position] = similarity
+        return sorted((-similarity, position) for position, similarity in best.items())
+
+
+def _build():
+    from .models import ResidueType
+
+    return ResidueTypeIndex(
+        ResidueType.objects.filter(is_active=True).values_list("id", "name", "aliases")
+    )
+
+
+_index = VersionedValue(VERSION_KEY, _build, "RESIDUE_TYPE_INDEX_MAX_AGE", 300)
+
+
+def get_index():
+    return _index.get()
+
+
+def invalidate_index():
+    _index.invalidate()
+
+
+def search(query, limit=10):
+    return get_index().search(query, limit)
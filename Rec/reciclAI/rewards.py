@@ -0,0 +1,68 @@
+"""
+Resgate de recompensas.
+
+Pontos e estoque são debitados com UPDATEs condicionais (`WHERE points >=
+custo`, `WHERE stock > 0`) na mesma transação: nenhum valor é lido para
+depois ser gravado, então resgates simultâneos nunca deixam o saldo ou o
+estoque negativos. Recompensas com vouchers reservam um código do lote do
+mesmo jeito (veja vouchers.py).
+"""
+
+from django.db import transaction
+from django.db.models import F
+
+from . import vouchers
+from .models import PointsTransaction, Profile, Reward, UserReward
+
+
+class RedemptionError(Exception):
+    """
+    Resgate recusado; a mensagem é exibida ao usuário.
+    """
+
+
+@transaction.atomic
+def redeem_reward(user, reward):
+    """
+    Resgata `reward` para `user` ou levanta RedemptionError, desfazendo
+    qualquer débito já feito.
+    """
+    cost = reward.points_required
+
+    # O débito de pontos vem primeiro: a linha do perfil fica bloqueada até o
+    # fim da transação e serializa resgates simultâneos do mesmo usuário,
+    # tornando segura a checagem de limite logo abaixo.
+    debited = Profile.objects.filter(user=user, points__gte=cost).update(
+        points=F("points") - cost
+    )
+    if not debited:
+        raise RedemptionError(
+            "Você não tem pontos suficientes para resgatar esta recompensa."
+        )
+
+    if reward.max_per_user is not None:
+        redeemed = UserReward.objects.filter(user=user, reward=reward).count()
+        if redeemed >= reward.max_per_user:
+            raise RedemptionError(
+                "Você já atingiu o limite de resgates desta recompensa."
+            )
+
+    if reward.stock is not None:
+        taken = Reward.objects.filter(id=reward.id, stock__gt=0).update(
+            stock=F("stock") - 1
+        )
+        if not taken:
+            raise RedemptionError("Esta recompensa está esgotada.")
+
+    user_reward = UserReward.objects.create(user=user, reward=reward)
+    if reward.uses_vouchers:
+        voucher = vouchers.claim(reward, user_reward)
+        if voucher is None:
+            raise RedemptionError("Esta recompensa está esgotada.")
+        user_reward.voucher = voucher
+    PointsTransaction.objects.create(
+        user=user,
+        points_gained=-cost,
+        description=f"Resgate da recompensa: {reward.name}",
+    )
+    return user_reward
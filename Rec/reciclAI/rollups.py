@@ -0,0 +1,243 @@
+"""
+Indicadores de reciclagem a partir de totais diários (DailyRollup).
+
+O comando `update_rollups` lê as coletas processadas depois da marca
+d'água (processed_at, id) em lotes, pelo índice parcial
+`collection_processed_idx`, soma cada lote aos totais por dia, tipo de
+resíduo, recicladora e região e avança a marca na mesma transação. O peso
+é o medido na balança (weighing.py) ou, sem pesagem, o declarado; a pesagem
+de uma coleta já somada corrige o dia dela (`reweigh`). Só entram coletas
+processadas há mais de SETTLE_SECONDS: uma transação que demore a
+confirmar não fica para trás da marca. Rode um único atualizador por banco.
+
+As views de indicadores e o contador público leem só os rollups. O
+contador fica no cache; quando envelhece, só quem pega a trava (cache.add)
+o recalcula e os demais servem o valor anterior. Com o cache local, valor e
+trava são de cada worker: a proteção vale entre as threads de um processo,
+e cada worker recalcula o seu. Com cache compartilhado (DJANGO_CACHE_URL),
+um único processo recalcula.
+"""
+
+import time
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Collection, DailyRollup, RollupWatermark
+
+BATCH_SIZE = 5000
+SETTLE_SECONDS = 60
+WATERMARK = "daily"
+
+IMPACT_KEY = "rollups:impact"
+IMPACT_LOCK_KEY = "rollups:impact:lock"
+
+
+def _watermark():
+    watermark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK)
+    return watermark
+
+
+def _pending(watermark, cutoff, batch_size):
+    rows = Collection.objects.filter(status="PROCESSADO", processed_at__lt=cutoff)
+    if watermark.processed_at is not None:
+        rows = rows.filter(
+            Q(processed_at__gt=watermark.processed_at)
+            | Q(processed_at=watermark.processed_at, id__gt=watermark.collection_id)
+        )
+    return list(
+        rows.order_by("processed_at", "id")
+        .annotate(effective_weight=Coalesce("measured_weight", "residue__weight"))
+        .values_list(
+            "id",
+            "processed_at",
+            "residue__residue_type_id",
+            "recycler_id",
+            "slot__area",
+            "effective_weight",
+            "residue__units",
+        )[:batch_size]
+    )
+
+
+def _add(totals):
+    """
+    Soma {(dia, tipo, recicladora, região): [coletas, peso, unidades]} aos
+    rollups: cria as chaves novas e atualiza as existentes num UPDATE.
+    """
+    existing = {}
+    days = {key[0] for key in totals}
+    for row in DailyRollup.objects.filter(day__in=days).values_list(
+        "id", "day", "residue_type_id", "recycler_id", "area"
+    ):
+        existing[row[1:]] = row[0]
+    DailyRollup.objects.bulk_create(
+        [
+            DailyRollup(
+                day=day,
+                residue_type_id=type_id,
+                recycler_id=recycler_id,
+                area=area,
+                collections=count,
+                weight=weight,
+                units=units,
+            )
+            for (day, type_id, recycler_id, area), (count, weight, units) in (
+                totals.items()
+            )
+            if (day, type_id, recycler_id, area) not in existing
+        ]
+    )
+    updates = {existing[key]: value for key, value in totals.items() if key in existing}
+    if not updates:
+        return
+
+    def increment(index, output):
+        return Case(
+            *[When(id=pk, then=Value(value[index])) for pk, value in updates.items()],
+            default=Value(0),
+            output_field=output,
+        )
+
+    DailyRollup.objects.filter(id__in=updates).update(
+        collections=F("collections") + increment(0, DailyRollup.collections.field),
+        weight=F("weight") + increment(1, DailyRollup.weight.field),
+        units=F("units") + increment(2, DailyRollup.units.field),
+    )
+
+
+def update(batch_size=BATCH_SIZE, now=None):
+    """
+    Soma aos rollups as coletas processadas desde a marca d'água. Retorna
+    {"collections", "seconds"}.
+    """
+    start = time.perf_counter()
+    cutoff = (now or timezone.now()) - timedelta(seconds=SETTLE_SECONDS)
+    total = 0
+    while True:
+        with transaction.atomic():
+            watermark = RollupWatermark.objects.select_for_update().get(
+                pk=_watermark().pk
+            )
+            rows = _pending(watermark, cutoff, batch_size)
+            if not rows:
+                break
+            totals = defaultdict(lambda: [0, Decimal(0), 0])
+            for _, processed_at, type_id, recycler_id, area, weight, units in rows:
+                key = (
+                    timezone.localdate(processed_at),
+                    type_id,
+                    recycler_id,
+                    area or "",
+                )
+                totals[key][0] += 1
+                totals[key][1] += weight or 0
+                totals[key][2] += units or 0
+            _add(totals)
+            watermark.collection_id, watermark.processed_at = rows[-1][0], rows[-1][1]
+            watermark.save()
+        total += len(rows)
+    return {"collections": total, "seconds": time.perf_counter() - start}
+
+
+def reweigh(changes):
+    """
+    Corrige o peso das coletas processadas que já estão nos rollups (na
+    transação atual). `changes`: [(id, processed_at, tipo, recicladora,
+    região, peso antigo, peso novo)]. As que ainda não foram somadas
+    entram depois com o peso novo.
+    """
+    # Trava a marca: o atualizador não soma um lote no meio da correção.
+    watermark = (
+        RollupWatermark.objects.select_for_update().filter(name=WATERMARK).first()
+    )
+    if watermark is None or watermark.processed_at is None:
+        return
+    mark = (watermark.processed_at, watermark.collection_id)
+    totals = defaultdict(lambda: [0, Decimal(0), 0])
+    for collection_id, processed_at, type_id, recycler_id, area, old, new in changes:
+        if processed_at is None or (processed_at, collection_id) > mark:
+            continue
+        if (old or 0) == (new or 0):
+            continue
+        key = (timezone.localdate(processed_at), type_id, recycler_id, area or "")
+        totals[key][1] += (new or 0) - (old or 0)
+    if totals:
+        _add(totals)
+
+
+def rebuild(batch_size=BATCH_SIZE, now=None):
+    """
+    Apaga os rollups e soma de novo todo o histórico.
+    """
+    with transaction.atomic():
+        DailyRollup.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK).delete()
+    return update(batch_size, now)
+
+
+def totals_by(rows, *fields):
+    """
+    Soma coletas, peso e unidades dos rollups `rows` agrupando por
+    `fields`.
+    """
+    return (
+        rows.values(*fields)
+        .annotate(
+            total_collections=Sum("collections"),
+            total_weight=Sum("weight"),
+            total_units=Sum("units"),
+        )
+        .order_by(*fields)
+    )
+
+
+def recent(days, today=None):
+    today = today or timezone.localdate()
+    return DailyRollup.objects.filter(day__gt=today - timedelta(days=days))
+
+
+def _compute_impact():
+    totals = DailyRollup.objects.aggregate(
+        collections=Sum("collections"), weight=Sum("weight"), units=Sum("units")
+    )
+    return {
+        "collections": totals["collections"] or 0,
+        "weight": totals["weight"] or Decimal(0),
+        "units": totals["units"] or 0,
+        "computed_at": time.time(),
+    }
+
+
+def impact():
+    """
+    Totais para o contador público, do cache. Só quem pega a trava recalcula
+    (um por cache: por worker com o cache local); os outros servem o valor
+    anterior (ou esperam um pouco pelo primeiro cálculo).
+    """
+    max_age = getattr(settings, "IMPACT_COUNTER_MAX_AGE", 300)
+    value = cache.get(IMPACT_KEY)
+    if value is not None and time.time() - value["computed_at"] < max_age:
+        return value
+    if cache.add(IMPACT_LOCK_KEY, True, 30):
+        try:
+            value = _compute_impact()
+            # Guardado bem além de max_age, para servir o valor velho
+            # enquanto outra requisição recalcula.
+            cache.set(IMPACT_KEY, value, max_age * 10)
+        finally:
+            cache.delete(IMPACT_LOCK_KEY)
+        return value
+    for _ in range(20):
+        if value is not None:
+            return value
+        time.sleep(0.05)
+        value = cache.get(IMPACT_KEY)
+    return value or _compute_impact()
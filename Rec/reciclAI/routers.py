@@ -0,0 +1,102 @@
+"""
+Roteamento de leituras entre o banco principal e uma réplica.
+
+Views marcadas com `replica_read` leem da réplica (alias definido em
+`settings.DATABASE_REPLICA_ALIAS`), a menos que o usuário tenha feito uma
+escrita há pouco tempo: nesse caso ele fica "preso" ao principal por
+`settings.REPLICA_PIN_SECONDS` segundos para sempre ver o que acabou de
+gravar. Sem réplica configurada, tudo vai para o `default`.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE_NAME = "reciclai_primary_until"
+
+_read_alias = ContextVar("reciclai_read_alias", default=None)
+_wrote = ContextVar("reciclai_wrote", default=False)
+
+
+def replica_alias():
+    alias = getattr(settings, "DATABASE_REPLICA_ALIAS", "replica")
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def use_replica():
+    token = _read_alias.set(replica_alias())
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def start_write_tracking():
+    _wrote.set(False)
+
+
+def has_written():
+    return _wrote.get()
+
+
+def is_pinned_to_primary(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE_NAME, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def pin_to_primary(response):
+    seconds = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+    response.set_cookie(
+        PIN_COOKIE_NAME,
+        str(int(time.time() + seconds)),
+        max_age=seconds,
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+def replica_read(view_func):
+    """
+    Decorator para views somente-leitura: GETs vão para a réplica.
+    """
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or is_pinned_to_primary(request):
+            return view_func(request, *args, **kwargs)
+        # Sessão e usuário são carregados do principal: um login recém-feito
+        # pode ainda não ter chegado à réplica.
+        request.user.is_authenticated
+        with use_replica():
+            return view_func(request, *args, **kwargs)
+
+    return _wrapped_view
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None:
+            return None
+        # Leituras dentro de uma transação precisam ver as próprias escritas.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica é uma cópia do principal; o schema chega por replicação.
+        return db != replica_alias()
@@ -0,0 +1,89 @@
+"""
+Agendamento de coletas em janelas de horário (PickupSlot) com vagas.
+
+A reserva é um UPDATE condicional (`booked < capacity`), como o estoque de
+recompensas: duas solicitações simultâneas para a última vaga não passam
+as duas, e a restrição `pickup_slot_not_overbooked` garante o mesmo no
+banco. Cancelamentos devolvem as vagas num único UPDATE com CASE.
+
+O calendário de vagas livres e a agenda do dia do coletor partem do índice
+por data das janelas: nenhum dos dois percorre resíduos ou coletas fora
+das janelas consultadas.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, F, Prefetch, Q, Value, When
+from django.utils import timezone
+
+from .models import Collection, PickupSlot
+
+
+def free_slots(days=None, area=None, today=None):
+    """
+    Janelas com vagas de hoje até `days` dias à frente (padrão:
+    PICKUP_SLOT_DAYS), em ordem de data e horário. Uma consulta.
+    """
+    today = today or timezone.localdate()
+    days = days or getattr(settings, "PICKUP_SLOT_DAYS", 14)
+    slots = PickupSlot.objects.filter(
+        date__gte=today,
+        date__lt=today + timedelta(days=days),
+        booked__lt=F("capacity"),
+    )
+    if area:
+        slots = slots.filter(area=area)
+    return list(slots.order_by("date", "start_time", "area"))
+
+
+def book(slot_id, today=None):
+    """
+    Reserva uma vaga da janela `slot_id` (na transação atual). Retorna a
+    janela, ou None se ela não existe, já passou ou está lotada.
+    """
+    today = today or timezone.localdate()
+    slots = PickupSlot.objects.filter(id=slot_id, date__gte=today)
+    if not slots.filter(booked__lt=F("capacity")).update(booked=F("booked") + 1):
+        return None
+    return slots.get()
+
+
+def release(slot_ids):
+    """
+    Devolve uma vaga por item de `slot_ids` (com repetição, um por coleta
+    cancelada) num único UPDATE.
+    """
+    counts = Counter(slot_id for slot_id in slot_ids if slot_id is not None)
+    if not counts:
+        return
+    PickupSlot.objects.filter(id__in=counts).update(
+        booked=F("booked")
+        - Case(
+            *[When(id=slot_id, then=Value(n)) for slot_id, n in counts.items()],
+            default=Value(0),
+        )
+    )
+
+
+def day_schedule(collector, day):
+    """
+    Janelas de `day` com as coletas do coletor e as ainda disponíveis em
+    `slot.visible_collections`. Duas consultas.
+    """
+    collections = (
+        Collection.objects.filter(
+            Q(collector=collector, status__in=["ATRIBUIDA", "EM_ROTA", "COLETADA"])
+            | Q(status="SOLICITADA")
+        )
+        .select_related("residue__residue_type")
+        .order_by("created_at")
+    )
+    return list(
+        PickupSlot.objects.filter(date=day)
+        .order_by("start_time", "area")
+        .prefetch_related(
+            Prefetch("collections", queryset=collections, to_attr="visible_collections")
+        )
+    )
@@ -0,0 +1,129 @@
+"""
+Motor de pontuação de coletas.
+
+As regras (PointsRule) e campanhas (PointsCampaign) ativas são compiladas
+em dicionários em memória indexados pelo id do tipo de resíduo do catálogo
+(os apelidos e a grafia já foram resolvidos para o tipo no cadastro) e
+invalidadas (veja versioned.py) no commit de qualquer mudança em regras ou
+campanhas (veja signals.py). Processos que não compartilham o cache
+recompilam no máximo a cada `POINTS_RULES_MAX_AGE` segundos.
+
+Pontos = (base + por_kg * peso + por_unidade * unidades) * multiplicadores
+das campanhas vigentes, limitado ao teto da regra e arredondado.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.utils import timezone
+
+from .versioned import VersionedValue
+
+# Pontuação quando não há nenhuma regra cadastrada.
+DEFAULT_POINTS = 10
+
+VERSION_KEY = "scoring:rules-version"
+
+ZERO = Decimal(0)
+ONE = Decimal(1)
+
+
+def _points(rule, multiplier, weight, units):
+    base, per_kg, per_unit, cap = rule
+    points = (base + per_kg * (weight or ZERO) + per_unit * (units or 0)) * multiplier
+    points = int(points.quantize(ONE, rounding=ROUND_HALF_UP))
+    if cap is not None and points > cap:
+        points = cap
+    return points if points > 0 else 0
+
+
+class CompiledRules:
+    def __init__(self, rules, campaigns):
+        # id do tipo (None = padrão) -> (base, por_kg, por_unidade, teto)
+        self.rules = {}
+        for rule in rules:
+            self.rules[rule.residue_type_id] = (
+                Decimal(rule.base_points),
+                rule.points_per_kg,
+                rule.points_per_unit,
+                rule.max_points,
+            )
+        # id do tipo (None = todos) -> [(início, fim, multiplicador)]
+        self.campaigns = {}
+        for campaign in campaigns:
+            self.campaigns.setdefault(campaign.residue_type_id, []).append(
+                (campaign.starts_on, campaign.ends_on, campaign.multiplier)
+            )
+
+    def rule_for(self, key):
+        return self.rules.get(key) or self.rules.get(None)
+
+    def multiplier_for(self, key, day):
+        multiplier = ONE
+        for scope in (key, None) if key else (None,):
+            for starts_on, ends_on, factor in self.campaigns.get(scope, ()):
+                if starts_on <= day <= ends_on:
+                    multiplier *= factor
+        return multiplier
+
+    def score(self, key, weight, units, day):
+        rule = self.rule_for(key)
+        if rule is None:
+            return DEFAULT_POINTS
+        return _points(rule, self.multiplier_for(key, day), weight, units)
+
+
+def _load():
+    from .models import PointsCampaign, PointsRule
+
+    return CompiledRules(
+        PointsRule.objects.filter(is_active=True),
+        PointsCampaign.objects.filter(is_active=True),
+    )
+
+
+_rules = VersionedValue(VERSION_KEY, _load, "POINTS_RULES_MAX_AGE")
+
+
+def get_rules():
+    """
+    Retorna as regras compiladas, recompilando se tiverem sido invalidadas.
+    """
+    return _rules.get()
+
+
+def invalidate_rules():
+    _rules.invalidate()
+
+
+def score(residue_type_id, weight=None, units=None, day=None):
+    """
+    Pontos de uma coleta de um tipo (id do ResidueType).
+    """
+    day = day or timezone.localdate()
+    return get_rules().score(residue_type_id, weight, units, day)
+
+
+def score_collection(collection, day=None):
+    residue = collection.residue
+    return score(residue.residue_type_id, residue.weight, residue.units, day)
+
+
+def score_batch(residue_type_ids, weights, units, days):
+    """
+    Pontua um lote em colunas paralelas (pesos como Decimal ou None).
+    Regra e multiplicador são resolvidos uma vez por tipo (e por tipo/dia),
+    não uma vez por item.
+    """
+    rules = get_rules()
+    keys = list(residue_type_ids)
+    resolved = {key: rules.rule_for(key) for key in set(keys)}
+    multipliers = {pair: rules.multiplier_for(*pair) for pair in set(zip(keys, days))}
+
+    return [
+        (
+            DEFAULT_POINTS
+            if resolved[key] is None
+            else _points(resolved[key], multipliers[key, day], weight, count)
+        )
+        for key, weight, count, day in zip(keys, weights, units, days)
+    ]
@@ -0,0 +1,262 @@
+"""
+Busca textual de resíduos e coletas.
+
+No SQLite, a tabela FTS5 `reciclAI_residue_fts` (rowid = id do resíduo)
+indexa o endereço e o tipo (nome e apelidos) de cada resíduo, sem acentos.
+Gatilhos a mantêm em dia a cada INSERT, UPDATE ou DELETE, inclusive em
+`QuerySet.update()` e em renomeações de tipos.
+
+Tabela e gatilhos não ficam numa migração: o SQLite recria a tabela de
+resíduos em vários ALTERs (e os gatilhos somem junto), então eles são
+(re)criados a cada `migrate` pelo sinal post_migrate (veja signals.py).
+Antes das migrações (pre_migrate) os gatilhos são removidos: o da tabela de
+tipos cita a de resíduos e faria falhar a recriação dela (uma migração de
+dados que mude endereços ou tipos pede um `rebuild_search_index` depois).
+Migrando para trás, até antes do catálogo de tipos, eles não são
+recriados. O comando `rebuild_search_index` recria a tabela e reindexa
+tudo.
+
+A ordenação é feita no SQL, pelo bm25 do FTS5 com mais peso para o tipo
+que para o endereço (empates pelo mais recente), com LIMIT/OFFSET: as
+páginas são fatias de uma mesma ordem, sem repetir nem pular resultados.
+Só as primeiras MAX_PAGE páginas são servidas, já que o OFFSET percorre
+todas as anteriores.
+
+Em outros bancos a busca cai para `icontains`.
+"""
+
+import re
+
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Residue
+
+FTS_TABLE = "reciclAI_residue_fts"
+PAGE_SIZE = 20
+MAX_PAGE = 50
+MAX_TERMS = 8
+# Pesos das colunas (location, residue_type) no bm25.
+BM25_WEIGHTS = (1.0, 2.0)
+
+# Texto indexado do tipo: nome e apelidos (um por linha no cadastro).
+TYPE_TEXT_SQL = "t.name || ' ' || replace(t.aliases, char(10), ' ')"
+
+INSERT_ROW_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, location, residue_type)
+    SELECT new.id, new.location, {TYPE_TEXT_SQL}
+    FROM reciclAI_residuetype t WHERE t.id = new.residue_type_id;
+"""
+
+TRIGGER_NAMES = [
+    "reciclAI_residue_fts_insert",
+    "reciclAI_residue_fts_update",
+    "reciclAI_residue_fts_delete",
+    "reciclAI_residuetype_fts_update",
+]
+
+TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reciclAI_residue_fts_insert
+    AFTER INSERT ON reciclAI_residue
+    BEGIN {INSERT_ROW_SQL} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reciclAI_residue_fts_update
+    AFTER UPDATE OF location, residue_type_id ON reciclAI_residue
+    BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        {INSERT_ROW_SQL}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reciclAI_residue_fts_delete
+    AFTER DELETE ON reciclAI_residue
+    BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reciclAI_residuetype_fts_update
+    AFTER UPDATE OF name, aliases ON reciclAI_residuetype
+    BEGIN
+        UPDATE {FTS_TABLE}
+        SET residue_type = (
+            SELECT {TYPE_TEXT_SQL} FROM reciclAI_residuetype t WHERE t.id = new.id
+        )
+        WHERE rowid IN (
+            SELECT id FROM reciclAI_residue WHERE residue_type_id = new.id
+        );
+    END
+    """,
+]
+
+POPULATE_SQL = [
+    f"""
+    INSERT INTO {FTS_TABLE} (rowid, location, residue_type)
+    SELECT r.id, r.location, {TYPE_TEXT_SQL}
+    FROM reciclAI_residue r
+    JOIN reciclAI_residuetype t ON t.id = r.residue_type_id
+    """,
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')",
+]
+
+
+def is_available(connection):
+    return connection.vendor == "sqlite"
+
+
+def match_expression(query):
+    """
+    Converte o texto digitado em uma expressão MATCH: cada palavra vira um
+    prefixo entre aspas ("av"* "brasil"*), todas obrigatórias. Retorna ""
+    se não houver palavras.
+    """
+    terms = re.findall(r"\w+", query or "")[:MAX_TERMS]
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_residue_ids(query, page=1, page_size=PAGE_SIZE, collections=None):
+    """
+    Ids dos resíduos que casam com `query`, do mais para o menos relevante
+    (empates pelo mais recente), e se há uma página seguinte. Páginas além
+    de MAX_PAGE voltam vazias. Com `collections` (um QuerySet de Collection),
+    só resíduos de uma dessas coletas; o filtro entra no SQL, antes da
+    paginação.
+    """
+    expression = match_expression(query)
+    page = max(page, 1)
+    if not expression or page > MAX_PAGE:
+        return [], False
+    offset = (page - 1) * page_size
+    connection = connections[router.db_for_read(Residue)]
+
+    if is_available(connection):
+        within, within_params = "", []
+        if collections is not None:
+            subquery = collections.values("residue_id").query
+            sql, within_params = subquery.get_compiler(connection=connection).as_sql()
+            within = f"AND f.rowid IN ({sql}) "
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT f.rowid FROM {FTS_TABLE} f "
+                f"WHERE {FTS_TABLE} MATCH %s {within}"
+                f"ORDER BY bm25({FTS_TABLE}, %s, %s), f.rowid DESC LIMIT %s OFFSET %s",
+                [
+                    expression,
+                    *within_params,
+                    *BM25_WEIGHTS,
+                    page_size + 1,
+                    offset,
+                ],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+    else:
+        residues = Residue.objects.all()
+        if collections is not None:
+            residues = residues.filter(collection__in=collections)
+        for term in re.findall(r"\w+", query)[:MAX_TERMS]:
+            residues = residues.filter(
+                Q(location__icontains=term) | Q(residue_type__name__icontains=term)
+            )
+        ids = list(
+            residues.order_by("-id").values_list("id", flat=True)[
+                offset : offset + page_size + 1
+            ]
+        )
+
+    return ids[:page_size], page < MAX_PAGE and len(ids) > page_size
+
+
+def matching_residue_ids(query):
+    """
+    Subconsulta com os ids de resíduos que casam com `query`, para usar em
+    `filter(residue_id__in=...)` (admin: a paginação e o COUNT continuam
+    com o Django). Retorna None se não houver FTS ou palavras na busca.
+    """
+    expression = match_expression(query)
+    if not expression or not is_available(connections[router.db_for_read(Residue)]):
+        return None
+    return RawSQL(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression]
+    )
+
+
+def search_collections(query, collections, page=1, page_size=PAGE_SIZE):
+    """
+    Coletas de `collections` (QuerySet) cujo resíduo casa com `query`, na
+    ordem de relevância, e se há uma página seguinte.
+    """
+    ids, has_next = search_residue_ids(query, page, page_size, collections)
+    found = collections.filter(residue_id__in=ids).select_related(
+        "residue__residue_type", "residue__citizen"
+    )
+    by_residue = {collection.residue_id: collection for collection in found}
+    return [by_residue[i] for i in ids if i in by_residue], has_next
+
+
+def has_type_catalog(connection, cursor, tables):
+    """
+    Se o banco já tem o catálogo de tipos, do qual os gatilhos dependem
+    (não tem quando migrado para trás, até antes dele).
+    """
+    if "reciclAI_residuetype" not in tables:
+        return False
+    columns = connection.introspection.get_table_description(cursor, "reciclAI_residue")
+    return any(column.name == "residue_type_id" for column in columns)
+
+
+def install(using="default"):
+    """
+    Cria a tabela FTS e os gatilhos que faltarem; se a tabela for nova,
+    indexa os resíduos existentes.
+    """
+    connection = connections[using]
+    if not is_available(connection):
+        return
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+        if not has_type_catalog(connection, cursor, tables):
+            return
+        created = FTS_TABLE not in tables
+        # Índices de prefixo de 2 a 8 letras: toda palavra da busca é
+        # prefixo, e prefixos sem índice exigem juntar as listas de todos os
+        # termos que começam com ele.
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "location, residue_type, "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6 7 8')"
+        )
+        for sql in TRIGGERS_SQL:
+            cursor.execute(sql)
+        if created:
+            for sql in POPULATE_SQL:
+                cursor.execute(sql)
+
+
+def drop_triggers(using="default"):
+    """
+    Remove os gatilhos (a tabela FTS fica); `install` os recria.
+    """
+    connection = connections[using]
+    if not is_available(connection):
+        return
+    with connection.cursor() as cursor:
+        for name in TRIGGER_NAMES:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild(using="default"):
+    """
+    Recria a tabela (aplicando mudanças de configuração) e reindexa todos
+    os resíduos. Retorna quantos foram indexados.
+    """
+    connection = connections[using]
+    if not is_available(connection):
+        return 0
+    with transaction.atomic(using), connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        install(using)
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
@@ -1,7 +1,26 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import (
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_migrate,
+)
 from django.contrib.auth.models import User
+from django.db import router, transaction
 from django.dispatch import receiver
-from .models import Profile, Collection
+from .models import (
+    Profile,
+    Collection,
+    PointsTransaction,
+    PointsRule,
+    PointsCampaign,
+    ResidueType,
+    Residue,
+    PickupSlot,
+)
+from .leaderboard import add_monthly_points
+from .residue_types import invalidate_index
+from . import fragments, photos, search, summary
+from .scoring import invalidate_rules
 
 
 @receiver(post_save, sender=User)
@@ -42,3 +61,97 @@ def update_residue_status_on_collection_change(sender, instance, **kwargs):
     ):
         residue.status = "COLETA_SOLICITADA"
         residue.save()
+
+
+@receiver(post_save, sender=PointsTransaction)
+def update_monthly_points(sender, instance, created, **kwargs):
+    """
+    Mantém o ranking mensal (MonthlyPoints) a cada ganho de pontos.
+    """
+    if created and instance.points_gained > 0:
+        add_monthly_points(
+            instance.user, instance.points_gained, instance.transaction_date
+        )
+
+
+@receiver([post_save, post_delete], sender=Profile)
+@receiver([post_save, post_delete], sender=PointsTransaction)
+def invalidate_user_summary(sender, instance, **kwargs):
+    """
+    Descarta o resumo da barra de navegação quando pontos mudam.
+    """
+    summary.invalidate(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Residue)
+def invalidate_citizen_summary(sender, instance, **kwargs):
+    summary.invalidate(instance.citizen_id)
+
+
+@receiver(post_delete, sender=Residue)
+def delete_residue_photo(sender, instance, **kwargs):
+    """
+    Apaga a foto e as miniaturas depois que a exclusão for confirmada.
+    """
+    if instance.photo:
+        name, thumbnails = instance.photo.name, dict(instance.photo_thumbnails)
+        transaction.on_commit(lambda: photos.delete_files(name, thumbnails))
+
+
+@receiver([post_save, post_delete], sender=Collection)
+def invalidate_collection_summaries(sender, instance, **kwargs):
+    summary.invalidate(
+        instance.residue.citizen_id, instance.collector_id, instance.recycler_id
+    )
+
+
+@receiver([post_save, post_delete], sender=PointsRule)
+@receiver([post_save, post_delete], sender=PointsCampaign)
+def invalidate_points_rules(sender, **kwargs):
+    """
+    Descarta as regras de pontuação compiladas quando algo muda.
+    """
+    transaction.on_commit(invalidate_rules)
+
+
+@receiver([post_save, post_delete], sender=ResidueType)
+def invalidate_residue_type_index(sender, **kwargs):
+    """
+    Remonta o índice de autocompletar quando o catálogo de tipos muda.
+    """
+    transaction.on_commit(invalidate_index)
+
+
+@receiver([post_save, post_delete], sender=ResidueType)
+@receiver([post_save, post_delete], sender=PickupSlot)
+def invalidate_fragment_catalog(sender, **kwargs):
+    """
+    Nomes de tipos e janelas aparecem nas linhas de coleta em cache.
+    """
+    transaction.on_commit(fragments.invalidate_catalog)
+
+
+@receiver(post_save, sender=User)
+def invalidate_fragment_usernames(sender, instance, created, update_fields, **kwargs):
+    # O login grava só last_login; usuários novos ainda não aparecem em
+    # nenhuma lista.
+    if not created and (update_fields is None or "username" in update_fields):
+        transaction.on_commit(fragments.invalidate_catalog)
+
+
+@receiver(pre_migrate)
+def drop_search_triggers(sender, using, **kwargs):
+    """
+    Tira os gatilhos da busca do caminho das migrações (veja search.py).
+    """
+    if sender.name == "reciclAI" and router.allow_migrate_model(using, Residue):
+        search.drop_triggers(using)
+
+
+@receiver(post_migrate)
+def install_search_index(sender, using, **kwargs):
+    """
+    (Re)cria a tabela de busca e seus gatilhos depois de cada migrate.
+    """
+    if sender.name == "reciclAI" and router.allow_migrate_model(using, Residue):
+        search.install(using)
@@ -0,0 +1,110 @@
+"""
+Resumo por usuário exibido na barra de navegação: pontos, coletas por
+status, resíduos aguardando solicitação e atualizações não vistas.
+
+O resumo fica no cache (uma leitura por requisição) e é descartado depois
+do commit de cada escrita que o altera: pelos sinais (signals.py) ou, nas
+operações em lote, por quem faz a escrita. A próxima requisição o remonta
+com até três consultas. Com o cache local, outro processo pode mostrar um
+resumo antigo por até `USER_SUMMARY_MAX_AGE` segundos.
+
+Cada resumo montado recebe uma `version` nova, usada nas chaves das seções
+de template em cache do usuário (veja fragments.py).
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Collection, Profile, Residue
+
+OPEN_STATUSES = [
+    "SOLICITADA",
+    "ATRIBUIDA",
+    "EM_ROTA",
+    "COLETADA",
+    "ENTREGUE_RECICLADORA",
+]
+
+
+def cache_key(user_id):
+    return f"user-summary:{user_id}"
+
+
+def build(user_id):
+    profile = (
+        Profile.objects.filter(user_id=user_id)
+        .values("user_type", "points", "updates_seen_at")
+        .first()
+    ) or {"user_type": "", "points": 0, "updates_seen_at": None}
+    is_citizen = profile["user_type"] == "C"
+
+    if is_citizen:
+        collections = Collection.objects.filter(residue__citizen_id=user_id)
+    else:
+        collections = Collection.objects.filter(collector_id=user_id)
+    # Atualizações = mudanças feitas por outros desde a última visita; a
+    # própria solicitação (SOLICITADA) não conta.
+    seen_at = profile["updates_seen_at"]
+    unseen = ~Q(status="SOLICITADA")
+    if seen_at is not None:
+        unseen &= Q(updated_at__gt=seen_at)
+    rows = list(
+        collections.order_by()
+        .values("status")
+        .annotate(total=Count("id"), unseen=Count("id", filter=unseen))
+    )
+    by_status = {row["status"]: row["total"] for row in rows}
+
+    return {
+        "user_type": profile["user_type"],
+        "points": profile["points"],
+        "collections": by_status,
+        "open_collections": sum(by_status.get(s, 0) for s in OPEN_STATUSES),
+        "awaiting_request": (
+            Residue.objects.filter(
+                citizen_id=user_id, status="AGUARDANDO_SOLICITACAO_DE_COLETA"
+            ).count()
+            if is_citizen
+            else 0
+        ),
+        "updates": sum(row["unseen"] for row in rows) if is_citizen else 0,
+        "version": uuid.uuid4().hex,
+    }
+
+
+def get(user_id):
+    key = cache_key(user_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build(user_id)
+        cache.set(key, summary, getattr(settings, "USER_SUMMARY_MAX_AGE", 60))
+    return summary
+
+
+def for_request(request):
+    """
+    Resumo do usuário da requisição, lido do cache uma vez só.
+    """
+    if not hasattr(request, "_user_summary"):
+        request._user_summary = get(request.user.pk)
+    return request._user_summary
+
+
+def invalidate(*user_ids):
+    """
+    Descarta o resumo dos usuários quando a transação atual for confirmada.
+    """
+    keys = [cache_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def mark_updates_seen(request):
+    Profile.objects.filter(user=request.user).update(updates_seen_at=timezone.now())
+    invalidate(request.user.pk)
+    request._user_summary = {**for_request(request), "updates": 0}
@@ -0,0 +1,19 @@
+import uuid
+
+from django import template
+from django.utils.html import format_html
+
+from ..idempotency import FIELD
+
+register = template.Library()
+
+
+@register.simple_tag
+def idempotency_key_field():
+    """
+    Campo oculto com uma chave nova a cada renderização do formulário:
+    reenvios do mesmo formulário repetem a chave.
+    """
+    return format_html(
+        '<input type="hidden" name="{}" value="{}">', FIELD, uuid.uuid4().hex
+    )
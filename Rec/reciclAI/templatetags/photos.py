@@ -0,0 +1,27 @@
+from django import template
+
+from .. import photos
+
+register = template.Library()
+
+
+@register.simple_tag
+def residue_photo_url(residue, size="original"):
+    """
+    URL versionada da foto do resíduo (ou da miniatura de `size`); vazia
+    se ainda não existir.
+    """
+    return photos.photo_url(residue, size)
+
+
+@register.inclusion_tag("reciclAI/includes/residue_photo.html")
+def residue_thumbnail(residue, size=160, width=80):
+    """
+    Miniatura com carregamento tardio, que abre a foto original num clique.
+    """
+    return {
+        "thumbnail": photos.photo_url(residue, size),
+        "original": photos.photo_url(residue),
+        "width": width,
+        "residue": residue,
+    }
@@ -1,7 +1,92 @@
-from django.test import TestCase, Client
-from django.urls import reverse
+import importlib
+import logging
+import os
+import shutil
+import smtplib
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    SimpleTestCase,
+    Client,
+    RequestFactory,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
 from django.contrib.auth.models import User
-from .models import Residue, Profile, Collection, Reward
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from PIL import Image
+from Rec import settings as settings_module
+from Rec.database import database_from_env
+from .models import (
+    Residue,
+    Profile,
+    Collection,
+    Reward,
+    MonthlyPoints,
+    UserReward,
+    PointsRule,
+    PointsCampaign,
+    ResidueType,
+    PointsTransaction,
+    IdempotencyKey,
+    Notification,
+    PickupSlot,
+    DailyRollup,
+    VoucherCode,
+)
+from .routers import PIN_COOKIE_NAME, PrimaryReplicaRouter, use_replica
+from . import admin as admin_module
+from . import forms as forms_module
+from . import (
+    assignment,
+    idempotency,
+    instrumentation,
+    intake,
+    leaderboard,
+    metrics,
+    notifications,
+    photos,
+    processing,
+    residue_types,
+    rewards,
+    rollups,
+    scheduling,
+    scoring,
+    search,
+    summary,
+    throttling,
+    urls,
+    versioned,
+    vouchers,
+    warmup,
+    weighing,
+)
+from .middleware import ThrottleMiddleware
+
+# Evita uma linha de log de desempenho por requisição na saída dos testes.
+logging.getLogger("reciclAI.perf").setLevel(logging.WARNING)
 
 
 class UserCreationTest(TestCase):
@@ -13,6 +98,7 @@ class UserCreationTest(TestCase):
 
 class CitizenFlowTest(TestCase):
     def setUp(self):
+        cache.clear()  # Limites de taxa de testes anteriores.
         self.client = Client()
         self.user = User.objects.create_user(username="citizen", password="password")
         self.user.profile.user_type = "C"
@@ -40,6 +126,7 @@ class CitizenFlowTest(TestCase):
 
 class CollectorFlowTest(TestCase):
     def setUp(self):
+        cache.clear()  # Limites de taxa de testes anteriores.
         self.client = Client()
         self.citizen = User.objects.create_user(username="citizen", password="password")
         self.collector = User.objects.create_user(
@@ -49,7 +136,7 @@ class CollectorFlowTest(TestCase):
         self.collector.profile.save()
         self.residue = Residue.objects.create(
             citizen=self.citizen,
-            residue_type="Papelão",
+            residue_type=ResidueType.objects.get(name="Papelão"),
             weight=5,
             location="Av. Brasil",
         )
@@ -83,12 +170,23 @@ class CollectorFlowTest(TestCase):
         self.collection.refresh_from_db()
         self.assertEqual(self.collection.status, "COLETADA")
 
-        self.client.post(
+        # A entrega exige a recicladora de destino.
+        recycler = User.objects.create_user(username="recycler")
+        recycler.profile.user_type = "R"
+        recycler.profile.save()
+        response = self.client.post(
             reverse("reciclAI:collection_transition", args=[self.collection.id]),
             {"status": "ENTREGUE_RECICLADORA"},
         )
+        self.assertContains(response, "Informe a recicladora")
+        self.client.post(
+            reverse("reciclAI:collection_transition", args=[self.collection.id]),
+            {"status": "ENTREGUE_RECICLADORA", "recycler": recycler.id},
+        )
         self.collection.refresh_from_db()
         self.assertEqual(self.collection.status, "ENTREGUE_RECICLADORA")
+        self.assertEqual(self.collection.recycler, recycler)
+        self.assertIsNotNone(self.collection.delivered_at)
 
 
 class RecyclerFlowTest(TestCase):
@@ -101,7 +199,10 @@ class RecyclerFlowTest(TestCase):
         self.recycler.profile.user_type = "R"
         self.recycler.profile.save()
         self.residue = Residue.objects.create(
-            citizen=self.citizen, residue_type="Vidro", units=20, location="Praça da Sé"
+            citizen=self.citizen,
+            residue_type=ResidueType.objects.get(name="Vidro"),
+            units=20,
+            location="Praça da Sé",
         )
         self.collection = Collection.objects.create(
             residue=self.residue, status="ENTREGUE_RECICLADORA"
@@ -119,9 +220,45 @@ class RecyclerFlowTest(TestCase):
         self.citizen.profile.refresh_from_db()
         self.assertEqual(self.citizen.profile.points, 10)
 
+    def test_concurrent_post_awards_points_once(self):
+        def processed_meanwhile(collection):
+            # Outro POST processa a coleta entre a leitura e o UPDATE.
+            Collection.objects.filter(id=collection.id).update(status="PROCESSADO")
+            return 10
+
+        with mock.patch.object(
+            scoring, "score_collection", side_effect=processed_meanwhile
+        ):
+            response = self.client.post(
+                reverse("reciclAI:process_collection", args=[self.collection.id]),
+                follow=True,
+            )
+        self.assertContains(response, "já foi processada")
+        self.citizen.profile.refresh_from_db()
+        self.assertEqual(self.citizen.profile.points, 0)
+        self.assertFalse(PointsTransaction.objects.exists())
+
+    def test_credit_keeps_concurrent_redemption_debit(self):
+        Profile.objects.filter(user=self.citizen).update(points=50)
+
+        def redeemed_meanwhile(collection):
+            # Um resgate debita pontos depois que o perfil foi carregado.
+            Profile.objects.filter(user=self.citizen).update(points=F("points") - 30)
+            return 10
+
+        with mock.patch.object(
+            scoring, "score_collection", side_effect=redeemed_meanwhile
+        ):
+            self.client.post(
+                reverse("reciclAI:process_collection", args=[self.collection.id])
+            )
+        self.citizen.profile.refresh_from_db()
+        self.assertEqual(self.citizen.profile.points, 30)
+
 
 class PointsAndRewardsTest(TestCase):
     def setUp(self):
+        cache.clear()  # Limites de taxa de testes anteriores.
         self.client = Client()
         self.user = User.objects.create_user(username="citizen", password="password")
         self.user.profile.points = 100
@@ -134,9 +271,2013 @@ class PointsAndRewardsTest(TestCase):
         self.user.profile.refresh_from_db()
         self.assertEqual(self.user.profile.points, 50)
 
+    def test_limited_stock_is_decremented_and_sells_out(self):
+        self.reward.stock = 1
+        self.reward.save()
+        self.client.post(reverse("reciclAI:redeem_reward", args=[self.reward.id]))
+        self.client.post(reverse("reciclAI:redeem_reward", args=[self.reward.id]))
+        self.reward.refresh_from_db()
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.reward.stock, 0)
+        self.assertEqual(UserReward.objects.filter(reward=self.reward).count(), 1)
+        # O segundo resgate foi desfeito por inteiro, inclusive o débito.
+        self.assertEqual(self.user.profile.points, 50)
+
+    def test_per_user_limit(self):
+        self.reward.max_per_user = 1
+        self.reward.save()
+        self.client.post(reverse("reciclAI:redeem_reward", args=[self.reward.id]))
+        self.client.post(reverse("reciclAI:redeem_reward", args=[self.reward.id]))
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.points, 50)
+        self.assertEqual(UserReward.objects.filter(user=self.user).count(), 1)
+
     def test_insufficient_points(self):
         self.user.profile.points = 20
         self.user.profile.save()
         self.client.post(reverse("reciclAI:redeem_reward", args=[self.reward.id]))
         self.user.profile.refresh_from_db()
         self.assertEqual(self.user.profile.points, 20)
+
+
+class DatabaseConfigTest(TestCase):
+    def test_sqlite_defaults(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            config = database_from_env(Path("/tmp"))
+        self.assertEqual(config["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(config["NAME"], Path("/tmp") / "db.sqlite3")
+        self.assertGreater(config["CONN_MAX_AGE"], 0)
+        self.assertIn("PRAGMA journal_mode=WAL;", config["OPTIONS"]["init_command"])
+        self.assertEqual(config["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+
+    def test_postgresql_from_env(self):
+        env = {
+            "DJANGO_DB_ENGINE": "postgresql",
+            "DJANGO_DB_NAME": "reciclai",
+            "DJANGO_DB_HOST": "db",
+            "DJANGO_DB_CONN_MAX_AGE": "60",
+        }
+        with mock.patch.dict(os.environ, env, clear=True):
+            config = database_from_env(Path("/tmp"))
+        self.assertEqual(config["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(config["HOST"], "db")
+        self.assertEqual(config["CONN_MAX_AGE"], 60)
+
+    def test_pragmas_applied_to_connection(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Apenas para SQLite.")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    @mock.patch("reciclAI.routers.replica_alias", return_value="replica")
+    def test_reads_go_to_replica_only_inside_context(self, _):
+        self.assertIsNone(self.router.db_for_read(Collection))
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Collection), "replica")
+        self.assertEqual(self.router.db_for_write(Collection), "default")
+
+    @mock.patch("reciclAI.routers.replica_alias", return_value="replica")
+    def test_reads_inside_transaction_stay_on_primary(self, _):
+        with use_replica(), mock.patch.object(connection, "in_atomic_block", True):
+            self.assertEqual(self.router.db_for_read(Collection), "default")
+
+
+class PrimaryPinTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.citizen = User.objects.create_user(username="citizen", password="password")
+        self.collector = User.objects.create_user(
+            username="collector", password="password"
+        )
+        self.collector.profile.user_type = "L"
+        self.collector.profile.save()
+        residue = Residue.objects.create(
+            citizen=self.citizen,
+            residue_type=ResidueType.objects.get(name="Papel"),
+            weight=1,
+            location="Rua A",
+        )
+        self.collection = Collection.objects.create(residue=residue)
+        self.client.login(username="collector", password="password")
+
+    def test_write_pins_client_to_primary(self):
+        response = self.client.get(reverse("reciclAI:collector_dashboard"))
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+        response = self.client.post(
+            reverse("reciclAI:accept_collection", args=[self.collection.id])
+        )
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+
+class CleanupSessionsTest(TestCase):
+    def test_removes_only_expired_sessions_in_batches(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(
+                session_key=f"expired{i}",
+                session_data="",
+                expire_date=now - timedelta(days=1),
+            )
+        Session.objects.create(
+            session_key="valid", session_data="", expire_date=now + timedelta(days=1)
+        )
+        out = StringIO()
+        call_command("cleanup_sessions", batch_size=2, stdout=out)
+        self.assertEqual(
+            list(Session.objects.values_list("session_key", flat=True)), ["valid"]
+        )
+        self.assertIn("5 sessão", out.getvalue())
+
+
+class SessionSettingsTest(SimpleTestCase):
+    def load(self, env):
+        """
+        Reexecuta Rec/settings.py com `env` e devolve (SESSION_ENGINE, CACHES).
+        O módulo é recarregado com o ambiente original no fim.
+        """
+        try:
+            with mock.patch.dict(os.environ, env):
+                for name in ("DJANGO_CACHE_URL", "DJANGO_SESSION_ENGINE"):
+                    if name not in env:
+                        os.environ.pop(name, None)
+                module = importlib.reload(settings_module)
+                return module.SESSION_ENGINE, module.CACHES["default"]["BACKEND"]
+        finally:
+            importlib.reload(settings_module)
+
+    def test_local_cache_keeps_sessions_in_database(self):
+        engine, backend = self.load({})
+        self.assertEqual(engine, "django.contrib.sessions.backends.db")
+        self.assertTrue(backend.endswith("LocMemCache"))
+
+    def test_shared_cache_enables_cached_db(self):
+        engine, backend = self.load({"DJANGO_CACHE_URL": "redis://cache:6379/0"})
+        self.assertEqual(engine, "django.contrib.sessions.backends.cached_db")
+        self.assertTrue(backend.endswith("RedisCache"))
+
+    def test_cached_sessions_require_shared_cache(self):
+        env = {"DJANGO_SESSION_ENGINE": "django.contrib.sessions.backends.cached_db"}
+        with self.assertRaises(ImproperlyConfigured):
+            self.load(env)
+
+
+class RequestTimingTest(TestCase):
+    def setUp(self):
+        instrumentation.reset_stats()
+        self.client = Client()
+        self.user = User.objects.create_user(username="citizen", password="password")
+        self.client.login(username="citizen", password="password")
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("reciclAI:points_history"))
+        header = response["Server-Timing"]
+        for metric in ("sql;dur=", "view;dur=", "tpl;dur=", "total;dur="):
+            self.assertIn(metric, header)
+        self.assertNotIn('desc="0 queries"', header)
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.client.get(reverse("reciclAI:points_history"))
+        response = self.client.get(reverse("reciclAI:performance_stats"))
+        self.assertEqual(response.status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse("reciclAI:performance_stats"))
+        routes = response.json()["routes"]
+        self.assertEqual(routes["reciclAI:points_history"]["count"], 1)
+        self.assertIsNotNone(routes["reciclAI:points_history"]["p99_ms"])
+
+
+class MetricsEndpointTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        citizen = User.objects.create_user(username="citizen", password="password")
+        residue = Residue.objects.create(
+            citizen=citizen,
+            residue_type=ResidueType.objects.get(name="Vidro"),
+            units=2,
+            location="Rua B",
+        )
+        Collection.objects.create(residue=residue)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_exposes_latency_and_cached_business_metrics(self):
+        metrics.refresh_business_snapshot()
+        self.client.get(reverse("reciclAI:public_index"))
+        response = self.client.get(
+            reverse("reciclAI:metrics"), HTTP_AUTHORIZATION="Bearer s3cret"
+        )
+        body = response.content.decode()
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn('route="reciclAI:public_index"', body)
+        self.assertIn('reciclai_collections{status="SOLICITADA"} 1.0', body)
+        self.assertIn("reciclai_points_awarded_total 0.0", body)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_scrape_does_not_query_business_tables(self):
+        metrics.refresh_business_snapshot()
+        with self.assertNumQueries(0):
+            self.client.get(
+                reverse("reciclAI:metrics"), HTTP_AUTHORIZATION="Bearer s3cret"
+            )
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token_required_when_configured(self):
+        metrics.refresh_business_snapshot()
+        self.assertEqual(self.client.get(reverse("reciclAI:metrics")).status_code, 403)
+        response = self.client.get(
+            reverse("reciclAI:metrics"), HTTP_AUTHORIZATION="Bearer wrong"
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(
+            reverse("reciclAI:metrics"), HTTP_AUTHORIZATION="Bearer s3cret"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_denied_by_default_except_for_staff(self):
+        metrics.refresh_business_snapshot()
+        self.assertEqual(self.client.get(reverse("reciclAI:metrics")).status_code, 403)
+        # Token vazio não vale como token.
+        response = self.client.get(
+            reverse("reciclAI:metrics"), HTTP_AUTHORIZATION="Bearer "
+        )
+        self.assertEqual(response.status_code, 403)
+        User.objects.create_user(username="staff", password="password", is_staff=True)
+        self.client.login(username="staff", password="password")
+        self.assertEqual(self.client.get(reverse("reciclAI:metrics")).status_code, 200)
+
+    @override_settings(REQUEST_TIMING_ENABLED=False)
+    def test_latency_is_observed_without_request_timing(self):
+        before = metrics.REGISTRY.get_sample_value(
+            "reciclai_request_duration_seconds_count",
+            {"route": "reciclAI:public_index", "method": "GET"},
+        )
+        # Um Client novo monta a pilha de middlewares com o override.
+        response = Client().get(reverse("reciclAI:public_index"))
+        self.assertNotIn("Server-Timing", response)
+        after = metrics.REGISTRY.get_sample_value(
+            "reciclai_request_duration_seconds_count",
+            {"route": "reciclAI:public_index", "method": "GET"},
+        )
+        self.assertEqual(after, (before or 0) + 1)
+
+
+class StaticAssetsTest(TestCase):
+    def test_base_template_uses_self_hosted_assets(self):
+        response = Client().get(reverse("login"))
+        content = response.content.decode()
+        self.assertIn("/static/vendor/bootstrap/css/bootstrap.min.css", content)
+        self.assertIn("/static/vendor/bootstrap/js/bootstrap.min.js", content)
+        self.assertNotIn("cdn.jsdelivr.net", content)
+
+
+class LeaderboardTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.users = []
+        for i, points in enumerate([50, 80, 20, 80]):
+            user = User.objects.create_user(username=f"citizen{i}", password="password")
+            user.profile.points = points
+            user.profile.save()
+            self.users.append(user)
+        collector = User.objects.create_user(username="collector", password="password")
+        collector.profile.user_type = "L"
+        collector.profile.points = 999
+        collector.profile.save()
+
+    def test_global_rank_in_single_query(self):
+        profile = self.users[0].profile
+        with self.assertNumQueries(1):
+            rank, total = leaderboard.citizen_rank(profile)
+        self.assertEqual((rank, total), (3, 4))
+        top = [p.user.username for p in leaderboard.top_citizens(2)]
+        self.assertEqual(sorted(top), ["citizen1", "citizen3"])
+
+    def test_monthly_points_follow_transactions(self):
+        recycler = User.objects.create_user(username="recycler", password="password")
+        recycler.profile.user_type = "R"
+        recycler.profile.save()
+        residue = Residue.objects.create(
+            citizen=self.users[2],
+            residue_type=ResidueType.objects.get(name="Vidro"),
+            units=1,
+            location="Rua C",
+        )
+        collection = Collection.objects.create(
+            residue=residue, status="ENTREGUE_RECICLADORA"
+        )
+        self.client.login(username="recycler", password="password")
+        self.client.post(reverse("reciclAI:process_collection", args=[collection.id]))
+
+        month = leaderboard.current_month()
+        self.assertEqual(MonthlyPoints.objects.get(user=self.users[2]).points, 10)
+        self.assertEqual(leaderboard.monthly_rank(self.users[2], month), (1, 1, 10))
+        self.assertEqual(leaderboard.monthly_rank(self.users[0], month), (None, 1, 0))
+
+    def test_leaderboard_page(self):
+        self.client.login(username="citizen0", password="password")
+        response = self.client.get(reverse("reciclAI:leaderboard"))
+        self.assertContains(response, "#3")
+        response = self.client.get(reverse("reciclAI:leaderboard") + "?periodo=mes")
+        self.assertEqual(response.context["period"], "mes")
+
+
+class PointsRulesTest(TestCase):
+    def setUp(self):
+        today = timezone.localdate()
+        self.types = {t.name: t for t in ResidueType.objects.all()}
+        with self.captureOnCommitCallbacks(execute=True):
+            PointsRule.objects.create(residue_type=None, base_points=5)
+            PointsRule.objects.create(
+                residue_type=self.types["Garrafa PET"],
+                base_points=1,
+                points_per_unit=Decimal("2"),
+                max_points=30,
+            )
+            PointsRule.objects.create(
+                residue_type=self.types["Papelão"], points_per_kg=Decimal("3")
+            )
+            PointsCampaign.objects.create(
+                name="Semana do Papelão",
+                residue_type=self.types["Papelão"],
+                multiplier=Decimal("2"),
+                starts_on=today - timedelta(days=1),
+                ends_on=today + timedelta(days=1),
+            )
+
+    def tearDown(self):
+        # As regras somem no rollback do teste; a compilação também deve sumir.
+        scoring.invalidate_rules()
+
+    def type_id(self, name):
+        return self.types[name].id
+
+    def test_rules_caps_and_campaigns(self):
+        today = timezone.localdate()
+        pet, cardboard = self.type_id("Garrafa PET"), self.type_id("Papelão")
+        self.assertEqual(scoring.score(pet, units=4), 9)
+        self.assertEqual(scoring.score(pet, units=100), 30)
+        self.assertEqual(scoring.score(cardboard, weight=Decimal("2.5")), 15)
+        self.assertEqual(
+            scoring.score(
+                cardboard, weight=Decimal("2.5"), day=today + timedelta(days=5)
+            ),
+            8,
+        )
+        self.assertEqual(scoring.score(self.type_id("Vidro"), units=3), 5)
+
+    def test_batch_matches_single_scoring(self):
+        today = timezone.localdate()
+        types = [
+            self.type_id(name)
+            for name in ["Garrafa PET", "Papelão", "Vidro", "Papelão"]
+        ]
+        weights = [None, Decimal("1.2"), Decimal("3"), Decimal("4")]
+        units = [7, None, 2, None]
+        days = [today, today, today, today + timedelta(days=10)]
+        self.assertEqual(
+            scoring.score_batch(types, weights, units, days),
+            [scoring.score(*args) for args in zip(types, weights, units, days)],
+        )
+
+    def test_rule_change_invalidates_compiled_rules(self):
+        glass = self.type_id("Vidro")
+        self.assertEqual(scoring.score(glass), 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            PointsRule.objects.create(residue_type=self.types["Vidro"], base_points=12)
+        self.assertEqual(scoring.score(glass), 12)
+
+    def test_rule_applies_to_residue_typed_with_other_spelling(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            PointsRule.objects.create(
+                residue_type=self.types["Alumínio"], base_points=20
+            )
+        citizen = User.objects.create_user(username="citizen", password="password")
+        self.client.login(username="citizen", password="password")
+        self.client.post(
+            reverse("reciclAI:residue_create"),
+            {"residue_type": "ALUMINIO", "units": 1, "location": "Rua E"},
+        )
+        residue = Residue.objects.get(citizen=citizen)
+        collection = Collection.objects.create(residue=residue)
+        self.assertEqual(scoring.score_collection(collection), 20)
+
+    def test_process_collection_uses_rules(self):
+        citizen = User.objects.create_user(username="citizen", password="password")
+        recycler = User.objects.create_user(username="recycler", password="password")
+        recycler.profile.user_type = "R"
+        recycler.profile.save()
+        residue = Residue.objects.create(
+            citizen=citizen,
+            residue_type=ResidueType.objects.get(name="Garrafa PET"),
+            units=4,
+            location="Rua D",
+        )
+        collection = Collection.objects.create(
+            residue=residue, status="ENTREGUE_RECICLADORA"
+        )
+        self.client.login(username="recycler", password="password")
+        self.client.post(reverse("reciclAI:process_collection", args=[collection.id]))
+        citizen.profile.refresh_from_db()
+        self.assertEqual(citizen.profile.points, 9)
+
+
+class VersionedValueTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_during_get_never_returns_none(self):
+        def build():
+            value = object()
+            # Um invalidate() de outra thread logo depois da montagem.
+            versioned_value.invalidate()
+            return value
+
+        versioned_value = versioned.VersionedValue("test:version", build, "UNSET")
+        self.assertIsNotNone(versioned_value.get())
+
+    def test_waiting_threads_reuse_one_build(self):
+        builds = []
+
+        def build():
+            time.sleep(0.05)
+            builds.append(1)
+            return len(builds)
+
+        versioned_value = versioned.VersionedValue("test:version", build, "UNSET")
+        with ThreadPoolExecutor(8) as pool:
+            values = list(pool.map(lambda _: versioned_value.get(), range(8)))
+        self.assertEqual(values, [1] * 8)
+        self.assertEqual(len(builds), 1)
+
+
+class ResidueTypeTest(TestCase):
+    def setUp(self):
+        self.citizen = User.objects.create_user(username="citizen", password="password")
+        self.client.login(username="citizen", password="password")
+
+    def tearDown(self):
+        residue_types.invalidate_index()
+
+    def test_search_is_prefix_and_accent_insensitive(self):
+        names = lambda q: [name for _, name in residue_types.search(q)]
+        self.assertEqual(names("papelao")[0], "Papelão")
+        self.assertIn("Garrafa PET", names("pet"))
+        self.assertIn("Alumínio", names("latinha"))
+        self.assertEqual(names("vidor")[0], "Vidro")  # erro de digitação
+        self.assertEqual(names(""), [])
+
+    def test_index_rebuilt_after_catalog_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ResidueType.objects.create(name="Isopor", aliases="EPS")
+        self.assertEqual([name for _, name in residue_types.search("eps")], ["Isopor"])
+
+    def test_autocomplete_endpoint(self):
+        residue_types.get_index()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("reciclAI:residue_type_autocomplete"), {"q": "óle"}
+            )
+        self.assertFalse(any("residuetype" in q["sql"] for q in queries))
+        self.assertEqual(response["Cache-Control"], "private, max-age=300")
+        self.assertEqual(response.json()["results"][0]["name"], "Óleo de cozinha")
+
+    def test_form_resolves_alias_to_catalog_type(self):
+        response = self.client.post(
+            reverse("reciclAI:residue_create"),
+            {"residue_type": "garrafas pet", "units": 3, "location": "Rua E"},
+        )
+        self.assertRedirects(response, reverse("reciclAI:residue_list"))
+        residue = Residue.objects.get(citizen=self.citizen)
+        self.assertEqual(residue.residue_type.name, "Garrafa PET")
+
+        response = self.client.post(
+            reverse("reciclAI:residue_create"),
+            {"residue_type": "Cimento", "units": 3, "location": "Rua E"},
+        )
+        self.assertContains(response, "Tipo de resíduo desconhecido")
+
+    def test_admin_rejects_name_differing_only_in_accents(self):
+        User.objects.create_superuser(username="admin", password="password")
+        self.client.login(username="admin", password="password")
+        response = self.client.post(
+            reverse("admin:reciclAI_residuetype_add"),
+            {"name": "PAPELAO", "aliases": "", "is_active": "on"},
+        )
+        self.assertContains(response, "Já existe o tipo")
+        self.assertEqual(
+            ResidueType.objects.filter(normalized_name="papelao").count(), 1
+        )
+
+    def test_form_rejects_type_missing_from_stale_index(self):
+        stale = residue_types.ResidueTypeIndex([(10**6, "Isopor", "")])
+        with mock.patch.object(forms_module, "get_index", return_value=stale):
+            response = self.client.post(
+                reverse("reciclAI:residue_create"),
+                {"residue_type": "isopor", "units": 1, "location": "Rua E"},
+            )
+        self.assertContains(response, "Tipo de resíduo indisponível")
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        citizen = User.objects.create_user(username="citizen", password="password")
+        recycler = User.objects.create_user(username="recycler", password="password")
+        recycler.profile.user_type = "R"
+        recycler.profile.save()
+        glass = ResidueType.objects.get(name="Vidro")
+        cardboard = ResidueType.objects.get(name="Papelão")
+        self.residues = [
+            Residue.objects.create(
+                citizen=citizen,
+                residue_type=cardboard if i % 2 else glass,
+                weight=1,
+                location=f"Avenida Brasil, {i}",
+            )
+            for i in range(5)
+        ]
+        self.recycler = recycler
+        Collection.objects.bulk_create(
+            [
+                Collection(
+                    residue=residue, status="ENTREGUE_RECICLADORA", recycler=recycler
+                )
+                for residue in self.residues
+            ]
+        )
+        self.client.login(username="recycler", password="password")
+
+    def test_accent_insensitive_prefix_search_with_pagination(self):
+        ids, has_next = search.search_residue_ids("papelao av", page_size=1)
+        self.assertEqual(len(ids), 1)
+        self.assertTrue(has_next)
+        ids, has_next = search.search_residue_ids("papelao av", page=2, page_size=1)
+        self.assertFalse(has_next)
+        self.assertEqual(search.search_residue_ids('"; DROP'), ([], False))
+
+    def test_pages_are_slices_of_one_ranking(self):
+        pages = [
+            search.search_residue_ids("brasil", page=page, page_size=2)
+            for page in (1, 2, 3)
+        ]
+        ids = [i for page_ids, _ in pages for i in page_ids]
+        self.assertCountEqual(ids, [residue.id for residue in self.residues])
+        self.assertEqual([has_next for _, has_next in pages], [True, True, False])
+
+    def test_page_number_is_capped(self):
+        self.assertEqual(
+            search.search_residue_ids("brasil", page=search.MAX_PAGE + 1), ([], False)
+        )
+        response = self.client.get(
+            reverse("reciclAI:collection_search"), {"q": "brasil", "pagina": 10**7}
+        )
+        self.assertEqual(response.json()["results"], [])
+
+    def test_index_follows_updates_and_type_renames(self):
+        residue = self.residues[0]
+        Residue.objects.filter(id=residue.id).update(location="Rua Goiás, 7")
+        self.assertEqual(search.search_residue_ids("goias")[0], [residue.id])
+        ResidueType.objects.filter(name="Vidro").update(aliases="Cristal")
+        self.assertEqual(len(search.search_residue_ids("cristal")[0]), 3)
+        residue.delete()
+        self.assertEqual(search.search_residue_ids("goias")[0], [])
+
+    def test_triggers_are_dropped_and_reinstalled_around_migrations(self):
+        def triggers():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                    "AND name LIKE 'reciclAI_%%_fts_%%'"
+                )
+                return {row[0] for row in cursor.fetchall()}
+
+        self.assertEqual(triggers(), set(search.TRIGGER_NAMES))
+        search.drop_triggers()
+        self.assertEqual(triggers(), set())
+        search.install()
+        self.assertEqual(triggers(), set(search.TRIGGER_NAMES))
+
+    def test_rebuild_command(self):
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("5 resíduo(s) indexado(s)", out.getvalue())
+
+    def test_collection_search_endpoint(self):
+        response = self.client.get(
+            reverse("reciclAI:collection_search"), {"q": "vidro brasil"}
+        )
+        data = response.json()
+        self.assertEqual(len(data["results"]), 3)
+        self.assertEqual(data["results"][0]["residue_type"], "Vidro")
+        self.assertFalse(data["has_next"])
+
+        self.client.login(username="citizen", password="password")
+        response = self.client.get(reverse("reciclAI:collection_search"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_collection_search_is_limited_to_the_recycler(self):
+        other = User.objects.create_user(username="other", password="password")
+        other.profile.user_type = "R"
+        other.profile.save()
+        Collection.objects.filter(residue=self.residues[0]).update(recycler=other)
+        Collection.objects.filter(residue=self.residues[2]).update(recycler=None)
+        Collection.objects.filter(residue=self.residues[4]).update(status="EM_ROTA")
+
+        response = self.client.get(
+            reverse("reciclAI:collection_search"), {"q": "vidro", "pagina": 1}
+        )
+        self.assertEqual(
+            [result["id"] for result in response.json()["results"]],
+            [Collection.objects.get(residue=self.residues[2]).id],
+        )
+        # A paginação conta só as coletas visíveis.
+        ids, has_next = search.search_residue_ids(
+            "brasil", page_size=3, collections=intake.weighable(self.recycler)
+        )
+        self.assertEqual(len(ids), 3)
+        self.assertFalse(has_next)
+
+    def test_admin_search_uses_index(self):
+        User.objects.create_superuser(username="admin", password="password")
+        self.client.login(username="admin", password="password")
+        response = self.client.get(
+            reverse("admin:reciclAI_collection_changelist"), {"q": "papelão"}
+        )
+        self.assertEqual(response.context["cl"].result_count, 2)
+
+
+class CollectionAdminTest(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username="admin", password="password")
+        self.collector = User.objects.create_user(username="collector", password="x")
+        self.collector.profile.user_type = "L"
+        self.collector.profile.save()
+        self.citizens = [
+            User.objects.create_user(username=f"citizen{i}", password="x")
+            for i in range(3)
+        ]
+        glass = ResidueType.objects.get(name="Vidro")
+        for i, status in enumerate(
+            ["ENTREGUE_RECICLADORA", "ENTREGUE_RECICLADORA", "SOLICITADA", "ATRIBUIDA"]
+        ):
+            residue = Residue.objects.create(
+                citizen=self.citizens[i % 3],
+                residue_type=glass,
+                units=1,
+                location=f"Rua {i}",
+            )
+            Collection.objects.create(residue=residue, status=status)
+        self.client.login(username="admin", password="password")
+        self.url = reverse("admin:reciclAI_collection_changelist")
+
+    def action(self, name, ids=None, **extra):
+        ids = ids or Collection.objects.values_list("id", flat=True)
+        return self.client.post(
+            self.url, {"action": name, "_selected_action": list(ids), **extra}
+        )
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        for i in range(10):
+            residue = Residue.objects.create(
+                citizen=self.citizens[0],
+                residue_type=ResidueType.objects.get(name="Papel"),
+                weight=1,
+                location="Rua X",
+            )
+            Collection.objects.create(residue=residue, collector=self.collector)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(self.url)
+        self.assertEqual(len(few), len(many))
+
+    def test_estimated_count_for_big_unfiltered_tables(self):
+        with mock.patch.object(admin_module, "ESTIMATE_THRESHOLD", 1):
+            with mock.patch.object(
+                admin_module, "estimated_row_count", return_value=1_000_000
+            ):
+                response = self.client.get(self.url)
+                self.assertEqual(response.context["cl"].result_count, 1_000_000)
+                response = self.client.get(self.url, {"status__exact": "SOLICITADA"})
+                self.assertEqual(response.context["cl"].result_count, 1)
+
+    def test_bulk_process_awards_points_once(self):
+        self.action("process_selected")
+        self.action("process_selected")
+        self.assertEqual(Collection.objects.filter(status="PROCESSADO").count(), 2)
+        self.assertEqual(Residue.objects.filter(status="PROCESSADO").count(), 2)
+        self.assertEqual(Profile.objects.get(user=self.citizens[0]).points, 10)
+        self.assertEqual(Profile.objects.get(user=self.citizens[1]).points, 10)
+        self.assertEqual(PointsTransaction.objects.count(), 2)
+        self.assertEqual(MonthlyPoints.objects.get(user=self.citizens[0]).points, 10)
+
+    def test_bulk_cancel_and_reassign(self):
+        response = self.action("reassign_selected")
+        self.assertTemplateUsed(response, "admin/reciclAI/collection/reassign.html")
+        claimed = metrics.REGISTRY.get_sample_value(
+            "reciclai_collections_claimed_total"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.action("reassign_selected", collector="collector", apply="1")
+        self.assertEqual(
+            metrics.REGISTRY.get_sample_value("reciclai_collections_claimed_total"),
+            claimed + 2,
+        )
+        self.assertEqual(
+            Collection.objects.filter(
+                collector=self.collector, status="ATRIBUIDA"
+            ).count(),
+            2,
+        )
+        self.action("cancel_selected")
+        self.assertEqual(Collection.objects.filter(status="CANCELADA").count(), 2)
+        self.assertEqual(
+            Collection.objects.filter(status="ENTREGUE_RECICLADORA").count(), 2
+        )
+
+
+class ThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="citizen", password="password")
+        self.reward = Reward.objects.create(name="Caneca", points_required=1000)
+        self.client.login(username="citizen", password="password")
+        self.url = reverse("reciclAI:redeem_reward", args=[self.reward.id])
+
+    def test_token_bucket_refills(self):
+        self.assertEqual(throttling.take_token("t", 2, 60, now=100), 0)
+        self.assertEqual(throttling.take_token("t", 2, 60, now=100), 0)
+        self.assertAlmostEqual(throttling.take_token("t", 2, 60, now=100), 1)
+        self.assertEqual(throttling.take_token("t", 2, 60, now=101.5), 0)
+
+    @override_settings(
+        RATE_LIMITS={"reciclAI:redeem_reward": {"burst": 2, "per_minute": 6}}
+    )
+    def test_rate_limit_per_user_and_route(self):
+        statuses = [self.client.post(self.url).status_code for _ in range(3)]
+        self.assertEqual(statuses, [302, 302, 429])
+        response = self.client.post(self.url)
+        self.assertEqual(response["Retry-After"], "10")
+
+        other = User.objects.create_user(username="other", password="password")
+        self.client.force_login(other)
+        self.assertEqual(self.client.post(self.url).status_code, 302)
+
+    @override_settings(WRITE_CONCURRENCY_LIMIT=1, WRITE_QUEUE_TIMEOUT=0, RATE_LIMITS={})
+    def test_concurrent_writes_are_shed(self):
+        middleware = ThrottleMiddleware(lambda request: None)
+        throttling.acquire_write_slot(1, 0, 60)  # Uma escrita em andamento.
+        request = RequestFactory().post(self.url)
+        request.resolver_match = resolve(self.url)
+        response = middleware.process_view(request, None, (), {})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertIsNone(
+            middleware.process_view(RequestFactory().get("/"), None, (), {})
+        )
+
+    def test_expired_write_slot_is_not_released_by_its_old_holder(self):
+        first = throttling.acquire_write_slot(1, 0, 60)
+        cache.delete(first[0])  # A concessão expirou...
+        second = throttling.acquire_write_slot(1, 0, 60)  # ...e a vaga mudou de dono.
+        throttling.release_write_slot(first)
+        self.assertIsNone(throttling.acquire_write_slot(1, 0, 60))
+        throttling.release_write_slot(second)
+        self.assertIsNotNone(throttling.acquire_write_slot(1, 0, 60))
+
+    def test_waiting_for_a_write_slot_backs_off(self):
+        throttling.acquire_write_slot(1, 0, 60)
+        with mock.patch.object(throttling.time, "sleep") as sleep:
+            start = time.monotonic()
+            self.assertIsNone(throttling.acquire_write_slot(1, 0.05, 60))
+        self.assertLess(time.monotonic() - start, 1)
+        delays = [call.args[0] for call in sleep.call_args_list]
+        self.assertTrue(delays)
+        self.assertTrue(all(0 <= d <= throttling.SLOT_BACKOFF_MAX for d in delays))
+
+    @override_settings(WRITE_CONCURRENCY_LIMIT=2, WRITE_QUEUE_TIMEOUT=0, RATE_LIMITS={})
+    def test_write_slots_are_shared_by_threads_and_released(self):
+        # Duas escritas presas na view, em threads (GUNICORN_THREADS > 1),
+        # ocupam as vagas também para outra instância do middleware (outro
+        # worker, quando o cache é compartilhado).
+        inside = threading.Barrier(3)
+        leave = threading.Event()
+
+        def make_request():
+            request = RequestFactory().post(self.url)
+            request.resolver_match = resolve(self.url)
+            return request
+
+        def slow_write():
+            def handler(request):
+                shed = middleware.process_view(request, None, (), {})
+                if shed:
+                    return shed
+                inside.wait(timeout=5)
+                leave.wait(timeout=5)
+                return HttpResponse("ok")
+
+            middleware = ThrottleMiddleware(handler)
+            return middleware(make_request()).status_code
+
+        other = ThrottleMiddleware(lambda request: None)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(slow_write) for _ in range(2)]
+            inside.wait(timeout=5)
+            response = other.process_view(make_request(), None, (), {})
+            self.assertEqual(response.status_code, 503)
+            leave.set()
+            self.assertEqual([future.result() for future in futures], [200, 200])
+        self.assertIsNone(other.process_view(make_request(), None, (), {}))
+
+
+class IdempotencyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="citizen", password="password")
+        self.user.profile.points = 100
+        self.user.profile.save()
+        self.reward = Reward.objects.create(name="Voucher", points_required=30)
+        self.client.login(username="citizen", password="password")
+        self.url = reverse("reciclAI:redeem_reward", args=[self.reward.id])
+
+    def test_replay_returns_stored_response_without_charging_again(self):
+        first = self.client.post(self.url, {"idempotency_key": "chave-0001"})
+        replay = self.client.post(
+            self.url, {"idempotency_key": "chave-0001"}, follow=True
+        )
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.points, 70)
+        self.assertEqual(UserReward.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(replay.redirect_chain[0][0], first["Location"])
+        self.assertIn("Parabéns", str(list(replay.context["messages"])[0]))
+
+        # Chave nova (ou cabeçalho) é outro resgate.
+        self.client.post(self.url, HTTP_IDEMPOTENCY_KEY="chave-0002")
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.points, 40)
+
+    def test_invalid_or_reused_key(self):
+        self.assertEqual(
+            self.client.post(self.url, {"idempotency_key": "x"}).status_code, 400
+        )
+        self.client.post(self.url, {"idempotency_key": "chave-0001"})
+        residue = Residue.objects.create(
+            citizen=self.user,
+            residue_type=ResidueType.objects.get(name="Vidro"),
+            units=1,
+            location="Rua A",
+        )
+        response = self.client.post(
+            reverse("reciclAI:request_collection", args=[residue.id]),
+            {"idempotency_key": "chave-0001"},
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Collection.objects.exists())
+
+    def test_request_collection_double_submit(self):
+        residue = Residue.objects.create(
+            citizen=self.user,
+            residue_type=ResidueType.objects.get(name="Vidro"),
+            units=1,
+            location="Rua A",
+        )
+        url = reverse("reciclAI:request_collection", args=[residue.id])
+        self.client.get(url)
+        self.assertFalse(Collection.objects.exists())
+
+        page = self.client.get(reverse("reciclAI:residue_list")).content.decode()
+        self.assertIn('name="idempotency_key"', page)
+
+        for _ in range(2):
+            response = self.client.post(url, {"idempotency_key": "pedido-0001"})
+            self.assertRedirects(
+                response,
+                reverse("reciclAI:collection_status"),
+                fetch_redirect_response=False,
+            )
+        # Sem chave, o segundo envio vira uma mensagem de erro, não um 500.
+        response = self.client.post(url)
+        self.assertRedirects(
+            response, reverse("reciclAI:residue_list"), fetch_redirect_response=False
+        )
+        self.assertEqual(Collection.objects.filter(residue=residue).count(), 1)
+
+    def test_delete_expired_in_batches(self):
+        for i in range(5):
+            IdempotencyKey.objects.create(
+                user=self.user, key=f"chave-{i:04}", route="r", status_code=302
+            )
+        IdempotencyKey.objects.filter(key__lt="chave-0003").update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+        self.assertEqual(idempotency.delete_expired(batch_size=2), 3)
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
+
+
+class UserSummaryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="citizen", password="password")
+        self.client.login(username="citizen", password="password")
+        self.residue_type = ResidueType.objects.get(name="Vidro")
+
+    def create_residue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Residue.objects.create(
+                citizen=self.user,
+                residue_type=self.residue_type,
+                units=1,
+                location="Rua A",
+            )
+
+    def test_navbar_reads_cache_once(self):
+        self.create_residue()
+        self.client.get(reverse("reciclAI:rewards_list"))  # Monta o resumo.
+        with mock.patch.object(summary, "cache", wraps=cache) as spy:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse("reciclAI:rewards_list"))
+        self.assertEqual(spy.get.call_count, 1)
+        self.assertFalse(
+            [q for q in ctx.captured_queries if "COUNT(" in q["sql"].upper()]
+        )
+        self.assertContains(response, '<span class="badge bg-warning text-dark">1')
+
+    def test_writes_invalidate_on_commit(self):
+        residue = self.create_residue()
+        self.assertEqual(summary.get(self.user.pk)["awaiting_request"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("reciclAI:request_collection", args=[residue.id]))
+        current = summary.get(self.user.pk)
+        self.assertEqual(current["awaiting_request"], 0)
+        self.assertEqual(current["open_collections"], 1)
+        self.assertEqual(current["updates"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            processing.cancel_collections(Collection.objects.all())
+        self.assertEqual(summary.get(self.user.pk)["open_collections"], 0)
+
+    def test_updates_reset_on_collection_status(self):
+        residue = self.create_residue()
+        with self.captureOnCommitCallbacks(execute=True):
+            collection = Collection.objects.create(residue=residue)
+        with self.captureOnCommitCallbacks(execute=True):
+            collection.status = "ATRIBUIDA"
+            collection.save()
+        self.assertEqual(summary.get(self.user.pk)["updates"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(reverse("reciclAI:collection_status"))
+        self.assertNotContains(response, "nova(s)")
+        self.assertEqual(summary.get(self.user.pk)["updates"], 0)
+        self.assertIsNotNone(Profile.objects.get(user=self.user).updates_seen_at)
+
+
+class WarmupTest(TestCase):
+    def test_every_route_and_template_is_warmed(self):
+        templates = list((Path(warmup.__file__).parent / "templates").rglob("*.html"))
+        # Um template com erro de sintaxe só seria registrado no log.
+        with self.assertNoLogs("reciclAI.perf", level="ERROR"):
+            self.assertEqual(warmup.compile_templates(), len(templates))
+        self.assertEqual(warmup.resolve_routes(), len(urls.urlpatterns))
+
+        with self.assertLogs("reciclAI.perf", level="INFO") as logs:
+            timings = warmup.warm_up()
+        self.assertEqual(set(timings), {"routes", "templates", "connections", "caches"})
+        self.assertIn("warm_up routes_ms=", logs.output[0])
+
+    def test_connect_pool_warms_every_thread(self):
+        barrier = threading.Barrier(3)
+
+        def opened():
+            barrier.wait(5)  # Uma tarefa por thread.
+            is_open = connection.connection is not None
+            connection.close()
+            return is_open
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            self.assertEqual(warmup.connect_pool(pool, 3), 3)
+            futures = [pool.submit(opened) for _ in range(3)]
+            self.assertEqual([future.result() for future in futures], [True] * 3)
+
+    def test_entry_points_warm_up_on_import(self):
+        from Rec import asgi, wsgi
+
+        for module in (wsgi, asgi):
+            with mock.patch.object(warmup, "warm_up") as warm_up:
+                importlib.reload(module)
+            warm_up.assert_called_once_with(open_connections=False)
+            with mock.patch.dict(os.environ, {"DJANGO_WARM_UP": "False"}):
+                with mock.patch.object(warmup, "warm_up") as warm_up:
+                    importlib.reload(module)
+            warm_up.assert_not_called()
+
+    def test_database_errors_do_not_stop_the_warm_up(self):
+        with mock.patch.object(
+            warmup, "load_caches", side_effect=OperationalError("no such table")
+        ):
+            with self.assertLogs("reciclAI.perf", level="ERROR"):
+                timings = warmup.warm_up(open_connections=False)
+        self.assertIn("caches", timings)
+
+    def test_asgi_warm_up_skips_connections(self):
+        with self.assertLogs("reciclAI.perf", level="INFO"):
+            timings = warmup.warm_up(open_connections=False)
+        self.assertEqual(set(timings), {"routes", "templates", "caches"})
+
+
+class NotificationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.citizen = User.objects.create_user(
+            username="citizen", password="password", email="citizen@example.com"
+        )
+        self.collector = User.objects.create_user(
+            username="collector", password="password", email="collector@example.com"
+        )
+        self.collector.profile.user_type = "L"
+        self.collector.profile.save()
+        self.residue = Residue.objects.create(
+            citizen=self.citizen,
+            residue_type=ResidueType.objects.get(name="Papelão"),
+            weight=5,
+            location="Av. Brasil",
+        )
+        self.collection = Collection.objects.create(
+            residue=self.residue, collector=self.collector, status="ATRIBUIDA"
+        )
+        self.client.login(username="collector", password="password")
+
+    def test_outbox_is_written_with_the_status_change(self):
+        self.client.post(
+            reverse("reciclAI:collection_transition", args=[self.collection.id]),
+            {"status": "EM_ROTA"},
+        )
+        notification = Notification.objects.get()
+        self.assertEqual(notification.user, self.citizen)
+        self.assertEqual(notification.kind, "COLETA_EM_ROTA")
+        self.assertIsNone(notification.sent_at)
+        self.assertEqual(mail.outbox, [])  # Nada é enviado na requisição.
+
+        # Mudanças que não levam a EM_ROTA não geram aviso.
+        self.client.post(
+            reverse("reciclAI:collection_transition", args=[self.collection.id]),
+            {"status": "COLETADA"},
+        )
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_dispatch_merges_events_per_user(self):
+        other = User.objects.create_user(username="sem-email", password="password")
+        notifications.notify(
+            notifications.collection_on_the_way(self.collection),
+            notifications.collection_processed(self.citizen.id, "Papelão", 12),
+            *notifications.new_collection(self.collection),
+            Notification(user=other, kind="COLETA_EM_ROTA", message="x"),
+        )
+        with self.assertNumQueries(3):
+            sent, emails, lag = notifications.dispatch_batch(batch_size=10)
+        self.assertEqual((sent, emails), (4, 2))
+        self.assertGreaterEqual(lag, 0)
+        by_recipient = {message.to[0]: message for message in mail.outbox}
+        citizen_email = by_recipient["citizen@example.com"]
+        self.assertEqual(citizen_email.subject, "Reciclaí: 2 atualizações")
+        self.assertIn("+12 pontos", citizen_email.body)
+        self.assertIn("Av. Brasil", by_recipient["collector@example.com"].body)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(notifications.dispatch_batch(), (0, 0, 0.0))
+
+    def test_refused_address_does_not_block_the_queue(self):
+        send_messages = EmailBackend.send_messages
+
+        def refuse_citizen(backend, messages):
+            if messages[0].to == ["citizen@example.com"]:
+                raise smtplib.SMTPRecipientsRefused({"citizen@example.com": (550, b"")})
+            return send_messages(backend, messages)
+
+        notifications.notify(
+            notifications.collection_on_the_way(self.collection),
+            Notification(user=self.collector, kind="COLETA_EM_ROTA", message="x"),
+        )
+        with mock.patch.object(EmailBackend, "send_messages", refuse_citizen):
+            with self.assertLogs("reciclAI.notifications", level="ERROR"):
+                self.assertEqual(notifications.dispatch_batch()[:2], (2, 1))
+        self.assertEqual([m.to for m in mail.outbox], [["collector@example.com"]])
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(notifications.dispatch_batch(), (0, 0, 0.0))
+
+    def test_new_collection_goes_to_nearby_collectors(self):
+        self.assertEqual(
+            [n.user_id for n in notifications.new_collection(self.collection)], [None]
+        )
+
+        far = User.objects.create_user(username="far", password="password")
+        idle = User.objects.create_user(username="idle", password="password")
+        for user, lat, lon in (
+            (self.collector, -23.56, -46.64),
+            (far, -22.90, -43.20),
+            (idle, None, None),
+        ):
+            user.profile.user_type = "L"
+            user.profile.latitude, user.profile.longitude = lat, lon
+            user.profile.save()
+        self.residue.latitude, self.residue.longitude = -23.55, -46.63
+        self.residue.save()
+
+        with self.assertNumQueries(1):
+            nearby = notifications.new_collection(self.collection)
+        self.assertEqual([n.user_id for n in nearby], [self.collector.id])
+        self.assertIn("Av. Brasil", nearby[0].message)
+
+        self.collector.profile.latitude = -22.0
+        self.collector.profile.save()
+        self.assertEqual(notifications.new_collection(self.collection), [])
+
+    def test_bulk_processing_and_command(self):
+        self.collection.status = "ENTREGUE_RECICLADORA"
+        self.collection.save()
+        processing.process_collections(Collection.objects.all())
+        self.assertEqual(
+            Notification.objects.get().kind,
+            "COLETA_PROCESSADA",
+        )
+        out = StringIO()
+        call_command("dispatch_notifications", "--batch-size", "1", stdout=out)
+        self.assertIn("1 aviso(s) em 1 e-mail(s)", out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class AssignmentTest(TestCase):
+    def setUp(self):
+        self.citizen = User.objects.create_user(username="citizen", password="password")
+        self.paper = ResidueType.objects.get(name="Papelão")
+        # Dois coletores a ~11 km um do outro (0,1° de latitude).
+        self.near = self.make_collector("near", -5.0, -42.8, capacity=1)
+        self.far = self.make_collector("far", -5.1, -42.8, capacity=5)
+
+    def make_collector(self, username, lat, lon, capacity):
+        user = User.objects.create_user(username=username, password="password")
+        Profile.objects.filter(user=user).update(
+            user_type="L", latitude=lat, longitude=lon, assignment_capacity=capacity
+        )
+        return user
+
+    def make_collection(self, lat, lon, **kwargs):
+        residue = Residue.objects.create(
+            citizen=self.citizen,
+            residue_type=self.paper,
+            weight=1,
+            location="Rua A",
+            latitude=lat,
+            longitude=lon,
+            status="COLETA_SOLICITADA",
+        )
+        return Collection.objects.create(residue=residue, **kwargs)
+
+    def test_nearest_collector_within_capacity(self):
+        first = self.make_collection(-5.001, -42.8)
+        second = self.make_collection(-5.002, -42.8)
+        unlocated = self.make_collection(None, None)
+        with CaptureQueriesContext(connection) as queries:
+            stats = assignment.assign_open_collections(max_km=25)
+        self.assertEqual(len([q for q in queries if q["sql"].startswith("UPDATE")]), 1)
+        self.assertEqual((stats["pickups"], stats["assigned"]), (2, 2))
+        collectors = {
+            c.id: (c.collector_id, c.status) for c in Collection.objects.all()
+        }
+        # O mais próximo só tem uma vaga: uma das coletas vai para o outro.
+        self.assertEqual(
+            sorted([collectors[first.id], collectors[second.id]]),
+            sorted([(self.near.id, "ATRIBUIDA"), (self.far.id, "ATRIBUIDA")]),
+        )
+        self.assertEqual(collectors[unlocated.id], (None, "SOLICITADA"))
+
+    def test_existing_load_and_distance_limit(self):
+        self.make_collection(-5.0, -42.8, collector=self.near, status="EM_ROTA")
+        pickup = self.make_collection(-5.0, -42.8)
+        distant = self.make_collection(-8.0, -42.8)
+        stats = assignment.assign_open_collections(max_km=25)
+        self.assertEqual(stats["assigned"], 1)
+        pickup.refresh_from_db()
+        distant.refresh_from_db()
+        self.assertEqual(pickup.collector, self.far)
+        self.assertEqual(distant.status, "SOLICITADA")
+
+    def test_accepted_meanwhile_is_not_overwritten(self):
+        pickup = self.make_collection(-5.0, -42.8)
+        result = assignment.solve(*assignment.load_candidates()[:2], max_km=25)
+        Collection.objects.filter(id=pickup.id).update(
+            collector=self.far, status="ATRIBUIDA"
+        )
+        self.assertEqual(
+            assignment.apply(result, {pickup.id: self.citizen.id}), (0, 0.0)
+        )
+        pickup.refresh_from_db()
+        self.assertEqual(pickup.collector, self.far)
+
+    def test_distance_and_claims_count_only_updated_rows(self):
+        taken = self.make_collection(-5.0, -42.8)
+        open_pickup = self.make_collection(-5.0, -42.9)
+        result = assignment.solve(*assignment.load_candidates()[:2], max_km=25)
+        Collection.objects.filter(id=taken.id).update(
+            collector=self.far, status="ATRIBUIDA"
+        )
+        citizens = {taken.id: self.citizen.id, open_pickup.id: self.citizen.id}
+        claimed = metrics.REGISTRY.get_sample_value(
+            "reciclai_collections_claimed_total"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            changed, total_km = assignment.apply(result, citizens)
+        self.assertEqual(changed, 1)
+        self.assertAlmostEqual(total_km, result[open_pickup.id][1])
+        self.assertEqual(
+            metrics.REGISTRY.get_sample_value("reciclai_collections_claimed_total"),
+            claimed + 1,
+        )
+
+    def test_command_requires_opt_in(self):
+        self.make_collection(-5.0, -42.8)
+        with self.assertRaises(CommandError):
+            call_command("assign_collections", stdout=StringIO())
+        self.assertFalse(Collection.objects.filter(status="ATRIBUIDA").exists())
+        out = StringIO()
+        with override_settings(AUTO_ASSIGN_ENABLED=True):
+            call_command("assign_collections", stdout=out)
+        self.assertIn("1 de 1 coleta(s)", out.getvalue())
+
+    def test_settings_view_requires_location(self):
+        self.client.login(username="near", password="password")
+        url = reverse("reciclAI:collector_assignment_settings")
+        response = self.client.post(url, {"assignment_capacity": 3})
+        self.assertContains(response, "Informe a localização")
+        response = self.client.post(
+            url, {"assignment_capacity": 3, "latitude": -5.2, "longitude": -42.7}
+        )
+        self.assertRedirects(response, reverse("reciclAI:collector_dashboard"))
+        profile = Profile.objects.get(user=self.near)
+        self.assertEqual((profile.assignment_capacity, profile.latitude), (3, -5.2))
+
+
+class PickupSlotTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.citizen = User.objects.create_user(username="citizen", password="password")
+        self.collector = User.objects.create_user(
+            username="collector", password="password"
+        )
+        self.collector.profile.user_type = "L"
+        self.collector.profile.save()
+        self.today = timezone.localdate()
+        self.slot = self.make_slot("Centro", self.today, "08:00", capacity=1)
+
+    def make_slot(self, area, date, start, capacity):
+        hour = int(start[:2])
+        return PickupSlot.objects.create(
+            area=area,
+            date=date,
+            start_time=start,
+            end_time=f"{hour + 2:02d}:00",
+            capacity=capacity,
+        )
+
+    def make_residue(self):
+        return Residue.objects.create(
+            citizen=self.citizen,
+            residue_type=ResidueType.objects.get(name="Papelão"),
+            weight=1,
+            location="Rua A",
+        )
+
+    def request(self, residue, slot_id):
+        return self.client.post(
+            reverse("reciclAI:request_collection", args=[residue.id]),
+            {"slot": slot_id},
+        )
+
+    def test_booking_takes_a_slot_until_full(self):
+        self.client.login(username="citizen", password="password")
+        first, second = self.make_residue(), self.make_residue()
+        self.request(first, self.slot.id)
+        collection = Collection.objects.get(residue=first)
+        self.assertEqual(collection.slot, self.slot)
+        first.refresh_from_db()
+        self.assertEqual(first.collection_date, self.today)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked, 1)
+
+        response = self.request(second, self.slot.id)
+        self.assertRedirects(response, reverse("reciclAI:residue_list"))
+        second.refresh_from_db()
+        self.assertEqual(second.status, "AGUARDANDO_SOLICITACAO_DE_COLETA")
+        self.assertFalse(Collection.objects.filter(residue=second).exists())
+
+    def test_repeated_request_gives_the_slot_back(self):
+        other = self.make_slot("Centro", self.today, "10:00", capacity=5)
+        self.client.login(username="citizen", password="password")
+        residue = self.make_residue()
+        self.request(residue, self.slot.id)
+        self.request(residue, other.id)
+        other.refresh_from_db()
+        self.assertEqual(other.booked, 0)
+
+    def test_free_slots_calendar_is_one_query(self):
+        later = self.make_slot("Norte", self.today + timedelta(days=2), "08:00", 3)
+        self.make_slot("Norte", self.today - timedelta(days=1), "08:00", 3)
+        self.make_slot("Norte", self.today + timedelta(days=30), "08:00", 3)
+        PickupSlot.objects.filter(id=self.slot.id).update(booked=1)
+        with self.assertNumQueries(1):
+            slots = scheduling.free_slots(days=14)
+        self.assertEqual(slots, [later])
+        self.assertEqual(scheduling.free_slots(days=14, area="Centro"), [])
+
+    def test_cancel_releases_slots(self):
+        big = self.make_slot("Sul", self.today, "08:00", capacity=5)
+        collections = []
+        for _ in range(3):
+            scheduling.book(big.id)
+            collections.append(
+                Collection.objects.create(residue=self.make_residue(), slot=big)
+            )
+        processing.cancel_collections(
+            Collection.objects.filter(id__in=[c.id for c in collections[:2]])
+        )
+        big.refresh_from_db()
+        self.assertEqual(big.booked, 1)
+
+        # Cancelamento pelo coletor.
+        Collection.objects.filter(id=collections[2].id).update(
+            collector=self.collector, status="ATRIBUIDA"
+        )
+        self.client.login(username="collector", password="password")
+        url = reverse("reciclAI:collection_transition", args=[collections[2].id])
+        self.client.post(url, {"status": "CANCELADA"})
+        big.refresh_from_db()
+        self.assertEqual(big.booked, 0)
+
+    def test_collector_day_view(self):
+        mine = Collection.objects.create(
+            residue=self.make_residue(),
+            slot=self.slot,
+            collector=self.collector,
+            status="ATRIBUIDA",
+        )
+        other = User.objects.create_user(username="other")
+        Collection.objects.create(
+            residue=self.make_residue(),
+            slot=self.slot,
+            collector=other,
+            status="ATRIBUIDA",
+        )
+        open_ = Collection.objects.create(residue=self.make_residue(), slot=self.slot)
+        with self.assertNumQueries(2):
+            slots = scheduling.day_schedule(self.collector, self.today)
+        self.assertEqual(slots, [self.slot])
+        self.assertEqual(
+            {c.id for c in slots[0].visible_collections}, {mine.id, open_.id}
+        )
+        self.client.login(username="collector", password="password")
+        response = self.client.get(
+            reverse("reciclAI:collector_schedule"), {"dia": "2026-02-30"}
+        )
+        self.assertContains(response, "08:00-10:00 · Centro")
+
+    def test_create_pickup_slots_command(self):
+        args = ["--area", "Centro", "--window", "08:00-10:00"]
+        args += ["--window", "10:00-12:00", "--capacity", "4", "--days", "3"]
+        out = StringIO()
+        call_command("create_pickup_slots", *args, stdout=out)
+        # A janela de hoje às 08:00 já existia.
+        self.assertIn("5 janela(s) criada(s) de 6", out.getvalue())
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.capacity, 1)
+        with self.assertRaises(CommandError):
+            call_command(
+                "create_pickup_slots",
+                "--area=Centro",
+                "--window=10:00-08:00",
+                "--capacity=1",
+            )
+
+
+class RecyclerIntakeTest(TestCase):
+    def setUp(self):
+        self.citizen = User.objects.create_user(username="citizen", password="password")
+        self.recycler = self.make_recycler("recycler")
+        self.other = self.make_recycler("other")
+        self.paper = ResidueType.objects.get(name="Papelão")
+
+    def make_recycler(self, username):
+        user = User.objects.create_user(username=username, password="password")
+        user.profile.user_type = "R"
+        user.profile.save()
+        return user
+
+    def deliver(self, recycler, count, start=None):
+        start = start or timezone.now()
+        residues = Residue.objects.bulk_create(
+            Residue(
+                citizen=self.citizen, residue_type=self.paper, units=1, location="Rua"
+            )
+            for _ in range(count)
+        )
+        return Collection.objects.bulk_create(
+            Collection(
+                residue=residue,
+                recycler=recycler,
+                status="ENTREGUE_RECICLADORA",
+                delivered_at=start + timedelta(minutes=i),
+            )
+            for i, residue in enumerate(residues)
+        )
+
+    def test_dashboard_reads_only_own_queue_in_delivery_order(self):
+        now = timezone.now()
+        later, earlier = self.deliver(self.recycler, 1, now), self.deliver(
+            self.recycler, 1, now - timedelta(hours=1)
+        )
+        self.deliver(self.other, 3)
+        page, has_next = intake.queue_page(self.recycler)
+        self.assertEqual(page, earlier + later)
+        self.assertFalse(has_next)
+
+    def test_deliveries_without_recycler_show_in_every_queue(self):
+        (legacy,) = self.deliver(None, 1, timezone.now() - timedelta(days=30))
+        (own,) = self.deliver(self.recycler, 1)
+        self.assertEqual(intake.queue_page(self.recycler)[0], [legacy, own])
+        self.assertEqual(intake.queue_page(self.other)[0], [legacy])
+
+        self.client.login(username="other", password="password")
+        self.client.post(reverse("reciclAI:process_collection", args=[legacy.id]))
+        self.assertEqual(intake.queue_page(self.recycler)[0], [own])
+
+    def test_dashboard_query_count_does_not_grow_with_queue(self):
+        self.client.login(username="recycler", password="password")
+        url = reverse("reciclAI:recycler_dashboard")
+        self.deliver(self.recycler, 2)
+        self.client.get(url)  # Sessão e resumo em cache.
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        self.deliver(self.recycler, intake.PAGE_SIZE * 2)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url, {"pagina": 2})
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(response.context["collections_to_process"]), 25)
+        self.assertTrue(response.context["has_next"])
+
+    def test_cannot_process_another_recyclers_delivery(self):
+        (theirs,) = self.deliver(self.other, 1)
+        (legacy,) = self.deliver(None, 1)
+        self.client.login(username="recycler", password="password")
+        response = self.client.post(
+            reverse("reciclAI:process_collection", args=[theirs.id])
+        )
+        self.assertEqual(response.status_code, 404)
+        # Entregas sem destino podem ser processadas por qualquer recicladora.
+        self.client.post(reverse("reciclAI:process_collection", args=[legacy.id]))
+        legacy.refresh_from_db()
+        self.assertEqual(
+            (legacy.status, legacy.recycler), ("PROCESSADO", self.recycler)
+        )
+
+
+def make_jpeg(size=(1200, 900)):
+    buffer = BytesIO()
+    Image.new("RGB", size, (30, 120, 60)).save(buffer, "JPEG")
+    return SimpleUploadedFile("foto.jpg", buffer.getvalue(), "image/jpeg")
+
+
+class ResiduePhotoTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.citizen = User.objects.create_user(username="citizen", password="password")
+        self.collector = User.objects.create_user(
+            username="collector", password="password"
+        )
+        self.collector.profile.user_type = "L"
+        self.collector.profile.save()
+        self.client.login(username="citizen", password="password")
+
+    def upload(self, photo):
+        return self.client.post(
+            reverse("reciclAI:residue_create"),
+            {
+                "residue_type": "Papelão",
+                "weight": "2",
+                "location": "Rua A",
+                "photo": photo,
+            },
+        )
+
+    def test_upload_is_streamed_and_thumbnails_are_generated_later(self):
+        self.upload(make_jpeg())
+        residue = Residue.objects.get()
+        self.assertTrue(default_storage.exists(residue.photo.name))
+        self.assertIsNone(residue.photo_processed_at)
+        self.assertEqual(photos.photo_url(residue, 160), "")
+
+        out = StringIO()
+        call_command("generate_thumbnails", stdout=out)
+        self.assertIn("1 foto(s)", out.getvalue())
+        residue.refresh_from_db()
+        self.assertEqual(
+            sorted(residue.photo_thumbnails, key=int), ["160", "480", "1024"]
+        )
+        with default_storage.open(residue.photo_thumbnails["160"]) as thumbnail:
+            image = Image.open(thumbnail)
+            self.assertEqual((image.format, image.size), ("WEBP", (160, 120)))
+        self.assertEqual(photos.process_pending(), 0)
+
+    def test_upload_handlers_write_to_disk(self):
+        request = RequestFactory().get("/")
+        self.assertEqual(
+            [type(handler).__name__ for handler in request.upload_handlers],
+            ["TemporaryFileUploadHandler"],
+        )
+
+    def test_rejects_non_images_and_large_files(self):
+        response = self.upload(SimpleUploadedFile("foto.jpg", b"texto", "image/jpeg"))
+        self.assertFalse(Residue.objects.exists())
+        self.assertTrue(response.context["form"].errors["photo"])
+        with override_settings(RESIDUE_PHOTO_MAX_SIZE=100):
+            response = self.upload(make_jpeg())
+        self.assertIn("no máximo", str(response.context["form"].errors["photo"]))
+
+    def test_thumbnail_view_cache_headers_and_access(self):
+        self.upload(make_jpeg())
+        photos.process_pending()
+        residue = Residue.objects.get()
+        url = photos.photo_url(residue, 160)
+        self.assertIn("?v=", url)
+
+        self.client.login(username="collector", password="password")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Content-Type"], "image/webp")
+        response.close()
+        response = self.client.get(
+            reverse("reciclAI:residue_photo", args=[residue.id, "999"])
+        )
+        self.assertEqual(response.status_code, 404)
+
+        User.objects.create_user(username="other", password="password")
+        self.client.login(username="other", password="password")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_dashboard_lists_thumbnails_not_originals(self):
+        self.upload(make_jpeg())
+        residue = Residue.objects.get()
+        self.client.post(reverse("reciclAI:request_collection", args=[residue.id]))
+        photos.process_pending()
+        residue.refresh_from_db()
+        self.client.login(username="collector", password="password")
+        response = self.client.get(reverse("reciclAI:collector_dashboard"))
+        self.assertContains(response, f'src="{photos.photo_url(residue, 160)}"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertNotContains(response, f'src="{photos.photo_url(residue)}"')
+
+    def test_deleting_residue_removes_files(self):
+        self.upload(make_jpeg())
+        photos.process_pending()
+        residue = Residue.objects.get()
+        names = [residue.photo.name, *residue.photo_thumbnails.values()]
+        with self.captureOnCommitCallbacks(execute=True):
+            residue.delete()
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+
+class RollupTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.citizen = User.objects.create_user(username="citizen", password="password")
+        self.recycler = User.objects.create_user(
+            username="recycler", password="password"
+        )
+        self.recycler.profile.user_type = "R"
+        self.recycler.profile.save()
+        self.paper = ResidueType.objects.get(name="Papelão")
+        self.glass = ResidueType.objects.get(name="Vidro")
+        self.slot = PickupSlot.objects.create(
+            area="Centro",
+            date=timezone.localdate(),
+            start_time="08:00",
+            end_time="10:00",
+            capacity=10,
+        )
+        self.later = timezone.now() + timedelta(hours=1)
+
+    def processed(self, residue_type, weight=None, units=None, at=None, **kwargs):
+        residue = Residue.objects.create(
+            citizen=self.citizen,
+            residue_type=residue_type,
+            weight=weight,
+            units=units,
+            location="Rua",
+        )
+        return Collection.objects.create(
+            residue=residue,
+            status="PROCESSADO",
+            processed_at=at or timezone.now(),
+            recycler=self.recycler,
+            **kwargs,
+        )
+
+    def rollup(self):
+        return {
+            (row.residue_type_id, row.area): (row.collections, row.weight, row.units)
+            for row in DailyRollup.objects.all()
+        }
+
+    def test_incremental_update_from_watermark(self):
+        moment = timezone.now()
+        self.processed(self.paper, weight="2.50", at=moment, slot=self.slot)
+        self.processed(self.paper, weight="1.00", at=moment, slot=self.slot)
+        self.processed(self.glass, units=3, at=moment)
+        stats = rollups.update(now=self.later)
+        self.assertEqual(stats["collections"], 3)
+        self.assertEqual(
+            self.rollup(),
+            {
+                (self.paper.id, "Centro"): (2, Decimal("3.50"), 0),
+                (self.glass.id, ""): (1, Decimal("0"), 3),
+            },
+        )
+        # Mesmo processed_at da marca d'água: entra pelo id.
+        self.processed(self.paper, weight="1.25", at=moment, slot=self.slot)
+        self.assertEqual(rollups.update(now=self.later)["collections"], 1)
+        self.assertEqual(rollups.update(now=self.later)["collections"], 0)
+        self.assertEqual(
+            self.rollup()[(self.paper.id, "Centro")], (3, Decimal("4.75"), 0)
+        )
+        incremental = self.rollup()
+        rollups.rebuild(now=self.later)
+        self.assertEqual(self.rollup(), incremental)
+
+    def test_rollups_use_measured_weight_and_follow_reweighing(self):
+        counted = self.processed(self.paper, weight="2.00", slot=self.slot)
+        pending = self.processed(self.paper, weight="5.00", slot=self.slot)
+        Collection.objects.filter(id=pending.id).update(measured_weight="4.00")
+        # `pending` processada depois da marca: ainda não somada.
+        Collection.objects.filter(id=pending.id).update(
+            processed_at=timezone.now() + timedelta(hours=2)
+        )
+        rollups.update(now=self.later)
+        self.assertEqual(self.rollup()[(self.paper.id, "Centro")][1], Decimal("2.00"))
+
+        lines = ["coleta,peso\n", f"{counted.id},3.25\n", f"{pending.id},4.50\n"]
+        weighing.ingest(lines, self.recycler)
+        self.assertEqual(self.rollup()[(self.paper.id, "Centro")][1], Decimal("3.25"))
+        weighing.ingest(["coleta,peso\n", f"{counted.id},3.00\n"], self.recycler)
+        self.assertEqual(self.rollup()[(self.paper.id, "Centro")][1], Decimal("3.00"))
+
+        rollups.update(now=self.later + timedelta(hours=2))
+        incremental = self.rollup()
+        self.assertEqual(
+            incremental[(self.paper.id, "Centro")], (2, Decimal("7.50"), 0)
+        )
+        rollups.rebuild(now=self.later + timedelta(hours=2))
+        self.assertEqual(self.rollup(), incremental)
+
+    def test_recent_processing_waits_to_settle(self):
+        self.processed(self.paper, weight=1)
+        self.assertEqual(rollups.update()["collections"], 0)
+        self.assertEqual(rollups.update(now=self.later)["collections"], 1)
+
+    def test_analytics_read_only_rollups(self):
+        self.processed(self.paper, weight=2, slot=self.slot)
+        call_command("update_rollups", "--rebuild", stdout=StringIO())
+        self.assertFalse(DailyRollup.objects.exists())  # Ainda não assentou.
+        rollups.update(now=self.later)
+
+        self.client.login(username="recycler", password="password")
+        url = reverse("reciclAI:recycler_analytics")
+        self.client.get(url)  # Resumo da barra de navegação em cache.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, "Papelão")
+        self.assertFalse([q for q in queries if "reciclAI_collection" in q["sql"]])
+
+        User.objects.create_superuser("admin", password="password")
+        self.client.login(username="admin", password="password")
+        data = self.client.get(reverse("reciclAI:city_analytics")).json()
+        self.assertEqual(data["by_area"][0]["area"], "Centro")
+        self.assertEqual(data["by_recycler"][0]["total_collections"], 1)
+
+    def test_public_counter_is_cached_and_single_flight(self):
+        self.processed(self.glass, units=4)
+        rollups.update(now=self.later)
+        response = self.client.get(reverse("reciclAI:public_index"))
+        self.assertContains(response, "coletas concluídas")
+        self.assertEqual(response.context["impact"]["units"], 4)
+
+        # Valor velho e outro processo recalculando: serve o velho, sem
+        # consultar o banco.
+        stale = dict(cache.get(rollups.IMPACT_KEY), computed_at=0)
+        cache.set(rollups.IMPACT_KEY, stale)
+        cache.add(rollups.IMPACT_LOCK_KEY, True)
+        with self.assertNumQueries(0):
+            self.assertEqual(rollups.impact(), stale)
+        cache.delete(rollups.IMPACT_LOCK_KEY)
+        self.assertGreater(rollups.impact()["computed_at"], 0)
+
+
+class FragmentCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.citizen = User.objects.create_user(username="citizen", password="password")
+        self.collector = User.objects.create_user(
+            username="collector", password="password"
+        )
+        self.collector.profile.user_type = "L"
+        self.collector.profile.save()
+        self.recycler = User.objects.create_user(
+            username="recycler", password="password"
+        )
+        self.recycler.profile.user_type = "R"
+        self.recycler.profile.save()
+        self.paper = ResidueType.objects.get(name="Papelão")
+        residue = Residue.objects.create(
+            citizen=self.citizen, residue_type=self.paper, units=1, location="Rua A"
+        )
+        self.collection = Collection.objects.create(residue=residue)
+
+    def test_citizen_list_is_served_from_cache_until_a_status_write(self):
+        self.client.login(username="citizen", password="password")
+        url = reverse("reciclAI:collection_status")
+        self.assertContains(self.client.get(url), "Solicitada")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(
+            any("reciclAI_collection" in query["sql"] for query in queries)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.collection.collector = self.collector
+            self.collection.status = "EM_ROTA"
+            self.collection.save()
+        self.assertContains(self.client.get(url), "Em Rota")
+
+    def test_bulk_processing_refreshes_recycler_section(self):
+        self.collection.status = "ENTREGUE_RECICLADORA"
+        self.collection.recycler = self.recycler
+        self.collection.save()
+        self.client.login(username="recycler", password="password")
+        url = reverse("reciclAI:recycler_dashboard")
+        self.assertContains(self.client.get(url), "Nenhuma coleta foi processada")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            processing.process_collections(Collection.objects.all())
+        response = self.client.get(url)
+        self.assertNotContains(response, "Nenhuma coleta foi processada")
+        self.assertContains(response, "do cidadão <strong>citizen</strong>")
+
+    def test_rows_follow_residue_type_renames(self):
+        self.client.login(username="collector", password="password")
+        url = reverse("reciclAI:collector_dashboard")
+        self.assertContains(self.client.get(url), "Papelão")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.paper.name = "Papelão ondulado"
+            self.paper.save()
+        self.assertContains(self.client.get(url), "Papelão ondulado")
+
+    def test_rows_follow_residue_edits(self):
+        self.client.login(username="collector", password="password")
+        url = reverse("reciclAI:collector_dashboard")
+        self.assertContains(self.client.get(url), "Rua A")
+        residue = self.collection.residue
+        residue.location = "Rua B, 12"
+        residue.save()  # Como no admin de resíduos.
+        response = self.client.get(url)
+        self.assertContains(response, "Rua B, 12")
+        self.assertNotContains(response, "Rua A")
+
+    def test_forms_are_rendered_outside_cached_rows(self):
+        self.client.login(username="collector", password="password")
+        url = reverse("reciclAI:collector_dashboard")
+        first, second = self.client.get(url), self.client.get(url)
+        key = f'name="{idempotency.FIELD}" value="'
+        self.assertIn(key, first.content.decode())
+        self.assertNotEqual(
+            first.content.decode().split(key)[1][:32],
+            second.content.decode().split(key)[1][:32],
+        )
+
+
+class WeighingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.citizen = User.objects.create_user(username="citizen", password="password")
+        self.recycler = User.objects.create_user(
+            username="recycler", password="password"
+        )
+        self.recycler.profile.user_type = "R"
+        self.recycler.profile.save()
+        self.other = User.objects.create_user(username="other", password="password")
+        self.other.profile.user_type = "R"
+        self.other.profile.save()
+        self.paper = ResidueType.objects.get(name="Papelão")
+
+    def deliver(self, recycler, weight=None):
+        residue = Residue.objects.create(
+            citizen=self.citizen,
+            residue_type=self.paper,
+            weight=weight,
+            units=None if weight else 1,
+            location="Rua",
+        )
+        return Collection.objects.create(
+            residue=residue, recycler=recycler, status="ENTREGUE_RECICLADORA"
+        )
+
+    def test_parse_reads_csv_and_ndjson(self):
+        csv_lines = ["coleta;peso\n", "1;2,5\n", "\n", "x;3\n", "2;-1\n"]
+        self.assertEqual(
+            [row[1:3] for row in weighing.parse(csv_lines) if not row[3]],
+            [(1, Decimal("2.50"))],
+        )
+        self.assertEqual(
+            [(row[0], row[3]) for row in weighing.parse(csv_lines) if row[3]],
+            [(4, "Coleta inválida: 'x'."), (5, "Peso fora do intervalo: '-1'.")],
+        )
+        ndjson_lines = ['{"coleta": 3, "peso": 1.25}\n', "{\n", '{"coleta": 4}\n']
+        self.assertEqual(
+            [row[1:] for row in weighing.parse(ndjson_lines)],
+            [
+                (3, Decimal("1.25"), None),
+                (None, None, "JSON inválido."),
+                (None, None, "Cada linha precisa dos campos coleta e peso."),
+            ],
+        )
+
+    def test_upload_weighs_own_collections_and_reports_difference(self):
+        mine = self.deliver(self.recycler, Decimal("10"))
+        theirs = self.deliver(self.other, Decimal("5"))
+        upload = SimpleUploadedFile(
+            "pesagens.csv",
+            f"coleta,peso\n{mine.id},12.5\n{theirs.id},7\nabc,1\n".encode(),
+            "text/csv",
+        )
+        self.client.login(username="recycler", password="password")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("reciclAI:recycler_weighings"), {"file": upload}
+            )
+        report = response.context["report"]
+        self.assertEqual(
+            (report["weighed"], report["unknown"], report["invalid"]), (1, 1, 1)
+        )
+        self.assertEqual(report["difference"], Decimal("2.50"))
+        mine.refresh_from_db()
+        theirs.refresh_from_db()
+        self.assertEqual(mine.measured_weight, Decimal("12.50"))
+        self.assertIsNotNone(mine.weighed_at)
+        self.assertIsNone(theirs.measured_weight)
+
+    def test_one_update_per_batch(self):
+        collections = [self.deliver(self.recycler, Decimal(i + 1)) for i in range(5)]
+        lines = ["coleta,peso\n"] + [
+            f"{c.id},{i + 3}\n" for i, c in enumerate(collections)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            report = weighing.ingest(lines, self.recycler, batch_size=2)
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(report["weighed"], 5)
+        self.assertEqual(report["difference"], Decimal(10))
+        self.assertEqual(report["largest"][0]["difference"], Decimal(2))
+
+    def test_command_imports_file(self):
+        collection = self.deliver(self.recycler)
+        path = Path(tempfile.mkdtemp()) / "pesagens.ndjson"
+        self.addCleanup(shutil.rmtree, path.parent)
+        path.write_text(f'{{"coleta": {collection.id}, "peso": "4.2"}}\n')
+        out = StringIO()
+        call_command("import_weighings", str(path), recycler="recycler", stdout=out)
+        self.assertIn("1 coleta(s) pesada(s)", out.getvalue())
+        collection.refresh_from_db()
+        self.assertEqual(collection.measured_weight, Decimal("4.20"))
+        with self.assertRaises(CommandError):
+            call_command("import_weighings", str(path), recycler="citizen")
+
+
+class VoucherTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reward = Reward.objects.create(
+            name="Cinema", points_required=10, uses_vouchers=True
+        )
+        self.users = [
+            User.objects.create_user(username=f"citizen{i}", password="password")
+            for i in range(3)
+        ]
+        Profile.objects.filter(user__in=self.users).update(points=100)
+
+    def test_redemptions_claim_distinct_codes_until_pool_is_empty(self):
+        vouchers.import_codes(self.reward, ["AAA\n", "BBB\n"])
+        codes = [
+            rewards.redeem_reward(user, self.reward).voucher.code
+            for user in self.users[:2]
+        ]
+        self.assertEqual(codes, ["AAA", "BBB"])
+        with self.assertRaisesMessage(rewards.RedemptionError, "esgotada"):
+            rewards.redeem_reward(self.users[2], self.reward)
+        # O débito de quem ficou sem código foi desfeito.
+        self.assertEqual(Profile.objects.get(user=self.users[2]).points, 100)
+        self.assertFalse(UserReward.objects.filter(user=self.users[2]).exists())
+
+    def test_claim_is_a_single_update(self):
+        vouchers.generate(self.reward, 5)
+        user_reward = UserReward.objects.create(user=self.users[0], reward=self.reward)
+        with CaptureQueriesContext(connection) as queries:
+            voucher = vouchers.claim(self.reward, user_reward)
+        self.assertEqual([q["sql"].split()[0] for q in queries].count("UPDATE"), 1)
+        self.assertEqual(len(voucher.code), vouchers.CODE_LENGTH)
+        self.assertEqual(VoucherCode.objects.filter(claimed_at__isnull=True).count(), 4)
+
+    def test_import_skips_duplicates_and_long_codes(self):
+        vouchers.import_codes(self.reward, ["X1"])
+        stats = vouchers.import_codes(
+            self.reward, ["X1\n", "X2\n", "\n", "X2\n", "Y" * 65 + "\n"]
+        )
+        self.assertEqual(stats, {"codes": 4, "added": 1, "invalid": 1})
+        self.assertEqual(self.reward.vouchers.count(), 2)
+
+    def test_command_generates_codes_and_enables_vouchers(self):
+        reward = Reward.objects.create(name="Café", points_required=5)
+        out = StringIO()
+        call_command("vouchers", str(reward.id), generate=3, prefix="CAFE-", stdout=out)
+        reward.refresh_from_db()
+        self.assertTrue(reward.uses_vouchers)
+        codes = list(reward.vouchers.values_list("code", flat=True))
+        self.assertEqual(len(codes), 3)
+        self.assertTrue(all(code.startswith("CAFE-") for code in codes))
+        with self.assertRaises(CommandError):
+            call_command("vouchers", str(reward.id), stdout=out)
+
+    def test_redeem_view_shows_code_and_low_stock_is_reported(self):
+        vouchers.import_codes(self.reward, ["PROMO42"])
+        self.client.login(username="citizen0", password="password")
+        response = self.client.post(
+            reverse("reciclAI:redeem_reward", args=[self.reward.id]), follow=True
+        )
+        self.assertContains(response, "Seu código: PROMO42")
+        self.assertContains(response, "<code>PROMO42</code>")
+
+        out = StringIO()
+        call_command("vouchers", low_stock=True, stdout=out)
+        self.assertIn("Cinema\t0 livre(s)", out.getvalue())
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        response = self.client.get(reverse("admin:reciclAI_reward_changelist"))
+        self.assertContains(response, "Vouchers abaixo do alerta: Cinema (0)")
+
+
+class VoucherConcurrencyTest(TransactionTestCase):
+    def test_parallel_redemptions_never_share_a_code(self):
+        reward = Reward.objects.create(
+            name="Cinema", points_required=10, uses_vouchers=True
+        )
+        vouchers.generate(reward, 10)
+        users = [User.objects.create_user(username=f"citizen{i}") for i in range(16)]
+        Profile.objects.filter(user__in=users).update(points=100)
+        barrier = threading.Barrier(len(users))
+
+        def redeem(user):
+            # O banco de teste em memória recusa na hora uma tabela travada
+            # por outra conexão (não espera como o arquivo em WAL); o resgate
+            # inteiro foi desfeito, então é só tentar de novo.
+            barrier.wait()
+            try:
+                for _ in range(500):
+                    try:
+                        return rewards.redeem_reward(user, reward).voucher.code
+                    except OperationalError as exc:
+                        if "locked" not in str(exc):
+                            raise
+                        time.sleep(0.005)
+            except rewards.RedemptionError:
+                return None
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(len(users)) as pool:
+            codes = [code for code in pool.map(redeem, users) if code]
+        self.assertEqual(len(codes), 10)
+        self.assertEqual(len(set(codes)), 10)
+        self.assertEqual(
+            VoucherCode.objects.filter(user_reward__isnull=False).count(), 10
+        )
+        self.assertEqual(UserReward.objects.count(), 10)
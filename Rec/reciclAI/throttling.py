@@ -0,0 +1,93 @@
+"""
+Limite de taxa por usuário e rota (token bucket) e vagas de escrita.
+
+Cada par (rota, usuário) tem um balde com até `burst` fichas, reabastecido
+a `per_minute` fichas por minuto; cada POST consome uma. O estado fica no
+cache local, então com vários workers o limite vale por processo (e um
+cliente distribuído entre N workers pode chegar a N vezes o limite).
+
+As vagas de escrita são chaves do cache ocupadas com `cache.add`. Com
+DJANGO_CACHE_URL elas valem para todos os workers; no LocMemCache, só
+entre as threads de um worker (GUNICORN_THREADS > 1): com workers sync de
+uma thread cada processo atende uma escrita por vez e nunca recusa nada.
+Cada vaga expira sozinha depois de `lease` segundos, para que um worker
+encerrado no meio de uma escrita não a prenda para sempre; ela guarda um
+token aleatório e só é liberada por quem ainda tem esse token. Quem espera
+por uma vaga tenta de novo com espera exponencial e aleatória, para não
+martelar o cache justamente quando o site está sobrecarregado.
+"""
+
+import random
+import secrets
+import threading
+import time
+
+from django.core.cache import cache
+
+WRITE_SLOT_KEY = "throttle:write_slot:{}"
+# Espera entre tentativas de ocupar uma vaga (segundos): começa em
+# SLOT_BACKOFF_MIN e dobra até SLOT_BACKOFF_MAX, sorteada de 0 até o limite.
+SLOT_BACKOFF_MIN = 0.005
+SLOT_BACKOFF_MAX = 0.1
+
+# Ler e gravar o balde no LocMemCache não é atômico; a trava serializa as
+# threads do processo (a operação leva microssegundos).
+_lock = threading.Lock()
+
+
+def take_token(key, burst, per_minute, now=None):
+    """
+    Consome uma ficha do balde `key`. Retorna 0 se havia ficha ou, senão,
+    quantos segundos faltam para a próxima.
+    """
+    now = time.time() if now is None else now
+    rate = per_minute / 60
+    with _lock:
+        tokens, updated = cache.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens >= 1:
+            # O balde expira quando estaria cheio de novo.
+            cache.set(key, (tokens - 1, now), int((burst - tokens + 1) / rate) + 1)
+            return 0
+        cache.set(key, (tokens, now), int(burst / rate) + 1)
+        return (1 - tokens) / rate
+
+
+def acquire_write_slot(limit, timeout, lease):
+    """
+    Ocupa uma das `limit` vagas de escrita, esperando até `timeout`
+    segundos. Retorna (chave, token) para `release_write_slot`, ou None.
+    """
+    token = secrets.token_hex(8)
+    deadline = time.monotonic() + timeout
+    backoff = SLOT_BACKOFF_MIN
+    while True:
+        # Começa por uma vaga sorteada para espalhar as tentativas.
+        first = random.randrange(limit)
+        for i in range(limit):
+            key = WRITE_SLOT_KEY.format((first + i) % limit)
+            if cache.add(key, token, lease):
+                return key, token
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(random.uniform(0, backoff), remaining))
+        backoff = min(backoff * 2, SLOT_BACKOFF_MAX)
+
+
+def release_write_slot(slot):
+    """
+    Libera a vaga se ela ainda é deste token: se a concessão expirou e outra
+    requisição ocupou a vaga, ela continua com a outra. (Entre o get e o
+    delete sobra uma janela de microssegundos, contra `lease` segundos de
+    concessão.)
+    """
+    key, token = slot
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def client_key(request):
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
@@ -11,6 +11,16 @@ urlpatterns = [
     # --- Fluxo do Cidadão ---
     path("cidadao/residuos/", views.residue_list, name="residue_list"),
     path("cidadao/residuos/cadastrar/", views.residue_create, name="residue_create"),
+    path(
+        "cidadao/residuos/tipos/",
+        views.residue_type_autocomplete,
+        name="residue_type_autocomplete",
+    ),
+    path(
+        "residuos/<int:residue_id>/foto/<str:size>/",
+        views.residue_photo,
+        name="residue_photo",
+    ),
     path(
         "cidadao/residuos/<int:residue_id>/solicitar-coleta/",
         views.request_collection,
@@ -18,6 +28,7 @@ urlpatterns = [
     ),
     path("cidadao/coletas/", views.collection_status, name="collection_status"),
     path("cidadao/pontos/", views.points_history, name="points_history"),
+    path("cidadao/ranking/", views.leaderboard_view, name="leaderboard"),
     path("cidadao/recompensas/", views.rewards_list, name="rewards_list"),
     path(
         "cidadao/recompensas/<int:reward_id>/resgatar/",
@@ -26,6 +37,12 @@ urlpatterns = [
     ),
     # --- Fluxo do Coletor ---
     path("coletor/dashboard/", views.collector_dashboard, name="collector_dashboard"),
+    path("coletor/agenda/", views.collector_schedule, name="collector_schedule"),
+    path(
+        "coletor/atribuicao/",
+        views.collector_assignment_settings,
+        name="collector_assignment_settings",
+    ),
     path(
         "coletor/coletas/<int:collection_id>/aceitar/",
         views.accept_collection,
@@ -38,9 +55,24 @@ urlpatterns = [
     ),
     # --- Fluxo da Recicladora ---
     path("recicladora/dashboard/", views.recycler_dashboard, name="recycler_dashboard"),
+    path("recicladora/busca/", views.collection_search, name="collection_search"),
+    path(
+        "recicladora/indicadores/",
+        views.recycler_analytics,
+        name="recycler_analytics",
+    ),
+    path(
+        "recicladora/pesagens/",
+        views.recycler_weighings,
+        name="recycler_weighings",
+    ),
     path(
         "recicladora/coletas/<int:collection_id>/processar/",
         views.process_collection,
         name="process_collection",
     ),
+    # --- Monitoramento (equipe) ---
+    path("interno/desempenho/", views.performance_stats, name="performance_stats"),
+    path("interno/indicadores/", views.city_analytics, name="city_analytics"),
+    path("metrics", views.metrics_view, name="metrics"),
 ]
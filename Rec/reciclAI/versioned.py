@@ -0,0 +1,55 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class VersionedValue:
+    """
+    Valor caro de montar (regras compiladas, índices) mantido em memória em
+    cada processo. `invalidate()` incrementa uma versão no cache; os
+    processos que compartilham o cache remontam o valor na próxima leitura,
+    e os demais o remontam no máximo a cada `settings.<max_age_setting>`
+    segundos.
+    """
+
+    def __init__(self, version_key, build, max_age_setting, default_max_age=60):
+        self.version_key = version_key
+        self.build = build
+        self.max_age_setting = max_age_setting
+        self.default_max_age = default_max_age
+        # (valor, versão, montado em), trocado de uma vez: uma leitura nunca
+        # combina o valor de uma montagem com a versão de outra.
+        self._state = None
+        self._lock = threading.Lock()
+
+    def _current(self, version, max_age):
+        state = self._state
+        if state is None:
+            return None
+        value, built_version, built_at = state
+        if built_version != version or time.monotonic() - built_at > max_age:
+            return None
+        return value
+
+    def get(self):
+        version = cache.get(self.version_key, 0)
+        max_age = getattr(settings, self.max_age_setting, self.default_max_age)
+        value = self._current(version, max_age)
+        if value is not None:
+            return value
+        with self._lock:
+            # Outra thread pode ter remontado enquanto esta esperava a trava.
+            value = self._current(version, max_age)
+            if value is None:
+                value = self.build()
+                self._state = (value, version, time.monotonic())
+        return value
+
+    def invalidate(self):
+        self._state = None
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, 1, None)
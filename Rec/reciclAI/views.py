@@ -1,13 +1,52 @@
+import io
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
-from django.urls import reverse
-from django.http import HttpResponseForbidden
+from django.core.files.storage import default_storage
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    JsonResponse,
+)
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import login
 from django.db import transaction
+from django.db.models import F
 from django.contrib import messages
 from django.utils import timezone
-from .models import Residue, Collection, Profile, PointsTransaction, Reward, UserReward
-from .forms import CustomUserCreationForm, ResidueForm, CollectionStatusForm
+from django.utils.dateparse import parse_date
+from django.utils.crypto import constant_time_compare
+from django.conf import settings
+from .models import Residue, Collection, Profile, PointsTransaction, Reward
+from .forms import (
+    CustomUserCreationForm,
+    ResidueForm,
+    CollectionStatusForm,
+    CollectorAssignmentForm,
+    WeighingUploadForm,
+)
+from .idempotency import idempotent
+from .routers import replica_read
+from . import (
+    instrumentation,
+    intake,
+    leaderboard,
+    metrics,
+    notifications,
+    photos,
+    residue_types,
+    rewards,
+    rollups,
+    scheduling,
+    scoring,
+    search,
+    summary,
+    vouchers,
+    weighing,
+)
 
 # --- Views Públicas e de Autenticação ---
 
@@ -15,7 +54,7 @@ from .forms import CustomUserCreationForm, ResidueForm, CollectionStatusForm
 def public_index(request):
     if request.user.is_authenticated:
         return redirect("reciclAI:dashboard")
-    return render(request, "reciclAI/public_index.html")
+    return render(request, "reciclAI/public_index.html", {"impact": rollups.impact()})
 
 
 @login_required
@@ -81,14 +120,24 @@ def recycler_required(view_func):
 # --- Fluxo do Cidadão (Existente) ---
 @citizen_required
 def residue_list(request):
-    residues = Residue.objects.filter(citizen=request.user).order_by("-created_at")
-    return render(request, "reciclAI/residue_list.html", {"residues": residues})
+    residues = list(
+        Residue.objects.filter(citizen=request.user)
+        .select_related("residue_type")
+        .order_by("-created_at")
+    )
+    # O calendário só é consultado se houver coleta a solicitar.
+    slots = []
+    if any(r.status == "AGUARDANDO_SOLICITACAO_DE_COLETA" for r in residues):
+        slots = scheduling.free_slots()
+    return render(
+        request, "reciclAI/residue_list.html", {"residues": residues, "slots": slots}
+    )
 
 
 @citizen_required
 def residue_create(request):
     if request.method == "POST":
-        form = ResidueForm(request.POST)
+        form = ResidueForm(request.POST, request.FILES)
         if form.is_valid():
             residue = form.save(commit=False)
             residue.citizen = request.user
@@ -104,31 +153,103 @@ def residue_create(request):
 
 
 @citizen_required
+def residue_type_autocomplete(request):
+    """
+    Sugestões de tipo de resíduo para o campo do ResidueForm, respondidas
+    pelo índice em memória (sem consultar o banco).
+    """
+    query = request.GET.get("q", "")[:100]
+    results = [
+        {"id": type_id, "name": name}
+        for type_id, name in residue_types.search(query, limit=10)
+    ]
+    response = JsonResponse({"results": results})
+    response["Cache-Control"] = "private, max-age=300"
+    return response
+
+
+@login_required
+def residue_photo(request, residue_id, size):
+    """
+    Foto de um resíduo: uma miniatura WebP (`size` em THUMBNAIL_SIZES) ou o
+    original (`size` = "original"). Só o dono, coletores, recicladoras e a
+    equipe têm acesso. A URL traz a versão da foto (photos.photo_url), então
+    o navegador pode guardá-la por um ano.
+    """
+    residue = get_object_or_404(
+        Residue.objects.only("citizen_id", "photo", "photo_thumbnails"), id=residue_id
+    )
+    if not (
+        residue.citizen_id == request.user.id
+        or request.user.is_staff
+        or request.user.profile.user_type in ("L", "R")
+    ):
+        return HttpResponseForbidden("Acesso negado.")
+    if size == "original":
+        name = residue.photo.name
+    else:
+        name = residue.photo_thumbnails.get(size)
+    if not name:
+        raise Http404("Foto não disponível.")
+    response = FileResponse(default_storage.open(name))
+    response["Cache-Control"] = f"private, max-age={photos.CACHE_MAX_AGE}, immutable"
+    return response
+
+
+@citizen_required
+@idempotent
 @transaction.atomic
 def request_collection(request, residue_id):
+    if request.method != "POST":
+        return redirect("reciclAI:residue_list")
     residue = get_object_or_404(Residue, id=residue_id, citizen=request.user)
-    if residue.status != "AGUARDANDO_SOLICITACAO_DE_COLETA":
+    slot = None
+    slot_id = request.POST.get("slot", "")
+    if slot_id:
+        slot = scheduling.book(slot_id) if slot_id.isdigit() else None
+        if slot is None:
+            messages.error(
+                request, "Este horário não está mais disponível. Escolha outro."
+            )
+            return redirect("reciclAI:residue_list")
+        residue.collection_date = slot.date
+    # UPDATE condicional: de dois envios simultâneos, só um muda o status e
+    # cria a coleta (o outro cairia na unicidade de Collection.residue).
+    requested = Residue.objects.filter(
+        id=residue.id, status="AGUARDANDO_SOLICITACAO_DE_COLETA"
+    ).update(status="COLETA_SOLICITADA", collection_date=residue.collection_date)
+    if not requested:
+        transaction.set_rollback(True)  # Devolve a vaga reservada.
         messages.error(
             request, "Este resíduo já teve sua coleta solicitada ou finalizada."
         )
         return redirect("reciclAI:residue_list")
-    Collection.objects.create(residue=residue, status="SOLICITADA")
     residue.status = "COLETA_SOLICITADA"
-    residue.save()
+    collection = Collection.objects.create(
+        residue=residue, status="SOLICITADA", slot=slot
+    )
+    notifications.notify(*notifications.new_collection(collection))
     messages.success(request, "Coleta solicitada com sucesso!")
     return redirect("reciclAI:collection_status")
 
 
 @citizen_required
 def collection_status(request):
-    collections = Collection.objects.filter(residue__citizen=request.user).order_by(
-        "-updated_at"
+    collections = (
+        Collection.objects.filter(residue__citizen=request.user)
+        .select_related("residue__residue_type", "slot")
+        .order_by("-updated_at")
     )
+    # Zera o contador de atualizações da barra de navegação (só grava se
+    # houver alguma).
+    if summary.for_request(request)["updates"]:
+        summary.mark_updates_seen(request)
     return render(
         request, "reciclAI/collection_status.html", {"collections": collections}
     )
 
 
+@replica_read
 @citizen_required
 def points_history(request):
     """
@@ -146,7 +267,42 @@ def points_history(request):
     return render(request, "reciclAI/points_history.html", context)
 
 
+@replica_read
+@citizen_required
+def leaderboard_view(request):
+    """
+    Ranking dos cidadãos por pontos, geral ou do mês corrente, com a posição
+    do usuário logado.
+    """
+    period = request.GET.get("periodo")
+    if period == "mes":
+        month = leaderboard.current_month()
+        entries = [
+            (entry.user.username, entry.points)
+            for entry in leaderboard.top_monthly(month)
+        ]
+        rank, total, points = leaderboard.monthly_rank(request.user, month)
+    else:
+        period = "geral"
+        profile = request.user.profile
+        entries = [
+            (entry.user.username, entry.points) for entry in leaderboard.top_citizens()
+        ]
+        rank, total = leaderboard.citizen_rank(profile)
+        points = profile.points
+
+    context = {
+        "period": period,
+        "entries": entries,
+        "rank": rank,
+        "total": total,
+        "points": points,
+    }
+    return render(request, "reciclAI/leaderboard.html", context)
+
+
 # --- Sistema de Recompensas ---
+@replica_read
 @citizen_required
 def rewards_list(request):
     """
@@ -157,63 +313,95 @@ def rewards_list(request):
     context = {
         "rewards": rewards,
         "user_points": user_points,
+        "vouchers": vouchers.recent_for_user(request.user),
     }
     return render(request, "reciclAI/rewards_list.html", context)
 
 
 @citizen_required
-@transaction.atomic
+@idempotent
 def redeem_reward(request, reward_id):
     """
-    Processa o resgate de uma recompensa, se o usuário tiver pontos suficientes.
+    Processa o resgate de uma recompensa, se o usuário tiver pontos suficientes
+    e ainda houver estoque.
     """
     reward = get_object_or_404(Reward, id=reward_id, is_active=True)
-    profile = request.user.profile
-
-    if profile.points >= reward.points_required:
-        # Deduz os pontos
-        profile.points -= reward.points_required
-        profile.save()
-
-        # Registra o resgate
-        UserReward.objects.create(user=request.user, reward=reward)
 
-        # Opcional: registrar a transação de "gasto" de pontos
-        PointsTransaction.objects.create(
-            user=request.user,
-            points_gained=-reward.points_required,
-            description=f"Resgate da recompensa: {reward.name}",
-        )
-
-        messages.success(
-            request, f'Parabéns! Você resgatou a recompensa "{reward.name}".'
-        )
+    try:
+        user_reward = rewards.redeem_reward(request.user, reward)
+    except rewards.RedemptionError as error:
+        messages.error(request, str(error))
     else:
-        messages.error(
-            request, "Você não tem pontos suficientes para resgatar esta recompensa."
-        )
+        message = f'Parabéns! Você resgatou a recompensa "{reward.name}".'
+        if reward.uses_vouchers:
+            message += f" Seu código: {user_reward.voucher.code}"
+        messages.success(request, message)
 
     return redirect("reciclAI:rewards_list")
 
 
 # --- Fluxo do Coletor (Existente) ---
+@replica_read
 @collector_required
-def collector_dashboard(request):
-    available_collections = Collection.objects.filter(status="SOLICITADA").order_by(
-        "created_at"
+def collector_dashboard(request, assignment_form=None):
+    available_collections = (
+        Collection.objects.filter(status="SOLICITADA")
+        .select_related("residue__residue_type", "slot")
+        .order_by("created_at")
     )
     my_collections_status = ["ATRIBUIDA", "EM_ROTA", "COLETADA"]
-    my_collections = Collection.objects.filter(
-        collector=request.user, status__in=my_collections_status
-    ).order_by("-updated_at")
+    my_collections = (
+        Collection.objects.filter(
+            collector=request.user, status__in=my_collections_status
+        )
+        .select_related("residue__residue_type")
+        .order_by("-updated_at")
+    )
     context = {
         "available_collections": available_collections,
         "my_collections": my_collections,
+        "assignment_form": assignment_form
+        or CollectorAssignmentForm(instance=request.user.profile),
     }
     return render(request, "reciclAI/collector_dashboard.html", context)
 
 
 @collector_required
+def collector_schedule(request):
+    """
+    Agenda do coletor num dia (?dia=AAAA-MM-DD, padrão hoje): as janelas de
+    horário com as suas coletas e as ainda disponíveis.
+    """
+    try:
+        day = parse_date(request.GET.get("dia", "")) or timezone.localdate()
+    except ValueError:
+        day = timezone.localdate()
+    context = {
+        "day": day,
+        "previous_day": day - timedelta(days=1),
+        "next_day": day + timedelta(days=1),
+        "slots": scheduling.day_schedule(request.user, day),
+    }
+    return render(request, "reciclAI/collector_schedule.html", context)
+
+
+@collector_required
+def collector_assignment_settings(request):
+    """
+    Salva a capacidade e a base do coletor para a atribuição automática.
+    """
+    if request.method != "POST":
+        return redirect("reciclAI:collector_dashboard")
+    form = CollectorAssignmentForm(request.POST, instance=request.user.profile)
+    if not form.is_valid():
+        return collector_dashboard(request, assignment_form=form)
+    form.save()
+    messages.success(request, "Preferências de atribuição salvas.")
+    return redirect("reciclAI:collector_dashboard")
+
+
+@collector_required
+@idempotent
 @transaction.atomic
 def accept_collection(request, collection_id):
     if request.method != "POST":
@@ -228,6 +416,7 @@ def accept_collection(request, collection_id):
     collection.collector = request.user
     collection.status = "ATRIBUIDA"
     collection.save()
+    transaction.on_commit(metrics.COLLECTIONS_CLAIMED.inc)
     messages.success(
         request,
         f'Coleta do resíduo "{collection.residue.residue_type}" atribuída a você!',
@@ -252,7 +441,25 @@ def collection_transition(request, collection_id):
             request.POST, instance=collection, user=request.user
         )
         if form.is_valid():
-            form.save()
+            previous, status = form.initial.get("status"), form.cleaned_data["status"]
+            claimed = previous == "SOLICITADA" and status == "ATRIBUIDA"
+            # O aviso vai para a caixa de saída na mesma transação.
+            with transaction.atomic():
+                if status == "CANCELADA" and collection.slot_id:
+                    # Só quem de fato cancelou devolve a vaga da janela.
+                    if (
+                        Collection.objects.filter(id=collection.id)
+                        .exclude(status="CANCELADA")
+                        .update(status="CANCELADA")
+                    ):
+                        scheduling.release([collection.slot_id])
+                form.save()
+                if previous != "EM_ROTA" and status == "EM_ROTA":
+                    notifications.notify(
+                        notifications.collection_on_the_way(collection)
+                    )
+            if claimed:
+                metrics.COLLECTIONS_CLAIMED.inc()
             messages.success(request, "Status da coleta atualizado com sucesso.")
             return redirect("reciclAI:collector_dashboard")
     else:
@@ -265,60 +472,165 @@ def collection_transition(request, collection_id):
 # --- Fluxo da Recicladora ---
 
 
+@replica_read
 @recycler_required
 def recycler_dashboard(request):
     """
-    Dashboard da recicladora, mostrando coletas entregues e prontas para processamento.
+    Dashboard da recicladora: a sua fila de coletas entregues, paginada
+    (`?pagina=2`), e as últimas que processou.
     """
-    collections_to_process = Collection.objects.filter(
-        status="ENTREGUE_RECICLADORA"
-    ).order_by("updated_at")
-    processed_collections = Collection.objects.filter(status="PROCESSADO").order_by(
-        "-processed_at"
-    )[
-        :10
-    ]  # Mostra as 10 últimas
-
+    try:
+        page = max(int(request.GET.get("pagina", 1)), 1)
+    except ValueError:
+        page = 1
+    collections_to_process, has_next = intake.queue_page(request.user, page)
     context = {
         "collections_to_process": collections_to_process,
-        "processed_collections": processed_collections,
+        "page": page,
+        "has_next": has_next,
+        "processed_collections": intake.recent_processed(request.user),
     }
     return render(request, "reciclAI/recycler_dashboard.html", context)
 
 
+@recycler_required
+def recycler_weighings(request):
+    """
+    Importa um arquivo de leituras da balança e mostra o relatório de
+    declarado x medido. O envio vai para um arquivo temporário e é lido
+    linha a linha (weighing.py).
+    """
+    report = None
+    if request.method == "POST":
+        form = WeighingUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
+            lines = io.TextIOWrapper(
+                upload.file, encoding="utf-8-sig", errors="replace", newline=""
+            )
+            report = weighing.ingest(lines, request.user)
+            if report["weighed"]:
+                messages.success(
+                    request, f"{report['weighed']} coleta(s) pesada(s) com sucesso."
+                )
+    else:
+        form = WeighingUploadForm()
+    return render(
+        request, "reciclAI/recycler_weighings.html", {"form": form, "report": report}
+    )
+
+
+def _analytics_days(request, default=30):
+    try:
+        return min(max(int(request.GET.get("dias", default)), 1), 366)
+    except ValueError:
+        return default
+
+
+@replica_read
+@recycler_required
+def recycler_analytics(request):
+    """
+    Peso, unidades e coletas processadas pela recicladora nos últimos
+    `?dias=` dias, por dia e por tipo de resíduo (só rollups).
+    """
+    days = _analytics_days(request)
+    rows = rollups.recent(days).filter(recycler=request.user)
+    context = {
+        "days": days,
+        "by_day": rollups.totals_by(rows, "day"),
+        "by_type": rollups.totals_by(rows, "residue_type__name"),
+    }
+    return render(request, "reciclAI/recycler_analytics.html", context)
+
+
+@replica_read
+@recycler_required
+def collection_search(request):
+    """
+    Busca, entre as coletas que a recicladora pode pesar (as da sua fila,
+    as sem destino e as que já processou), por trechos do endereço ou pelo
+    tipo de resíduo, em ordem de relevância, paginada (`?q=...&pagina=2`).
+    """
+    query = request.GET.get("q", "")[:200]
+    try:
+        page = max(int(request.GET.get("pagina", 1)), 1)
+    except ValueError:
+        page = 1
+    collections, has_next = search.search_collections(
+        query, intake.weighable(request.user), page
+    )
+    results = [
+        {
+            "id": collection.id,
+            "status": collection.get_status_display(),
+            "residue_type": collection.residue.residue_type.name,
+            "location": collection.residue.location,
+            "citizen": collection.residue.citizen.username,
+        }
+        for collection in collections
+    ]
+    return JsonResponse({"results": results, "page": page, "has_next": has_next})
+
+
 @recycler_required
 @transaction.atomic
 def process_collection(request, collection_id):
     collection = get_object_or_404(
-        Collection.objects.select_related("residue__citizen__profile"),
+        intake.processable(request.user).select_related(
+            "residue__citizen__profile", "residue__residue_type"
+        ),
         id=collection_id,
-        status="ENTREGUE_RECICLADORA",
     )
 
     if request.method == "POST":
         residue = collection.residue
-        citizen_profile = residue.citizen.profile
-
-        # Define a quantidade de pontos a serem ganhos
-        points_to_award = 10  # Exemplo: 10 pontos por coleta processada
 
-        # Adiciona os pontos ao perfil do cidadão
-        citizen_profile.points += points_to_award
+        # Pontos conforme as regras por tipo, peso, unidades e campanhas
+        points_to_award = scoring.score_collection(collection)
+
+        # Muda o status só se a coleta ainda está entregue: de dois POSTs
+        # simultâneos, só um processa (e pontua) a coleta.
+        now = timezone.now()
+        if (
+            not intake.processable(request.user)
+            .filter(id=collection.id)
+            .update(
+                status="PROCESSADO",
+                recycler=request.user,
+                processed_at=now,
+                updated_at=now,
+            )
+        ):
+            messages.error(request, "Esta coleta já foi processada.")
+            return redirect("reciclAI:recycler_dashboard")
+        Residue.objects.filter(id=residue.id).update(status="PROCESSADO")
+
+        # Credita com F(): um save() do perfil inteiro sobrescreveria um
+        # resgate simultâneo (rewards.redeem_reward também debita com F()).
+        Profile.objects.filter(user_id=residue.citizen_id).update(
+            points=F("points") + points_to_award
+        )
 
-        # Cria um registro da transação de pontos
+        # Cria um registro da transação de pontos (o sinal soma ao ranking
+        # mensal e descarta o resumo do cidadão)
         PointsTransaction.objects.create(
             user=residue.citizen,
             points_gained=points_to_award,
             description=f"Coleta de {residue.residue_type} processada.",
         )
-
-        # Atualiza o status da coleta
-        collection.status = "PROCESSADO"
-        collection.processed_at = timezone.now()
-
-        # Salva todas as alterações
-        collection.save()
-        citizen_profile.save()
+        # update() não dispara sinais.
+        summary.invalidate(
+            residue.citizen_id,
+            collection.collector_id,
+            collection.recycler_id,
+            request.user.id,
+        )
+        notifications.notify(
+            notifications.collection_processed(
+                residue.citizen_id, residue.residue_type, points_to_award
+            )
+        )
 
         messages.success(
             request,
@@ -328,3 +640,50 @@ def process_collection(request, collection_id):
 
     context = {"collection": collection}
     return render(request, "reciclAI/process_collection.html", context)
+
+
+# --- Monitoramento (equipe) ---
+
+
+@replica_read
+@staff_member_required
+def city_analytics(request):
+    """
+    Indicadores da cidade nos últimos `?dias=` dias: totais por dia, tipo
+    de resíduo, recicladora e região (só rollups).
+    """
+    days = _analytics_days(request)
+    rows = rollups.recent(days)
+    groups = {
+        "by_day": ["day"],
+        "by_residue_type": ["residue_type__name"],
+        "by_recycler": ["recycler__username"],
+        "by_area": ["area"],
+    }
+    data = {
+        name: list(rollups.totals_by(rows, *fields)) for name, fields in groups.items()
+    }
+    return JsonResponse({"days": days, **data})
+
+
+@staff_member_required
+def performance_stats(request):
+    """
+    Estatísticas recentes de latência e SQL por rota deste processo.
+    """
+    return JsonResponse({"routes": instrumentation.route_stats()})
+
+
+def metrics_view(request):
+    """
+    Métricas no formato de texto do Prometheus. Acesso negado por padrão:
+    só para a equipe (staff) ou com `Authorization: Bearer <METRICS_TOKEN>`.
+    O token é conferido antes para que o scrape não consulte a sessão.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    auth = request.headers.get("Authorization", "")
+    if not (token and constant_time_compare(auth, f"Bearer {token}")):
+        if not request.user.is_staff:
+            return HttpResponseForbidden("Acesso negado.")
+    body, content_type = metrics.render_metrics()
+    return HttpResponse(body, content_type=content_type)
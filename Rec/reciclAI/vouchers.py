@@ -0,0 +1,133 @@
+"""
+Lotes de códigos de voucher das recompensas.
+
+Os códigos são gerados (`generate`) ou importados (`import_codes`) antes
+dos resgates, em lotes de BATCH_SIZE. No resgate (rewards.redeem_reward),
+`claim` reserva um código livre com um único UPDATE condicional:
+
+    UPDATE ... SET user_reward = ?, claimed_at = ?
+    WHERE id IN (SELECT id ... WHERE reward = ? AND claimed_at IS NULL
+                 ORDER BY id LIMIT 1 [FOR UPDATE SKIP LOCKED])
+      AND claimed_at IS NULL
+
+A condição `claimed_at IS NULL` do UPDATE garante que nenhum código é
+entregue duas vezes. No SQLite as escritas já são serializadas; no
+PostgreSQL o SKIP LOCKED faz resgates simultâneos pegarem códigos
+diferentes em vez de disputarem o mesmo, sem laço de nova tentativa. O
+índice parcial `voucher_free_idx` acha o próximo código livre e conta os
+livres sem percorrer os já entregues.
+"""
+
+import secrets
+from itertools import islice
+
+from django.db.models import Count, F, Q, Subquery
+from django.utils import timezone
+
+from .models import Reward, VoucherCode
+
+# Sem 0/O e 1/I, fáceis de confundir ao digitar.
+ALPHABET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZ"
+CODE_LENGTH = 12
+MAX_CODE_LENGTH = VoucherCode._meta.get_field("code").max_length
+BATCH_SIZE = 1000
+RECENT = 10
+
+
+def claim(reward, user_reward, now=None):
+    """
+    Reserva um código livre de `reward` para `user_reward` (na transação
+    atual). Retorna o VoucherCode, ou None se o lote acabou.
+    """
+    free = VoucherCode.objects.filter(reward=reward, claimed_at__isnull=True)
+    next_free = free.order_by("id").select_for_update(skip_locked=True).values("id")
+    claimed = VoucherCode.objects.filter(
+        id__in=Subquery(next_free[:1]), claimed_at__isnull=True
+    ).update(user_reward=user_reward, claimed_at=now or timezone.now())
+    if not claimed:
+        return None
+    return VoucherCode.objects.get(user_reward=user_reward)
+
+
+def recent_for_user(user, limit=RECENT):
+    """
+    Últimos códigos recebidos por `user`, para mostrar junto às recompensas.
+    """
+    return (
+        VoucherCode.objects.filter(user_reward__user=user)
+        .select_related("reward")
+        .order_by("-claimed_at")[:limit]
+    )
+
+
+def _add(reward, codes):
+    """
+    Acrescenta `codes` ao lote de `reward`, ignorando os que já existem.
+    Retorna quantos entraram.
+    """
+    codes = iter(codes)
+    added = 0
+    while batch := set(islice(codes, BATCH_SIZE)):
+        batch -= set(
+            VoucherCode.objects.filter(reward=reward, code__in=batch).values_list(
+                "code", flat=True
+            )
+        )
+        VoucherCode.objects.bulk_create(
+            [VoucherCode(reward=reward, code=code) for code in sorted(batch)],
+            ignore_conflicts=True,
+        )
+        added += len(batch)
+    return added
+
+
+def generate(reward, count, length=CODE_LENGTH, prefix=""):
+    """
+    Gera `count` códigos aleatórios para `reward`. Retorna quantos entraram
+    no lote (uma colisão com um código existente é descartada).
+    """
+    codes = (
+        prefix + "".join(secrets.choice(ALPHABET) for _ in range(length))
+        for _ in range(count)
+    )
+    return _add(reward, codes)
+
+
+def import_codes(reward, lines):
+    """
+    Importa um código por linha (linhas vazias são ignoradas). Retorna
+    {"codes", "added", "invalid"}: lidos, novos no lote e longos demais.
+    """
+    stats = {"codes": 0, "added": 0, "invalid": 0}
+
+    def valid_codes():
+        for line in lines:
+            code = line.strip()
+            if not code:
+                continue
+            stats["codes"] += 1
+            if len(code) > MAX_CODE_LENGTH:
+                stats["invalid"] += 1
+                continue
+            yield code
+
+    stats["added"] = _add(reward, valid_codes())
+    return stats
+
+
+def with_free_counts(rewards):
+    return rewards.annotate(
+        free_vouchers=Count("vouchers", filter=Q(vouchers__claimed_at__isnull=True))
+    )
+
+
+def low_stock():
+    """
+    Recompensas ativas com vouchers cujo lote livre está abaixo do alerta,
+    das mais vazias para as mais cheias.
+    """
+    return (
+        with_free_counts(Reward.objects.filter(uses_vouchers=True, is_active=True))
+        .filter(free_vouchers__lt=F("voucher_alert_below"))
+        .order_by("free_vouchers", "name")
+    )
@@ -0,0 +1,140 @@
+"""
+Aquecimento do processo antes de receber tráfego.
+
+Sem isso, as primeiras requisições de cada worker pagam a montagem dos
+resolvers de URL, a compilação dos templates (o loader em cache só guarda
+um template depois do primeiro uso), a abertura das conexões e a
+montagem das regras de pontuação e do índice de tipos de resíduo.
+
+`warm_up(open_connections=False)` roda ao importar Rec/wsgi.py e
+Rec/asgi.py (desligue com DJANGO_WARM_UP=False), então runserver, ASGI e
+gunicorn com ou sem `preload_app` sobem com tudo pronto. Com `preload_app`
+(veja gunicorn.conf.py) isso acontece uma vez no processo mestre, antes do
+fork, e os workers herdam o resultado.
+
+As conexões do Django são por thread e não passam por um fork: cada worker
+do gunicorn abre as suas com `connect()` e, nos workers gthread
+(GUNICORN_THREADS > 1), com `connect_pool()` em cada thread do pool. No
+ASGI o Django roda cada requisição síncrona numa thread própria, então lá
+não há conexão a aquecer.
+
+Uma etapa que consulta o banco e falha (banco ainda sem migrate, por
+exemplo) é só registrada: o cache é montado na primeira requisição.
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.db import DatabaseError, connections
+from django.template import TemplateSyntaxError
+from django.template.loader import get_template
+from django.urls import URLPattern, get_resolver, resolve, reverse
+
+from . import residue_types, scoring
+from .urls import app_name, urlpatterns
+
+logger = logging.getLogger("reciclAI.perf")
+
+
+def resolve_routes():
+    """
+    Faz reverse() e resolve() de cada rota do app (argumentos inteiros
+    fictícios), populando os resolvers e importando as views.
+    """
+    get_resolver()  # Monta o resolver raiz (e importa os URLconfs).
+    count = 0
+    for pattern in urlpatterns:
+        if not isinstance(pattern, URLPattern):
+            continue
+        kwargs = {name: 1 for name in pattern.pattern.converters}
+        resolve(reverse(f"{app_name}:{pattern.name}", kwargs=kwargs))
+        count += 1
+    return count
+
+
+def compile_templates():
+    """
+    Carrega cada template de reciclAI/templates, deixando-o compilado no
+    cache do loader. Um template com erro é só registrado: ele falharia do
+    mesmo jeito na requisição, e não deve impedir o servidor de subir.
+    """
+    root = Path(apps.get_app_config("reciclAI").path) / "templates"
+    count = 0
+    for path in sorted(root.rglob("*.html")):
+        name = path.relative_to(root).as_posix()
+        try:
+            get_template(name)
+        except TemplateSyntaxError:
+            logger.exception("warm_up: template %s não compila", name)
+            continue
+        count += 1
+    return count
+
+
+def load_caches():
+    """
+    Monta as regras de pontuação e o índice de tipos de resíduo (consultam
+    o banco).
+    """
+    scoring.get_rules()
+    residue_types.get_index()
+
+
+def connect():
+    """
+    Abre a conexão de cada banco configurado na thread atual.
+    """
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def connect_pool(pool, threads, timeout=10):
+    """
+    Abre as conexões em cada uma das `threads` threads de `pool` (um
+    ThreadPoolExecutor): as tarefas esperam umas pelas outras numa
+    barreira, então nenhuma thread pega duas e o pool cria todas. Retorna
+    quantas threads foram aquecidas.
+    """
+    barrier = threading.Barrier(threads)
+
+    def task():
+        barrier.wait(timeout)
+        connect()
+        return threading.get_ident()
+
+    futures = [pool.submit(task) for _ in range(threads)]
+    try:
+        return len({future.result() for future in futures})
+    except threading.BrokenBarrierError:
+        logger.warning("warm_up: pool com menos de %d threads livres", threads)
+        return 0
+
+
+def warm_up(open_connections=True):
+    """
+    Executa todas as etapas e registra quanto cada uma levou. Retorna
+    {etapa: milissegundos}.
+    """
+    timings = {}
+    steps = [
+        ("routes", resolve_routes),
+        ("templates", compile_templates),
+        ("connections", connect),
+        ("caches", load_caches),
+    ]
+    if not open_connections:
+        steps.pop(2)
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+        except DatabaseError:
+            logger.exception("warm_up: etapa %s falhou", name)
+        timings[name] = (time.perf_counter() - start) * 1000
+    logger.info(
+        "warm_up %s", " ".join(f"{name}_ms={ms:.1f}" for name, ms in timings.items())
+    )
+    return timings
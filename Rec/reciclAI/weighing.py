@@ -0,0 +1,255 @@
+"""
+Pesagem das coletas na entrada da recicladora.
+
+O peso do resíduo é a estimativa do cidadão; a recicladora envia as
+leituras da balança, um arquivo por vez (página "Pesagens" ou comando
+`import_weighings`), em CSV com cabeçalho `coleta,peso` (com `;` a vírgula
+decimal também vale) ou NDJSON, um {"coleta": 12, "peso": 3.5} por linha.
+
+O arquivo é lido linha a linha, sem ficar inteiro na memória. A cada
+BATCH_SIZE leituras, uma consulta acha as coletas que a recicladora pode
+pesar (intake.weighable), um INSERT grava as leituras (ScaleReading) e um
+único UPDATE copia a última leitura de cada coleta para measured_weight,
+pelo índice `scale_reading_latest_idx`. Cada lote é uma transação. Coletas
+já processadas e somadas nos indicadores têm o peso corrigido no dia em
+que foram processadas (rollups.reweigh).
+Reenviar o mesmo arquivo só regrava os mesmos pesos.
+
+Um UPDATE com CASE, como nas outras operações em lote, não serve aqui:
+cada leitura tem o seu peso, e montar milhares de When custa mais que o
+próprio UPDATE.
+"""
+
+import csv
+import heapq
+import itertools
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from . import intake, rollups, summary
+from .models import Collection, ScaleReading
+
+BATCH_SIZE = 5000
+MAX_WEIGHT = Decimal("999999.99")
+LARGEST_DIFFERENCES = 10
+MAX_ERRORS = 20
+
+
+def _reading(raw_id, raw_weight):
+    """
+    (id, peso) validados, ou ValueError com a mensagem para o usuário.
+    """
+    try:
+        collection_id = int(str(raw_id).strip())
+    except ValueError:
+        raise ValueError(f"Coleta inválida: {raw_id!r}.") from None
+    try:
+        weight = Decimal(str(raw_weight).strip().replace(",", "."))
+    except InvalidOperation:
+        raise ValueError(f"Peso inválido: {raw_weight!r}.") from None
+    if not weight.is_finite() or not 0 < weight <= MAX_WEIGHT:
+        raise ValueError(f"Peso fora do intervalo: {raw_weight!r}.")
+    return collection_id, weight.quantize(Decimal("0.01"))
+
+
+def _parse_csv(header, lines, first_number):
+    delimiter = ";" if ";" in header else ","
+    columns = [
+        column.strip().lower()
+        for column in next(csv.reader([header], delimiter=delimiter))
+    ]
+    if "coleta" not in columns or "peso" not in columns:
+        yield first_number, None, None, "O cabeçalho precisa das colunas coleta e peso."
+        return
+    id_column, weight_column = columns.index("coleta"), columns.index("peso")
+    reader = csv.reader(lines, delimiter=delimiter)
+    for row in reader:
+        number = first_number + reader.line_num
+        if not any(field.strip() for field in row):
+            continue
+        if len(row) != len(columns):
+            yield number, None, None, "Número de colunas diferente do cabeçalho."
+            continue
+        try:
+            yield number, *_reading(row[id_column], row[weight_column]), None
+        except ValueError as error:
+            yield number, None, None, str(error)
+
+
+def _parse_ndjson(lines, first_number):
+    for number, line in enumerate(lines, first_number):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            yield number, *_reading(data["coleta"], data["peso"]), None
+        except (KeyError, TypeError):
+            yield number, None, None, "Cada linha precisa dos campos coleta e peso."
+        except ValueError as error:
+            # json.JSONDecodeError também é ValueError.
+            message = str(error) if not isinstance(error, json.JSONDecodeError) else ""
+            yield number, None, None, message or "JSON inválido."
+
+
+def parse(lines):
+    """
+    Lê as leituras de `lines` (linhas de texto), detectando o formato pela
+    primeira linha. Gera (número da linha, coleta, peso, erro); nas linhas
+    inválidas coleta e peso são None.
+    """
+    lines = iter(lines)
+    for number, first in enumerate(lines, 1):
+        if first.strip():
+            break
+    else:
+        return
+    if first.lstrip().startswith("{"):
+        yield from _parse_ndjson(itertools.chain([first], lines), number)
+    else:
+        yield from _parse_csv(first, lines, number)
+
+
+@transaction.atomic
+def _apply(readings, recycler, now):
+    """
+    Grava {coleta: peso} nas coletas que `recycler` pode pesar. Retorna
+    [(id, peso declarado, peso medido)] das que foram gravadas.
+    """
+    rows = list(
+        intake.weighable(recycler)
+        .filter(id__in=readings)
+        .select_for_update(of=("self",))
+        .values_list(
+            "id",
+            "residue__weight",
+            "residue__citizen_id",
+            "status",
+            "processed_at",
+            "residue__residue_type_id",
+            "recycler_id",
+            "slot__area",
+            "measured_weight",
+        )
+    )
+    if not rows:
+        return []
+    ids = [row[0] for row in rows]
+    ScaleReading.objects.bulk_create(
+        ScaleReading(
+            collection_id=collection_id,
+            recycler=recycler,
+            weight=readings[collection_id],
+            created_at=now,
+        )
+        for collection_id in ids
+    )
+    latest = ScaleReading.objects.filter(collection=OuterRef("id")).order_by("-id")
+    Collection.objects.filter(id__in=ids).update(
+        measured_weight=Subquery(latest.values("weight")[:1]),
+        weighed_at=now,
+        updated_at=now,
+    )
+    rollups.reweigh(
+        [
+            (
+                collection_id,
+                processed_at,
+                type_id,
+                recycler_id,
+                area,
+                measured if measured is not None else declared,
+                readings[collection_id],
+            )
+            for (
+                collection_id,
+                declared,
+                _,
+                status,
+                processed_at,
+                type_id,
+                recycler_id,
+                area,
+                measured,
+            ) in rows
+            if status == "PROCESSADO"
+        ]
+    )
+    summary.invalidate(recycler.pk, *(row[2] for row in rows))
+    return [
+        (collection_id, declared, readings[collection_id])
+        for collection_id, declared, *_ in rows
+    ]
+
+
+def ingest(lines, recycler, batch_size=BATCH_SIZE):
+    """
+    Importa as leituras de `lines` para `recycler`. Retorna o relatório:
+    leituras válidas e inválidas (com as primeiras MAX_ERRORS mensagens),
+    coletas pesadas e desconhecidas, totais declarado x medido (só das
+    coletas com peso declarado) e as maiores diferenças.
+    """
+    start = time.perf_counter()
+    now = timezone.now()
+    report = {
+        "readings": 0,
+        "invalid": 0,
+        "errors": [],
+        "weighed": 0,
+        "unknown": 0,
+        "measured": Decimal(0),
+        "compared": 0,
+        "declared_compared": Decimal(0),
+        "measured_compared": Decimal(0),
+    }
+    largest = []
+
+    def flush(batch):
+        weighed = _apply(batch, recycler, now)
+        report["weighed"] += len(weighed)
+        report["unknown"] += len(batch) - len(weighed)
+        for collection_id, declared, measured in weighed:
+            report["measured"] += measured
+            if declared is None:
+                continue
+            report["compared"] += 1
+            report["declared_compared"] += declared
+            report["measured_compared"] += measured
+            entry = (abs(measured - declared), collection_id, declared, measured)
+            if len(largest) < LARGEST_DIFFERENCES:
+                heapq.heappush(largest, entry)
+            else:
+                heapq.heappushpop(largest, entry)
+
+    batch = {}
+    for number, collection_id, weight, error in parse(lines):
+        if error:
+            report["invalid"] += 1
+            if len(report["errors"]) < MAX_ERRORS:
+                report["errors"].append((number, error))
+            continue
+        report["readings"] += 1
+        # Leituras repetidas no mesmo lote: vale a última.
+        batch[collection_id] = weight
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = {}
+    if batch:
+        flush(batch)
+
+    report["difference"] = report["measured_compared"] - report["declared_compared"]
+    report["largest"] = [
+        {
+            "collection_id": collection_id,
+            "declared": declared,
+            "measured": measured,
+            "difference": measured - declared,
+        }
+        for _, collection_id, declared, measured in sorted(largest, reverse=True)
+    ]
+    report["seconds"] = time.perf_counter() - start
+    return report